@@ -1,16 +1,20 @@
 import json
 from gemini_client import get_agent_response, analyze_conversation_intent
+from services.intent_classifier import IntentClassifier, INTENT_STAGES
 
 class MasterAgent:
     """
     Master Agent - Main orchestrator that manages conversation flow and coordinates worker agents
     """
     
-    def __init__(self, sales_agent, verification_agent, underwriting_agent, sanction_letter_agent):
+    def __init__(self, sales_agent, verification_agent, underwriting_agent, sanction_letter_agent,
+                 prefetcher=None, intent_classifier=None):
         self.sales_agent = sales_agent
         self.verification_agent = verification_agent
         self.underwriting_agent = underwriting_agent
         self.sanction_letter_agent = sanction_letter_agent
+        self.prefetcher = prefetcher
+        self.intent_classifier = intent_classifier or IntentClassifier(llm_classifier=analyze_conversation_intent)
         
         self.conversation_stages = {
             'initial': 'greeting_and_interest',
@@ -18,10 +22,22 @@ class MasterAgent:
             'sales_pitch': 'collect_personal_info',
             'collect_personal_info': 'verification',
             'verification': 'underwriting',
+            'reverification': 'underwriting',
             'underwriting': 'sanction_letter',
+            'counter_offer': 'sanction_letter',
             'sanction_letter': 'completed',
             'rejected': 'completed'
         }
+        
+        # Callbacks run as listener(session_data, from_stage, to_stage) on every stage change
+        self.stage_listeners = []
+        
+        # Stages that take no user input run straight after the stage before them
+        self.auto_stages = {
+            'verification': self.verification_agent.verify_customer,
+            'underwriting': self.underwriting_agent.process_application,
+            'sanction_letter': self.sanction_letter_agent.generate_sanction_letter
+        }
     
     def start_conversation(self):
         """Start the conversation with a welcome message"""
@@ -37,14 +53,18 @@ class MasterAgent:
         current_stage = session_data.get('current_stage', 'initial')
         conversation_history = session_data.get('conversation_history', [])
         
-        # Analyze user intent
-        try:
-            intent_analysis = analyze_conversation_intent(conversation_history, user_message)
-            if intent_analysis:
-                intent_data = json.loads(intent_analysis)
-            else:
+        # Analyze user intent locally, falling back to the LLM only when unsure.
+        # Stages that never read the intent skip classification, and a combined
+        # sales turn classifies the intent in the same call as the reply.
+        if current_stage in INTENT_STAGES:
+            try:
+                intent_data = self.intent_classifier.analyze(
+                    conversation_history, user_message, current_stage,
+                    escalate=self.sales_agent.turn_mode != 'combined'
+                )
+            except:
                 intent_data = {"intent": "inquiry", "next_action": "sales_pitch"}
-        except:
+        else:
             intent_data = {"intent": "inquiry", "next_action": "sales_pitch"}
         
         # Route to appropriate agent based on stage and intent
@@ -56,10 +76,14 @@ class MasterAgent:
             return self.sales_agent.collect_personal_information(user_message, session_data)
         elif current_stage == 'verification':
             return self.verification_agent.verify_customer(session_data)
+        elif current_stage == 'reverification':
+            return self.verification_agent.confirm_identity(user_message, session_data)
         elif current_stage == 'underwriting':
             return self.underwriting_agent.process_application(session_data)
         elif current_stage == 'document_upload':
             return self._handle_document_stage(user_message, session_data)
+        elif current_stage == 'counter_offer':
+            return self.underwriting_agent.respond_to_counter_offer(user_message, session_data)
         elif current_stage == 'sanction_letter':
             return self.sanction_letter_agent.generate_sanction_letter(session_data)
         else:
@@ -69,6 +93,64 @@ class MasterAgent:
                 'session_updates': {'current_stage': 'completed'}
             }
     
+    def process_turn(self, user_message, session_data):
+        """
+        Process a user message, then run any non-interactive stages that follow it.
+        Returns the list of responses to send to the customer, in order.
+        """
+        previous_stage = session_data.get('current_stage', 'initial')
+        response = self.process_message(user_message, session_data)
+        self.apply_updates(session_data, response.get('session_updates', {}), previous_stage)
+        
+        # Start back-end lookups while the customer is still typing
+        if self.prefetcher:
+            self.prefetcher.maybe_prefetch(session_data)
+        
+        return [response] + self.run_auto_stages(session_data, response)
+    
+    def run_auto_stages(self, session_data, last_response=None):
+        """
+        Chain stages that need no user input, applying each stage's session updates.
+        Stops at the first stage that waits on the customer.
+        """
+        responses = []
+        
+        # Each auto stage runs at most once per turn
+        while len(responses) < len(self.auto_stages):
+            if last_response and last_response.get('requires_upload'):
+                break
+            
+            handler = self.auto_stages.get(session_data.get('current_stage'))
+            if not handler:
+                break
+            
+            last_response = handler(session_data)
+            self.apply_updates(session_data, last_response.get('session_updates', {}))
+            responses.append(last_response)
+        
+        return responses
+    
+    def add_stage_listener(self, listener):
+        """Register a callback for stage transitions"""
+        self.stage_listeners.append(listener)
+    
+    def apply_updates(self, session_data, updates, previous_stage=None):
+        """
+        Apply an agent's session updates and notify stage listeners if the stage changed.
+        previous_stage overrides the session's stage for handlers that set it directly.
+        """
+        if previous_stage is None:
+            previous_stage = session_data.get('current_stage', 'initial')
+        session_data.update(updates)
+        
+        current_stage = session_data.get('current_stage', 'initial')
+        if current_stage != previous_stage:
+            for listener in self.stage_listeners:
+                try:
+                    listener(session_data, previous_stage, current_stage)
+                except Exception as e:
+                    print(f"Stage listener failed: {e}")
+    
     def _handle_initial_stage(self, user_message, session_data, intent_data):
         """Handle initial conversation and move to sales pitch"""
         # Extract information even in initial stage
@@ -1,13 +1,27 @@
 import json
+import os
 from gemini_client import get_agent_response
+from services.admission import ServerBusyError
+from services.answer_cache import AnswerCache, ProductFactCheck
+from services.normalization import normalize_city, normalize_loan_purpose
+from services.sales_turn import SALES_FIELDS, SalesTurnValidationError, parse_sales_turn
 
 class SalesAgent:
     """
     Sales Agent - Handles loan negotiations, discusses customer needs, and collects information
     """
     
-    def __init__(self):
-        self.required_info = ['name', 'phone', 'email', 'city', 'monthly_income', 'loan_amount', 'loan_purpose']
+    def __init__(self, turn_mode=None, answer_cache=None, get_loan_products=None):
+        self.required_info = list(SALES_FIELDS)
+        # 'combined': one structured call returns intent, extracted info and reply.
+        # 'separate': extraction and reply are separate calls.
+        self.turn_mode = turn_mode or os.environ.get('SALES_TURN_MODE', 'combined')
+        self.turn_stats = {'combined': 0, 'fallback': 0, 'separate': 0, 'cached': 0}
+        # Replies to recurring questions and objections, served without an LLM call. Generated
+        # replies are cached only when their figures match the loan products; without a
+        # product source nothing is learned
+        validator = ProductFactCheck(get_loan_products) if get_loan_products else None
+        self.answer_cache = answer_cache or AnswerCache(validator=validator)
     
     def handle_sales_conversation(self, user_message, session_data, intent_data):
         """
@@ -15,8 +29,26 @@ class SalesAgent:
         """
         customer_data = session_data.get('customer_data', {})
         
+        # A paraphrase of a question already answered in the same context needs no LLM call
+        cache_context = self._answer_context(customer_data, intent_data)
+        cached_reply = self.answer_cache.lookup(user_message, cache_context)
+        
+        turn = None
+        if cached_reply is not None:
+            self.turn_stats['cached'] += 1
+        elif self.turn_mode == 'combined':
+            turn = self._combined_turn(user_message, session_data, intent_data)
+            self.turn_stats['combined' if turn else 'fallback'] += 1
+        else:
+            self.turn_stats['separate'] += 1
+        
         # Extract any information from this conversation FIRST
-        extracted_info = self._extract_information(user_message, customer_data)
+        if cached_reply is not None:
+            extracted_info = {}
+        elif turn:
+            extracted_info = self._clean_extracted(turn['extracted_info'])
+        else:
+            extracted_info = self._extract_information(user_message, customer_data)
         if extracted_info:
             customer_data.update(extracted_info)
         
@@ -32,7 +64,65 @@ class SalesAgent:
                 }
             }
         
-        # Generate personalized sales response
+        if cached_reply is not None:
+            response = cached_reply
+        else:
+            if turn:
+                response = turn['reply']
+            else:
+                response = self._generate_reply(user_message, customer_data, intent_data)
+            # Only general answers are reused: nothing was extracted, nothing personal is quoted,
+            # and every rate, amount and tenure is checked against the products
+            if not extracted_info:
+                self.answer_cache.store(user_message, cache_context, response,
+                                        personal_values=customer_data.values())
+        
+        # Check if we have enough info to proceed to collection stage
+        missing_info = [field for field in self.required_info if field not in customer_data]
+        
+        if len(missing_info) <= 3:  # Move to structured collection when most info is available
+            next_stage = 'collect_personal_info'
+        else:
+            next_stage = 'sales_pitch'
+        
+        return {
+            'message': response,
+            'agent': 'Sales Agent',
+            'session_updates': {
+                'current_stage': next_stage,
+                'customer_data': customer_data
+            }
+        }
+    
+    def _answer_context(self, customer_data, intent_data):
+        """Cached replies are shared only between turns with the same intent and the same known fields"""
+        known = tuple(field for field in self.required_info if field in customer_data)
+        return intent_data.get('intent', 'inquiry'), known
+    
+    def outreach_prompt(self, customer, offer):
+        """
+        Prompt for a personalized outreach pitch to a pre-approved customer (campaigns).
+        Returns (system_prompt, user_message) for get_agent_response.
+        """
+        profile = {field: customer.get(field) for field in ('name', 'city', 'employment_type', 'company_name')}
+        system_prompt = f"""You are a friendly and persuasive personal loan sales agent for Tata Capital.
+        Write a short outreach message to an existing customer who is pre-approved for a personal loan.
+        
+        Customer: {json.dumps(profile)}
+        Offer: pre-approved up to ₹{offer['pre_approved_limit']:,} at {offer['interest_rate']}% p.a.,
+        tenure up to {offer['tenure_max']} months
+        
+        Guidelines:
+        - Address the customer by first name
+        - Highlight the pre-approved amount, the rate, quick approval and flexible terms
+        - Be warm and persuasive but not pushy; no collateral is needed
+        - End with a simple call to action (reply YES or start a chat)
+        - At most 60 words, plain text, no subject line"""
+        
+        return system_prompt, "Write the outreach message."
+    
+    def _generate_reply(self, user_message, customer_data, intent_data):
+        """Generate the personalized sales reply (separate-call mode)"""
         system_prompt = f"""You are a friendly and persuasive personal loan sales agent for Tata Capital.
         Your goal is to convince the customer to take a personal loan and collect their information.
         
@@ -51,24 +141,42 @@ class SalesAgent:
         
         Respond in a single paragraph, naturally guiding them toward providing information."""
         
-        response = get_agent_response(system_prompt, user_message)
+        return get_agent_response(system_prompt, user_message, task='sales_reply')
+    
+    def _combined_turn(self, user_message, session_data, intent_data):
+        """
+        One structured call for intent, extracted info and reply.
+        Returns the validated turn, or None so the caller falls back to separate calls.
+        """
+        customer_data = session_data.get('customer_data', {})
+        history = session_data.get('conversation_history', [])[-5:]
         
-        # Check if we have enough info to proceed to collection stage
-        missing_info = [field for field in self.required_info if field not in customer_data]
+        system_prompt = f"""You are a friendly and persuasive personal loan sales agent for Tata Capital.
+        Your goal is to convince the customer to take a personal loan and collect their information.
         
-        if len(missing_info) <= 3:  # Move to structured collection when most info is available
-            next_stage = 'collect_personal_info'
-        else:
-            next_stage = 'sales_pitch'
+        Customer data collected so far: {json.dumps(customer_data)}
+        Likely user intent: {intent_data.get('intent', 'inquiry')}
         
-        return {
-            'message': response,
-            'agent': 'Sales Agent',
-            'session_updates': {
-                'current_stage': next_stage,
-                'customer_data': customer_data
-            }
-        }
+        For the user's latest message, do three things at once:
+        1. Classify the intent as one of: greeting, inquiry, personal_info, loan_details, verification,
+           document_upload, objection, closing
+        2. Extract only new information clearly stated in the message: name, phone, email, city,
+           monthly_income (as number), loan_amount (as number), loan_purpose (home_improvement,
+           debt_consolidation, medical, education, business, personal, wedding, travel)
+        3. Write the reply: conversational, highlight competitive rates, quick approval and flexible terms,
+           address concerns, gradually ask for missing details without asking for everything at once,
+           and never ask for details already in the customer data. A single paragraph.
+        
+        Respond with JSON only:
+        {{"intent": "...", "confidence": 0.0-1.0, "extracted_info": {{"field_name": "value"}}, "reply": "..."}}"""
+        
+        try:
+            raw = get_agent_response(system_prompt, user_message, context=f"Recent conversation: {json.dumps(history)}",
+                                     response_format="json", task='sales_turn')
+            return parse_sales_turn(raw)
+        except SalesTurnValidationError as e:
+            print(f"Combined sales turn failed validation, using separate calls: {e}")
+            return None
     
     def collect_personal_information(self, user_message, session_data):
         """
@@ -125,37 +233,45 @@ class SalesAgent:
         If no new information is found, return an empty JSON object {{}}"""
         
         try:
-            response = get_agent_response(system_prompt, user_message, response_format="json")
+            response = get_agent_response(system_prompt, user_message, response_format="json", task='extraction')
             if response:
                 # Parse the JSON response
-                extracted_data = json.loads(response)
-                
-                # Clean up the extracted data
-                cleaned_data = {}
-                for key, value in extracted_data.items():
-                    if key in ['monthly_income', 'loan_amount']:
-                        # Ensure numeric values are integers
-                        try:
-                            cleaned_data[key] = int(value)
-                        except (ValueError, TypeError):
-                            # If conversion fails, keep original value
-                            cleaned_data[key] = value
-                    elif key == 'phone':
-                        # Clean phone numbers (remove spaces, dashes, etc.)
-                        if isinstance(value, str):
-                            cleaned_data[key] = ''.join(filter(str.isdigit, value))
-                        else:
-                            cleaned_data[key] = value
-                    else:
-                        cleaned_data[key] = value
-                
-                return cleaned_data
+                return self._clean_extracted(json.loads(response))
             else:
                 return {}
+        except ServerBusyError:
+            # Let the turn be shed as a whole
+            raise
         except Exception as e:
             # Return empty dict on any error
             return {}
     
+    def _clean_extracted(self, extracted_data):
+        """Normalize extracted fields: integer amounts, canonical city / purpose, digits-only phone"""
+        cleaned_data = {}
+        for key, value in extracted_data.items():
+            if key in ['monthly_income', 'loan_amount']:
+                # Ensure numeric values are integers
+                try:
+                    cleaned_data[key] = int(value)
+                except (ValueError, TypeError):
+                    # If conversion fails, keep original value
+                    cleaned_data[key] = value
+            elif key in ['city', 'loan_purpose'] and isinstance(value, str):
+                # Snap misspellings onto the canonical city / purpose lists
+                normalize = normalize_city if key == 'city' else normalize_loan_purpose
+                cleaned_data[key] = normalize(value) or value.strip()
+            elif key == 'phone':
+                # Clean phone numbers (remove spaces, dashes, etc.)
+                if isinstance(value, str):
+                    cleaned_data[key] = ''.join(filter(str.isdigit, value))
+                else:
+                    cleaned_data[key] = value
+            else:
+                cleaned_data[key] = value
+        
+        return cleaned_data
+    
     def _get_next_question(self, field):
         """Get appropriate question for missing field"""
         questions = {
@@ -1,12 +1,31 @@
 import json
 import random
+import re
 from openai_client import get_agent_response
+from services.loan_math import calculate_emi, counter_offer
+from services.prefetch import take_prefetched
 
 class UnderwritingAgent:
     """
     Underwriting Agent - Handles credit scoring and eligibility validation
     """
     
+    # Rate and tenure the salary-slip EMI check uses (and the sanction letter states)
+    INTEREST_RATE = 0.12
+    DEFAULT_TENURE_MONTHS = 36
+    MAX_EMI_RATIO = 0.5
+    
+    ACCEPT_WORDS = {'yes', 'yeah', 'yep', 'sure', 'ok', 'okay', 'accept', 'proceed', 'agree', 'fine', 'deal'}
+    DECLINE_WORDS = {'no', 'nope', 'decline', 'reject', 'cancel', 'dont'}
+    # Matched (longest first) and removed before single words, so "no problem" is not read as "no"
+    ACCEPT_PHRASES = ('no problem', 'not a problem', 'no worries', 'no issue', 'no issues', 'no objection',
+                      'why not', 'go ahead', 'sounds good', 'lets do it', 'of course', 'works for me')
+    DECLINE_PHRASES = ('no thanks', 'no thank you', 'not interested', 'dont want', 'do not want', 'not okay',
+                       'not ok', 'not fine', 'not acceptable', 'no deal', 'not for me', 'dont go ahead',
+                       'do not go ahead', 'dont proceed', 'do not proceed', 'wont accept')
+    # Hedges carry no answer ("not sure" must not count as "sure")
+    UNSURE_PHRASES = ('not sure', 'let me think', 'maybe')
+    
     def __init__(self, credit_bureau_api, offer_mart_api):
         self.credit_bureau_api = credit_bureau_api
         self.offer_mart_api = offer_mart_api
@@ -17,11 +36,21 @@ class UnderwritingAgent:
         """
         customer_data = session_data.get('customer_data', {})
         
-        # Get credit score
-        credit_score = self.credit_bureau_api.get_credit_score(customer_data.get('phone'))
-        
-        # Get pre-approved offer
-        offer = self.offer_mart_api.get_offer(customer_data)
+        # Use the materialized score and offer when verification found them
+        pre_underwriting = session_data.get('pre_underwriting')
+        if pre_underwriting and pre_underwriting.get('phone') == customer_data.get('phone'):
+            credit_score = pre_underwriting['credit_score']
+            offer = pre_underwriting['offer']
+        else:
+            # Get credit score, prefetched once the phone number was known
+            credit_score = take_prefetched(session_data, 'credit_score')
+            if credit_score is None:
+                credit_score = self.credit_bureau_api.get_credit_score(customer_data.get('phone'))
+            
+            # Get pre-approved offer
+            offer = take_prefetched(session_data, 'offer')
+            if offer is None:
+                offer = self.offer_mart_api.get_offer(customer_data)
         
         # Apply underwriting logic with error handling
         try:
@@ -56,7 +85,9 @@ class UnderwritingAgent:
             return self._request_salary_slip(session_data)
         
         else:
-            return self._reject_application("amount_too_high", session_data)
+            # Offer the most the customer can get, capped by declared income, instead of rejecting
+            return self._counter_offer("amount_too_high", session_data, 2 * pre_approved_limit,
+                                       monthly_income, salary_verified=False)
     
     def process_salary_slip(self, file_data, file_type, session_data):
         """
@@ -70,18 +101,70 @@ class UnderwritingAgent:
         # In real scenario, this would use OCR and document analysis
         extracted_salary = self._extract_salary_from_slip(file_data, monthly_income)
         
-        # Calculate EMI (simplified calculation)
-        interest_rate = 0.12  # 12% annual
-        tenure_months = 36  # 3 years default
+        # Calculate EMI (simplified calculation), over the tenure agreed in a counter-offer if there was one
+        interest_rate = self.INTEREST_RATE
+        tenure_months = session_data.get('loan_application', {}).get('tenure_months', self.DEFAULT_TENURE_MONTHS)
         monthly_emi = self._calculate_emi(loan_amount, interest_rate, tenure_months)
         
         # Check if EMI is <= 50% of salary
         emi_ratio = monthly_emi / extracted_salary
         
-        if emi_ratio <= 0.5:
+        if emi_ratio <= self.MAX_EMI_RATIO:
             return self._approve_with_documents(session_data, monthly_emi, tenure_months)
         else:
-            return self._reject_application("high_emi_ratio", session_data)
+            # Largest amount (up to the request) the verified salary supports, at the best tenure
+            return self._counter_offer("high_emi_ratio", session_data, loan_amount, extracted_salary,
+                                       salary_verified=True)
+    
+    def respond_to_counter_offer(self, user_message, session_data):
+        """
+        Handle the customer's answer to a counter-offer: accepting approves it (or asks for the
+        salary slip when the amount still needs one), declining ends with the original rejection.
+        """
+        offer = session_data.get('counter_offer') or {}
+        accepted, declined = self._read_answer(user_message)
+        
+        if not offer or (declined and not accepted):
+            return self._reject_application(offer.get('reason', 'amount_too_high'), session_data)
+        # Mixed or no answer: ask again rather than guess
+        if declined or not accepted:
+            return {
+                'message': (f"Would you like to go ahead with ₹{offer['amount']:,} over {offer['tenure_months']} "
+                           f"months at ₹{offer['monthly_emi']:,.0f} per month? Please reply yes or no."),
+                'agent': 'Underwriting Agent',
+                'counter_offer': offer,
+                'session_updates': {}
+            }
+        
+        # The accepted terms become the application
+        session_data['customer_data']['loan_amount'] = offer['amount']
+        loan_application = dict(session_data.get('loan_application', {}),
+                                requested_amount=offer['amount'], tenure_months=offer['tenure_months'])
+        session_data['loan_application'] = loan_application
+        
+        if offer['salary_verified']:
+            return self._approve_with_documents(session_data, offer['monthly_emi'], offer['tenure_months'])
+        if offer['requires_salary_slip']:
+            return self._request_salary_slip(session_data)
+        response = self._approve_instantly(session_data)
+        response['session_updates']['emi_details'] = {'monthly_emi': offer['monthly_emi'],
+                                                      'tenure_months': offer['tenure_months']}
+        return response
+    
+    def _read_answer(self, user_message):
+        """(accepted, declined) for a reply to a counter-offer; both False or both True is ambiguous"""
+        text = ' ' + ' '.join(re.findall(r"[a-z]+", user_message.lower().replace("'", ''))) + ' '
+        accepted = declined = False
+        phrases = ([(phrase, 'accept') for phrase in self.ACCEPT_PHRASES]
+                   + [(phrase, 'decline') for phrase in self.DECLINE_PHRASES]
+                   + [(phrase, None) for phrase in self.UNSURE_PHRASES])
+        for phrase, answer in sorted(phrases, key=lambda item: -len(item[0])):
+            if f' {phrase} ' in text:
+                text = text.replace(f' {phrase} ', ' ')
+                accepted = accepted or answer == 'accept'
+                declined = declined or answer == 'decline'
+        words = set(text.split())
+        return accepted or bool(words & self.ACCEPT_WORDS), declined or bool(words & self.DECLINE_WORDS)
     
     def _approve_instantly(self, session_data):
         """Approve loan instantly"""
@@ -125,6 +208,40 @@ class UnderwritingAgent:
             }
         }
     
+    def _counter_offer(self, reason, session_data, max_amount, monthly_income, salary_verified):
+        """
+        Propose the largest approvable amount and its best tenure, found by inverting the EMI formula
+        against the EMI-to-income cap. Rejects when nothing above the product minimum fits.
+        """
+        offer_details = session_data.get('offer_details') or {}
+        pre_approved_limit = session_data.get('loan_application', {}).get('pre_approved_limit', 0)
+        max_emi = self.MAX_EMI_RATIO * monthly_income if monthly_income else None
+        terms = counter_offer(min(max_amount, 2 * pre_approved_limit), self.INTEREST_RATE,
+                              offer_details.get('tenure_max', self.DEFAULT_TENURE_MONTHS), max_emi=max_emi,
+                              default_tenure=self.DEFAULT_TENURE_MONTHS)
+        if terms is None:
+            return self._reject_application(reason, session_data)
+        
+        terms.update(reason=reason, salary_verified=salary_verified,
+                     requires_salary_slip=not salary_verified and terms['amount'] > pre_approved_limit)
+        requested = int(session_data.get('customer_data', {}).get('loan_amount', 0))
+        if terms['amount'] >= requested:
+            opening = (f"To keep your EMI within {self.MAX_EMI_RATIO:.0%} of your salary, I can approve the full "
+                       f"₹{terms['amount']:,} over a longer term:")
+        else:
+            opening = f"I can't approve ₹{requested:,} for your profile, but I can approve ₹{terms['amount']:,}:"
+        slip_note = " We'd just need your latest salary slip to confirm it." if terms['requires_salary_slip'] else ""
+        return {
+            'message': (f"{opening} {terms['tenure_months']} months at an EMI of ₹{terms['monthly_emi']:,.0f} "
+                       f"({terms['interest_rate']:.2f}% p.a.).{slip_note} Would you like to go ahead with this offer?"),
+            'agent': 'Underwriting Agent',
+            'counter_offer': terms,
+            'session_updates': {
+                'current_stage': 'counter_offer',
+                'counter_offer': terms
+            }
+        }
+    
     def _reject_application(self, reason, session_data):
         """Reject application with reason"""
         rejection_messages = {
@@ -159,6 +276,4 @@ class UnderwritingAgent:
     
     def _calculate_emi(self, principal, annual_rate, months):
         """Calculate EMI using standard formula"""
-        monthly_rate = annual_rate / 12
-        emi = principal * monthly_rate * ((1 + monthly_rate) ** months) / (((1 + monthly_rate) ** months) - 1)
-        return emi
\ No newline at end of file
+        return calculate_emi(principal, annual_rate, months)
\ No newline at end of file
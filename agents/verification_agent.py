@@ -1,13 +1,40 @@
+import hashlib
+import hmac
 import json
+import secrets
+import time
 from openai_client import get_agent_response
+from services.prefetch import take_prefetched
+
+# CRM columns copied into the session's customer data; the rest of the
+# record (loans, limits, ids) is not read after verification
+CRM_PROFILE_FIELDS = ('name', 'phone', 'email', 'city', 'monthly_income')
+
+# One-time code for customers matched by email and name under a new phone number
+CODE_TTL_SECONDS = 600
+MAX_CODE_ATTEMPTS = 3
+SKIP_WORDS = ('skip', 'new customer', 'no access')
+
+
+def _mask_email(email):
+    local, _, domain = email.partition('@')
+    return f"{local[:1]}***@{domain}"
+
+
+def _log_code(email, code):
+    # Stand-in for the e-mail service: the mock CRM has no outbound mail
+    print(f"Re-KYC code for {_mask_email(email)}: {code}")
 
 class VerificationAgent:
     """
     Verification Agent - Confirms KYC details from CRM server
     """
     
-    def __init__(self, crm_api):
+    def __init__(self, crm_api, pre_underwriting=None, send_code=None):
         self.crm_api = crm_api
+        self.pre_underwriting = pre_underwriting
+        # send_code(email, code) delivers the re-KYC code to the address on file
+        self.send_code = send_code or _log_code
     
     def verify_customer(self, session_data):
         """
@@ -15,35 +42,119 @@ class VerificationAgent:
         """
         customer_data = session_data.get('customer_data', {})
         
-        # Verify with CRM
-        verification_result = self.crm_api.verify_customer(customer_data)
+        # Known customers are served from the materialized pre-underwriting table
+        pre_underwriting = None
+        if self.pre_underwriting:
+            pre_underwriting = self.pre_underwriting.lookup(customer_data.get('phone'))
         
-        if verification_result['verified']:
-            # Customer found in CRM, update with additional data
-            customer_data.update(verification_result['customer_details'])
-            
-            return {
-                'message': (f"Great news! I've verified your details in our system. "
-                           f"I can see you're an existing customer with us. "
-                           f"Let me now check your eligibility and pre-approved loan offers..."),
-                'agent': 'Verification Agent',
-                'session_updates': {
-                    'customer_data': customer_data,
-                    'verification_status': 'verified',
-                    'current_stage': 'underwriting'
-                }
+        if pre_underwriting:
+            verification_result = {
+                'verified': True,
+                'customer_details': pre_underwriting['customer_details'],
+                'kyc_status': 'complete'
             }
         else:
-            # New customer, proceed with verification
-            # In real scenario, this would trigger KYC process
-            return {
-                'message': ("I don't see you as an existing customer, but that's perfectly fine! "
-                           "As a new customer, you're eligible for our special introductory rates. "
-                           "Let me check your eligibility and loan options..."),
-                'agent': 'Verification Agent',
-                'session_updates': {
-                    'customer_data': customer_data,
-                    'verification_status': 'new_customer',
-                    'current_stage': 'underwriting'
-                }
-            }
\ No newline at end of file
+            # Verify with CRM, reusing the lookup prefetched when the phone arrived
+            verification_result = take_prefetched(session_data, 'crm')
+            if verification_result is None:
+                verification_result = self.crm_api.verify_customer(customer_data)
+        
+        if verification_result['verified']:
+            return self._verified(customer_data, verification_result['customer_details'], pre_underwriting)
+        
+        # Phone not on file: an existing customer may have changed numbers. Email and
+        # name are typed in chat, so a match only counts once the customer proves
+        # access to the email on file
+        matched_customer = self.crm_api.match_customer(customer_data)
+        if matched_customer:
+            return self._start_reverification(matched_customer)
+        
+        return self._new_customer(customer_data)
+    
+    def confirm_identity(self, user_message, session_data):
+        """Check the re-KYC code a possible existing customer was sent (reverification stage)"""
+        customer_data = session_data.get('customer_data', {})
+        pending = session_data.get('reverification') or {}
+        
+        if not pending or time.time() > pending['expires_at']:
+            return self._new_customer(customer_data, "That code has expired, so I'll continue with you as a new customer. ")
+        if any(word in user_message.lower() for word in SKIP_WORDS):
+            return self._new_customer(customer_data)
+        
+        code = ''.join(ch for ch in user_message if ch.isdigit())
+        if hmac.compare_digest(self._code_digest(pending['salt'], code), pending['digest']):
+            matched_customer = self.crm_api.match_customer(customer_data)
+            if matched_customer and matched_customer['email'].lower() == pending['email']:
+                response = self._verified(customer_data, matched_customer, None, phone_changed=True)
+                response['session_updates']['reverification'] = None
+                return response
+            return self._new_customer(customer_data)
+        
+        attempts = pending['attempts'] + 1
+        if attempts >= MAX_CODE_ATTEMPTS:
+            return self._new_customer(customer_data, "That code didn't match, so I'll continue with you as a new customer. ")
+        return {
+            'message': (f"That code doesn't match. Please check the email sent to {_mask_email(pending['email'])} "
+                       f"and try again ({MAX_CODE_ATTEMPTS - attempts} attempts left), or type 'skip' to continue "
+                       f"as a new customer."),
+            'agent': 'Verification Agent',
+            'session_updates': {'reverification': dict(pending, attempts=attempts)}
+        }
+    
+    def _start_reverification(self, matched_customer):
+        email = matched_customer['email'].lower()
+        code = f"{secrets.randbelow(10 ** 6):06d}"
+        salt = secrets.token_hex(8)
+        self.send_code(email, code)
+        return {
+            'message': (f"It looks like you may already be a customer with us under a different phone number. "
+                       f"To confirm it's you, I've sent a 6-digit code to {_mask_email(email)}. "
+                       f"Please enter it here, or type 'skip' to continue as a new customer."),
+            'agent': 'Verification Agent',
+            'session_updates': {
+                'verification_status': 'reverification_pending',
+                'reverification': {'email': email, 'salt': salt, 'digest': self._code_digest(salt, code),
+                                   'expires_at': time.time() + CODE_TTL_SECONDS, 'attempts': 0},
+                'current_stage': 'reverification'
+            }
+        }
+    
+    def _code_digest(self, salt, code):
+        return hashlib.sha256(f"{salt}:{code}".encode('utf-8')).hexdigest()
+    
+    def _verified(self, customer_data, customer_details, pre_underwriting, phone_changed=False):
+        # Customer found in CRM, update with additional data (keeping a new phone number)
+        customer_data.update({field: customer_details[field] for field in CRM_PROFILE_FIELDS
+                              if field in customer_details and not (phone_changed and field == 'phone')})
+        
+        found_by = ("Thanks for confirming. I found your customer profile under your email address "
+                    "and will note your new number. " if phone_changed else "")
+        return {
+            'message': (f"Great news! I've verified your details in our system. {found_by}"
+                       f"I can see you're an existing customer with us. "
+                       f"Let me now check your eligibility and pre-approved loan offers..."),
+            'agent': 'Verification Agent',
+            'session_updates': {
+                'customer_data': customer_data,
+                'verification_status': 'verified',
+                'pre_underwriting': pre_underwriting,
+                'current_stage': 'underwriting'
+            }
+        }
+    
+    def _new_customer(self, customer_data, preface=""):
+        # New customer, proceed with verification
+        # In real scenario, this would trigger KYC process
+        return {
+            'message': (f"{preface}I don't see you as an existing customer, but that's perfectly fine! "
+                       "As a new customer, you're eligible for our special introductory rates. "
+                       "Let me check your eligibility and loan options..."),
+            'agent': 'Verification Agent',
+            'session_updates': {
+                'customer_data': customer_data,
+                'verification_status': 'new_customer',
+                'pre_underwriting': None,
+                'reverification': None,
+                'current_stage': 'underwriting'
+            }
+        }
\ No newline at end of file
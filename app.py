@@ -1,6 +1,7 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, abort
 from flask_socketio import SocketIO, emit
 from werkzeug.utils import secure_filename
+import atexit
 import json
 import os
 import sqlite3
@@ -19,9 +20,22 @@ from agents.underwriting_agent import UnderwritingAgent
 from agents.sanction_letter_agent import SanctionLetterAgent
 
 # ------------------ Mock APIs ------------------
-from mock_apis.crm_api import CRMApi
-from mock_apis.credit_bureau_api import CreditBureauApi
-from mock_apis.offer_mart_api import OfferMartApi
+from services.api_client import create_backend_apis
+
+# ------------------ Services ------------------
+from services.pre_underwriting import PreUnderwritingTable
+from services.prefetch import BackendPrefetcher
+from services.admission import ServerBusyError, TokenBucketLimiter, llm_metrics
+from services.local_broker import LocalBrokerManager
+from services.event_log import create_event_log
+from services.funnel_stats import FunnelStats
+from services.assets import AssetPipeline
+from services.model_policy import policy as model_policy
+from services.profiling import HandlerProfiler
+from services.session_model import MessageType, Session
+from services.session_store import SessionStore
+from services.loan_math import LoanQuoter, QuoteError
+from services.dispatcher import SessionDispatcher
 
 # ------------------ OpenAI Setup ------------------
 import openai
@@ -37,16 +51,41 @@ openai.api_key = OPENAI_API_KEY
 # ------------------ Flask App ------------------
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SESSION_SECRET', 'dev-secret-key')
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+def _socketio_options():
+    """Async mode and message queue come from the environment so workers can scale out"""
+    options = {'cors_allowed_origins': "*"}
+    async_mode = os.environ.get('SOCKETIO_ASYNC_MODE')
+    if async_mode:
+        options['async_mode'] = async_mode
+    message_queue = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    if message_queue and message_queue.startswith('local://'):
+        options['client_manager'] = LocalBrokerManager(message_queue)
+    elif message_queue:
+        # redis:// or amqp:// URLs are handled by Flask-SocketIO itself
+        options['message_queue'] = message_queue
+    return options
+
+socketio = SocketIO(app, **_socketio_options())
 
 # ------------------ Initialize mock APIs ------------------
-crm_api = CRMApi()
-credit_bureau_api = CreditBureauApi()
-offer_mart_api = OfferMartApi()
+# In-process by default; MOCK_API_MODE=http talks to mock_apis.http_service through one pooled client
+crm_api, credit_bureau_api, offer_mart_api, api_client = create_backend_apis()
+pre_underwriting_table = PreUnderwritingTable(
+    crm_api, credit_bureau_api, offer_mart_api,
+    max_age_seconds=int(os.environ.get('PRE_UNDERWRITING_MAX_AGE_SECONDS', 86400))
+)
+prefetcher = BackendPrefetcher(
+    crm_api, credit_bureau_api, offer_mart_api, pre_underwriting=pre_underwriting_table
+)
+
+# ------------------ Loan calculator ------------------
+# What-if EMI grids for the frontend sliders, computed without any agent or LLM call
+loan_quoter = LoanQuoter(offer_mart_api)
 
 # ------------------ Initialize agents ------------------
-sales_agent = SalesAgent()
-verification_agent = VerificationAgent(crm_api)
+sales_agent = SalesAgent(get_loan_products=offer_mart_api.get_loan_products)
+verification_agent = VerificationAgent(crm_api, pre_underwriting=pre_underwriting_table)
 underwriting_agent = UnderwritingAgent(credit_bureau_api, offer_mart_api)
 sanction_letter_agent = SanctionLetterAgent()
 
@@ -54,16 +93,78 @@ master_agent = MasterAgent(
     sales_agent=sales_agent,
     verification_agent=verification_agent,
     underwriting_agent=underwriting_agent,
-    sanction_letter_agent=sanction_letter_agent
+    sanction_letter_agent=sanction_letter_agent,
+    prefetcher=prefetcher
 )
 
-# ------------------ Active sessions ------------------
-active_sessions = {}
+# ------------------ Event log ------------------
+# Turns, stage transitions and decisions are persisted by a background writer
+event_log = create_event_log()
+if event_log:
+    master_agent.add_stage_listener(event_log.record_stage_transition)
+    atexit.register(event_log.close)
+
+# ------------------ Funnel stats ------------------
+# Counters updated on every stage change, so /stats never scans sessions or logs
+funnel_stats = FunnelStats()
+master_agent.add_stage_listener(funnel_stats.record_stage_transition)
+
+# ------------------ Sessions ------------------
+# Keyed by a token the browser keeps, so reconnects resume; idle sessions expire
+session_store = SessionStore()
+
+def _expire_session(token, session, sid):
+    dispatcher.cancel(session.session_id)
+    prefetcher.cancel(session)
+    funnel_stats.session_ended(session)
+    if event_log:
+        event_log.record('session_ended', session.session_id, stage=session.current_stage, reason='idle')
+    if sid is not None:
+        socketio.server.disconnect(sid, namespace='/')
+
+session_store.expire_listeners.append(_expire_session)
+
+# ------------------ Turn dispatcher ------------------
+# Turns run on a worker pool, in order per session and in parallel across sessions
+dispatcher = SessionDispatcher()
+
+def _merge_messages(pending, message):
+    """Messages sent while an earlier turn is still running are answered together"""
+    return f"{pending}\n{message}"
+
+# ------------------ Profiling ------------------
+# Off unless PROFILING_ENABLED=1; then every PROFILE_EVERY_N-th turn is profiled
+profiler = HandlerProfiler()
+
+def _turn_stage(token, session, *args):
+    return session.current_stage
+
+def _require_admin():
+    """Admin endpoints exist only when ADMIN_TOKEN is set, and require it in X-Admin-Token"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token or request.headers.get('X-Admin-Token') != token:
+        abort(404)
+
+# ------------------ Admission control ------------------
+socket_rate_limiter = TokenBucketLimiter(
+    rate=float(os.environ.get('SOCKET_RATE_PER_SECOND', 1.0)),
+    burst=int(os.environ.get('SOCKET_RATE_BURST', 5))
+)
+BUSY_MESSAGE = ("We're experiencing unusually high demand right now. "
+                "Please give me a moment and send your message again.")
+ERROR_MESSAGE = ("I'm sorry, something went wrong on our side while handling that. "
+                 "Please send your message again.")
+
+# ------------------ Static assets ------------------
+# Hashed, precompressed CSS/JS under /assets; index.html is rendered once per process
+asset_pipeline = AssetPipeline(app.static_folder)
+asset_pipeline.init_app(app)
+asset_pipeline.load()
 
 # ------------------ Routes ------------------
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return asset_pipeline.page_response('index', lambda: render_template('index.html'))
 
 @app.route('/download_sanction_letter/<filename>')
 def download_sanction_letter(filename):
@@ -75,18 +176,103 @@ def download_sanction_letter(filename):
         return "File not found", 404
     return send_file(filepath, as_attachment=True)
 
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'llm': llm_metrics(),
+        'models': model_policy(),
+        'answer_cache': sales_agent.answer_cache.metrics(),
+        'sales_turns': sales_agent.turn_stats,
+        'quotes': loan_quoter.metrics(),
+        'bureau_snapshot': credit_bureau_api.snapshot_metrics() if api_client is None else None,
+        'backend_api': api_client.metrics() if api_client else None,
+        'socket_rate_limit': socket_rate_limiter.metrics(),
+        'event_log': event_log.metrics() if event_log else None,
+        'sessions': session_store.metrics(),
+        'dispatcher': dispatcher.metrics()
+    })
+
+@app.route('/api/quote')
+def quote():
+    # A customer's own offer only for their verified chat session (resume token in
+    # X-Session-Token); such responses must not land in shared caches
+    phone = None
+    session_token = request.headers.get('X-Session-Token')
+    if session_token:
+        session = session_store.find(session_token)
+        if session is None or session.get('verification_status') != 'verified':
+            return jsonify({'error': 'session not found or not verified'}), 403
+        phone = session.get('customer_data', {}).get('phone')
+    try:
+        body = loan_quoter.quote(request.args, phone=phone)
+    except QuoteError as e:
+        return jsonify({'error': str(e)}), 400
+    cache_control = 'private, no-store' if session_token else 'public, max-age=300'
+    return Response(body, content_type='application/json',
+                    headers={'Cache-Control': cache_control, 'Vary': 'X-Session-Token'})
+
+@app.route('/stats')
+def stats():
+    return jsonify(funnel_stats.snapshot())
+
+@app.route('/admin/customers/search')
+def admin_search_customers():
+    _require_admin()
+    return jsonify(crm_api.search_customers(
+        request.args.get('q', ''),
+        page=request.args.get('page', 1, type=int),
+        per_page=request.args.get('per_page', 20, type=int),
+        fuzzy=request.args.get('fuzzy', '1') != '0'
+    ))
+
+@app.route('/admin/profiles', methods=['GET', 'POST'])
+def admin_profiles():
+    _require_admin()
+    if request.method == 'POST':
+        # Change the sampling rate at runtime; 0 pauses sampling
+        try:
+            every_n = int((request.get_json(silent=True) or {}).get('every_n', profiler.every_n))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'every_n must be a whole number'}), 400
+        if every_n < 0:
+            return jsonify({'error': 'every_n must not be negative'}), 400
+        profiler.every_n = every_n
+    return jsonify({'config': profiler.config(), 'profiles': profiler.list_profiles()})
+
+@app.route('/admin/profiles/<name>')
+def admin_download_profile(name):
+    _require_admin()
+    path = profiler.profile_path(name)
+    if not path:
+        return "File not found", 404
+    return send_file(path, as_attachment=True)
+
 # ------------------ SocketIO Events ------------------
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
+    token = (auth or {}).get('token')
+    session = session_store.resume(request.sid, token) if token else None
+    if session:
+        # Reconnect: replay the stored history, no agent is called again
+        emit('session_restored', {
+            'token': token,
+            'stage': session.current_stage,
+            'history': session.conversation_history.to_wire()
+        })
+        if event_log:
+            event_log.record('session_resumed', session.session_id, stage=session.current_stage)
+        return
+
     session_id = str(uuid.uuid4())
-    active_sessions[request.sid] = {
-        'session_id': session_id,
-        'conversation_history': [],
-        'customer_data': {},
-        'loan_application': {},
-        'current_stage': 'initial'
-    }
+    session = Session(session_id=session_id)
+    token = session_store.create(request.sid, session)
+    funnel_stats.session_started(session)
+    if event_log:
+        event_log.record('session_started', session_id)
     welcome_message = master_agent.start_conversation()
+    session.conversation_history.add(MessageType.BOT, welcome_message, 'Master Agent')
+    session_store.save(token)
+    emit('session_token', {'token': token})
     emit('bot_message', {
         'message': welcome_message,
         'timestamp': datetime.now().isoformat(),
@@ -95,87 +281,126 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    active_sessions.pop(request.sid, None)
+    # The session stays resumable until it has been idle for the TTL
+    socket_rate_limiter.forget(request.sid)
+    session_store.detach(request.sid)
 
 @socketio.on('user_message')
 def handle_user_message(data):
-    if request.sid not in active_sessions:
+    session = session_store.get(request.sid)
+    if session is None:
+        return
+    if not socket_rate_limiter.allow(request.sid):
+        _send_busy_response()
         return
-    session = active_sessions[request.sid]
     user_message = data['message']
 
     # Add user message to history
-    session['conversation_history'].append({
-        'type': 'user',
-        'message': user_message,
-        'timestamp': datetime.now().isoformat()
-    })
+    session.conversation_history.add(MessageType.USER, user_message)
+    if event_log:
+        event_log.record_turn(session, 'user', user_message)
 
-    # Process via master agent
-    response = master_agent.process_message(
-        user_message=user_message,
-        session_data=session
-    )
+    token = session_store.token_for(request.sid)
+    if not dispatcher.submit(session.session_id, lambda message: _run_user_turn(token, session, message),
+                             user_message, kind='user_message', merge=_merge_messages,
+                             on_error=lambda e: _send_error_response(token)):
+        _send_busy_response()
 
-    # Add bot response to history
-    session['conversation_history'].append({
-        'type': 'bot',
-        'message': response['message'],
-        'agent': response['agent'],
-        'timestamp': datetime.now().isoformat()
-    })
+@socketio.on('file_upload')
+def handle_file_upload(data):
+    session = session_store.get(request.sid)
+    if session is None:
+        return
+    if not socket_rate_limiter.allow(request.sid):
+        _send_busy_response()
+        return
 
-    # Update session with any updates
-    session.update(response.get('session_updates', {}))
+    token = session_store.token_for(request.sid)
+    if not dispatcher.submit(session.session_id, lambda upload: _run_file_upload(token, session, upload),
+                             {'file_data': data['file_data'], 'file_type': data['file_type']}, kind='file_upload',
+                             on_error=lambda e: _send_error_response(token)):
+        _send_busy_response()
 
-    emit('bot_message', {
+@profiler.profiled('user_message', _turn_stage)
+def _run_user_turn(token, session, user_message):
+    """Worker side of a user message"""
+    # Process via master agent, chaining any stages that need no user input
+    try:
+        responses = master_agent.process_turn(
+            user_message=user_message,
+            session_data=session
+        )
+    except ServerBusyError:
+        _send_busy_response(token)
+        return
+
+    for response in responses:
+        _send_bot_response(token, session, response)
+    session_store.save(token)
+
+@profiler.profiled('file_upload', _turn_stage)
+def _run_file_upload(token, session, upload):
+    """Worker side of a salary slip upload"""
+    # Process file through underwriting agent
+    response = underwriting_agent.process_salary_slip(upload['file_data'], upload['file_type'], session)
+
+    # Update session
+    master_agent.apply_updates(session, response.get('session_updates', {}))
+
+    # If the loan was approved, the sanction letter is generated in the same turn
+    responses = [response] + master_agent.run_auto_stages(session, response)
+
+    for response in responses:
+        _send_bot_response(token, session, response)
+    session_store.save(token)
+
+def _emit_to_session(token, event, data):
+    """Emit to whichever socket the session is attached to now; skipped while it is disconnected"""
+    sid = session_store.sid_for(token)
+    if sid is not None:
+        socketio.emit(event, data, to=sid)
+
+def _send_bot_response(token, session, response):
+    """Record an agent response in the session history and push it to the client"""
+    session.conversation_history.add(MessageType.BOT, response['message'], response['agent'])
+    if event_log:
+        event_log.record_turn(session, 'bot', response['message'], agent=response['agent'])
+
+    _emit_to_session(token, 'bot_message', {
         'message': response['message'],
         'timestamp': datetime.now().isoformat(),
         'agent': response['agent'],
         'requires_upload': response.get('requires_upload', False),
         'loan_approved': response.get('loan_approved', False),
-        'sanction_letter_url': response.get('sanction_letter_url')
+        'sanction_letter_url': response.get('sanction_letter_url'),
+        'counter_offer': response.get('counter_offer')
     })
 
-@socketio.on('file_upload')
-def handle_file_upload(data):
-    if request.sid not in active_sessions:
-        return
-    session = active_sessions[request.sid]
-    file_data = data['file_data']
-    file_type = data['file_type']
-
-    # Process file through underwriting agent
-    response = underwriting_agent.process_salary_slip(file_data, file_type, session)
-
-    # Update session
-    session.update(response.get('session_updates', {}))
-
-    # Check if loan was approved and we should move to sanction letter stage
-    if response.get('session_updates', {}).get('current_stage') == 'sanction_letter':
-        # Generate sanction letter immediately
-        sanction_response = sanction_letter_agent.generate_sanction_letter(session)
-        # Update session with sanction letter updates
-        session.update(sanction_response.get('session_updates', {}))
-        
-        emit('bot_message', {
-            'message': sanction_response['message'],
-            'timestamp': datetime.now().isoformat(),
-            'agent': sanction_response['agent'],
-            'loan_approved': sanction_response.get('loan_approved', False),
-            'sanction_letter_url': sanction_response.get('sanction_letter_url')
-        })
+def _send_busy_response(token=None):
+    """Tell the client its message was shed under load; from a worker, token names the session"""
+    payload = {
+        'message': BUSY_MESSAGE,
+        'timestamp': datetime.now().isoformat(),
+        'agent': 'Master Agent',
+        'busy': True
+    }
+    if token is None:
+        emit('bot_message', payload)
     else:
-        emit('bot_message', {
-            'message': response['message'],
-            'timestamp': datetime.now().isoformat(),
-            'agent': 'Underwriting Agent',
-            'loan_approved': response.get('loan_approved', False),
-            'sanction_letter_url': response.get('sanction_letter_url')
-        })
+        _emit_to_session(token, 'bot_message', payload)
 
-# ------------------ Main ------------------
-if __name__ == '__main__':
+def _send_error_response(token):
+    """Answer a turn whose job raised, so the client is never left waiting on the typing indicator"""
+    _emit_to_session(token, 'bot_message', {
+        'message': ERROR_MESSAGE,
+        'timestamp': datetime.now().isoformat(),
+        'agent': 'Master Agent',
+        'error': True
+    })
+
+# ------------------ Startup ------------------
+def bootstrap():
+    """Prepare directories, the database and background jobs. Safe to call once per worker."""
     # Ensure directories exist
     os.makedirs('sanction_letters', exist_ok=True)
     os.makedirs('templates', exist_ok=True)
@@ -183,7 +408,27 @@ if __name__ == '__main__':
     os.makedirs('agents', exist_ok=True)
     os.makedirs('mock_apis', exist_ok=True)
 
+    # Build hashed assets if the deploy step did not
+    if not asset_pipeline.manifest:
+        asset_pipeline.build()
+
     # Initialize database
     crm_api.initialize_database()
 
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, use_reloader=False, log_output=False)
+    # Materialize pre-underwriting results for known customers; under gunicorn every
+    # worker starts the scheduler, but only the one holding the refresh lock runs it
+    pre_underwriting_table.initialize_table()
+    pre_underwriting_table.start_scheduler(
+        interval_seconds=int(os.environ.get('PRE_UNDERWRITING_REFRESH_SECONDS', 3600))
+    )
+
+    # Expire idle sessions; each worker sweeps the sessions it holds in memory
+    session_store.start_sweeper()
+
+# ------------------ Main ------------------
+if __name__ == '__main__':
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
+    bootstrap()
+
+    socketio.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True,
+                 use_reloader=False, log_output=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,137 @@
+"""
+Load-test the back-end I/O pattern against the mock APIs served over HTTP.
+
+    python -m benchmarks.bench_backends [--sessions 500] [--latency-ms 30] [--jitter-ms 20] [--error-rate 0.01]
+
+Starts mock_apis.http_service in a separate process with the given injected
+latency and faults. Each simulated session then makes the prefetch fan-out
+(CRM lookup, bureau score and offer at once) through one shared ApiClient.
+The run is repeated with keep-alive disabled and with the three calls made
+one after another, so the effect of pooling and fan-out shows up directly.
+The bureau's own simulated round trip is turned off to isolate the network
+path.
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import REPO_ROOT, percentile
+from mock_apis.http_service import SERVICES
+from services.api_client import ApiClient, RemoteApi
+
+
+def _session_calls(apis, i):
+    phone = '98765432' + str(10 + i % 12)
+    return [
+        (apis['crm'], 'verify_customer', ({'phone': phone},)),
+        (apis['credit_bureau'], 'get_credit_score', (phone,)),
+        (apis['offer_mart'], 'get_offer', ({'phone': phone, 'monthly_income': 60000},))
+    ]
+
+
+def run_scenario(urls, sessions, concurrency, fan_out, keepalive):
+    client = ApiClient(max_connections=concurrency * 3, keepalive=keepalive)
+    apis = {name: RemoteApi(client, url, SERVICES[name][1]) for name, url in urls.items()}
+
+    def one_session(i):
+        started = time.perf_counter()
+        calls = _session_calls(apis, i)
+        if fan_out:
+            futures = [api.submit(name, *args) for api, name, args in calls]
+            outcomes = []
+            for future in futures:
+                try:
+                    future.result()
+                    outcomes.append(True)
+                except Exception:
+                    outcomes.append(False)
+        else:
+            outcomes = []
+            for api, name, args in calls:
+                try:
+                    getattr(api, name)(*args)
+                    outcomes.append(True)
+                except Exception:
+                    outcomes.append(False)
+        return time.perf_counter() - started, all(outcomes)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one_session, range(sessions)))
+    elapsed = time.perf_counter() - started
+    client_metrics = client.metrics()
+    client.close()
+
+    latencies = [latency for latency, _ in results]
+    return {
+        'sessions_per_sec': round(sessions / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'failed_sessions': sum(1 for _, ok in results if not ok),
+        'retries': client_metrics['retries']
+    }
+
+
+def _wait_until_up(urls, timeout=30):
+    deadline = time.time() + timeout
+    for url in urls:
+        while True:
+            try:
+                urllib.request.urlopen(f'{url}/health', timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"{url} did not come up")
+                time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8, help='sessions in flight')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--base-port', type=int, default=18101, help='services use this port and the next two')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    # The CRM service creates its database in its working directory
+    directory = tempfile.mkdtemp(prefix='bench_backends_')
+    services = subprocess.Popen(
+        [sys.executable, '-m', 'mock_apis.http_service', 'all', '--port', str(args.base_port),
+         '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+         '--error-rate', str(args.error_rate), '--bureau-round-trip-seconds', '0'],
+        cwd=directory, env={'PYTHONPATH': REPO_ROOT, 'PATH': ''}, stdout=subprocess.DEVNULL
+    )
+    urls = {name: f'http://127.0.0.1:{args.base_port + offset}' for offset, name in enumerate(SERVICES)}
+    try:
+        _wait_until_up(urls.values())
+        results = {}
+        for label, fan_out, keepalive in (('fan-out, pooled', True, True),
+                                          ('fan-out, no keep-alive', True, False),
+                                          ('sequential, pooled', False, True)):
+            results[label] = run_scenario(urls, args.sessions, args.concurrency, fan_out, keepalive)
+            result = results[label]
+            print(f"{label:<24} {result['sessions_per_sec']:>8.1f} sessions/s  p50 {result['p50_ms']:.1f}ms  "
+                  f"p95 {result['p95_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms  "
+                  f"failed {result['failed_sessions']}  retries {result['retries']}")
+    finally:
+        services.terminate()
+        services.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Compare how many concurrent Socket.IO connections one instance holds in the
+development server (threading) and the production server (gunicorn + gevent).
+
+    python -m benchmarks.bench_connections --levels 100,500,1000 --hold 10
+
+Each level opens that many websocket clients at once, waits for the welcome
+bot_message, holds the connections open while answering pings, and records
+how many were established, connect-to-welcome latency and server memory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+from benchmarks.common import REPO_ROOT, percentile
+
+MODES = {
+    'dev': {
+        'command': [sys.executable, 'app.py'],
+        'env': {'SOCKETIO_ASYNC_MODE': 'threading'}
+    },
+    'prod': {
+        'command': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        'env': {}
+    }
+}
+
+
+def raise_fd_limit():
+    """Every client needs a file descriptor on both ends"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and its children (Linux only)"""
+    pids = [pid]
+    try:
+        children = subprocess.run(['pgrep', '-P', str(pid)], capture_output=True, text=True).stdout.split()
+        pids.extend(int(child) for child in children)
+    except FileNotFoundError:
+        pass
+
+    total_kb = 0
+    for child_pid in pids:
+        try:
+            with open(f'/proc/{child_pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            pass
+    return total_kb / 1024
+
+
+def start_server(mode, port, workers=1):
+    env = dict(os.environ)
+    env.update(MODES[mode]['env'])
+    env['PORT'] = str(port)
+    env.setdefault('OPENAI_API_KEY', 'benchmark')
+    if mode == 'prod':
+        env['WEB_CONCURRENCY'] = str(workers)
+        if workers > 1:
+            env.setdefault('SOCKETIO_MESSAGE_QUEUE', 'local://127.0.0.1:6380')
+    process = subprocess.Popen(MODES[mode]['command'], cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        # Wait until a worker actually serves requests, not just until the port is bound
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.25)
+    stop_server(process)
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=15)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def hold_client(url, hold_seconds, welcome_timeout):
+    """One Engine.IO v4 websocket client. Returns connect-to-welcome latency or None."""
+    started = time.perf_counter()
+    try:
+        async with websockets.connect(url, open_timeout=welcome_timeout, ping_interval=None,
+                                      max_queue=None) as ws:
+            # Engine.IO open packet, then connect to the default namespace
+            await asyncio.wait_for(ws.recv(), welcome_timeout)
+            await ws.send('40')
+
+            latency = None
+            deadline = time.perf_counter() + welcome_timeout
+            while latency is None:
+                packet = await asyncio.wait_for(ws.recv(), max(0.01, deadline - time.perf_counter()))
+                if packet == '2':
+                    await ws.send('3')
+                elif packet.startswith('42') and 'bot_message' in packet:
+                    latency = time.perf_counter() - started
+
+            hold_until = time.perf_counter() + hold_seconds
+            while time.perf_counter() < hold_until:
+                try:
+                    packet = await asyncio.wait_for(ws.recv(), hold_until - time.perf_counter())
+                    if packet == '2':
+                        await ws.send('3')
+                except asyncio.TimeoutError:
+                    break
+            return latency
+    except Exception:
+        return None
+
+
+async def run_level(port, connections, hold_seconds, welcome_timeout):
+    url = f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket"
+    tasks = [hold_client(url, hold_seconds, welcome_timeout) for _ in range(connections)]
+    return await asyncio.gather(*tasks)
+
+
+def bench_mode(mode, port, levels, hold_seconds, welcome_timeout, workers=1):
+    results = []
+    process = start_server(mode, port, workers)
+    try:
+        for connections in levels:
+            rss_task = {'peak': 0.0}
+
+            async def sample_rss():
+                while True:
+                    rss_task['peak'] = max(rss_task['peak'], process_tree_rss_mb(process.pid))
+                    await asyncio.sleep(0.5)
+
+            async def level():
+                sampler = asyncio.create_task(sample_rss())
+                try:
+                    return await run_level(port, connections, hold_seconds, welcome_timeout)
+                finally:
+                    sampler.cancel()
+
+            latencies = asyncio.run(level())
+            ok = [latency for latency in latencies if latency is not None]
+            result = {
+                'mode': mode,
+                'workers': workers if mode == 'prod' else 1,
+                'connections': connections,
+                'established': len(ok),
+                'failed': connections - len(ok),
+                'welcome_p50_ms': round(percentile(ok, 50) * 1000, 1),
+                'welcome_p95_ms': round(percentile(ok, 95) * 1000, 1),
+                'peak_rss_mb': round(rss_task['peak'], 1)
+            }
+            results.append(result)
+            print(f"{mode:>5} {connections:>6} conns: {result['established']:>6} ok, {result['failed']:>5} failed, "
+                  f"welcome p50 {result['welcome_p50_ms']:>8} ms, p95 {result['welcome_p95_ms']:>8} ms, "
+                  f"peak RSS {result['peak_rss_mb']} MB")
+            if process.poll() is not None:
+                print(f"{mode} server exited; stopping this mode")
+                break
+    finally:
+        stop_server(process)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='dev,prod', help='comma-separated: dev, prod')
+    parser.add_argument('--levels', default='100,500,1000,2000', help='comma-separated connection counts')
+    parser.add_argument('--hold', type=float, default=10.0, help='seconds to hold each level open')
+    parser.add_argument('--welcome-timeout', type=float, default=30.0)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers for prod mode')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    levels = [int(level) for level in args.levels.split(',')]
+    results = []
+    for mode in args.modes.split(','):
+        results.extend(bench_mode(mode.strip(), args.port, levels, args.hold, args.welcome_timeout,
+                                  workers=args.workers))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
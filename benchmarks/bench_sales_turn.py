@@ -0,0 +1,95 @@
+"""
+Compare the combined sales turn (one structured call for intent, extracted
+info and reply) against the three-call flow (intent, extraction, reply).
+
+    GEMINI_API_KEY=... python -m benchmarks.bench_sales_turn [--limit 20]
+
+Both modes replay the sample user messages through SalesAgent with their own
+session, so customer data accumulates the same way it does in a chat. Calls
+and tokens come from gemini_client.token_usage.
+"""
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.common import load_sample_messages, percentile, timed
+
+
+def run_mode(mode, messages):
+    import gemini_client
+    from agents.sales_agent import SalesAgent
+    from services.answer_cache import AnswerCache
+
+    # The answer cache would hide the calls being compared
+    agent = SalesAgent(turn_mode='combined' if mode == 'combined' else 'separate',
+                       answer_cache=AnswerCache(enabled=False))
+    session = {'conversation_history': [], 'customer_data': {}, 'current_stage': 'sales_pitch'}
+    latencies = []
+    calls = []
+    tokens = []
+
+    for message in messages:
+        before = dict(gemini_client.token_usage)
+
+        def turn():
+            if mode == 'three_call':
+                # The intent call the sales stage used to make before every reply
+                raw = gemini_client.analyze_conversation_intent(session['conversation_history'], message)
+                try:
+                    intent_data = json.loads(raw)
+                except (TypeError, ValueError):
+                    intent_data = {'intent': 'inquiry'}
+            else:
+                intent_data = {'intent': 'inquiry'}
+            return agent.handle_sales_conversation(message, session, intent_data)
+
+        response, elapsed = timed(turn)
+        after = gemini_client.token_usage
+        latencies.append(elapsed)
+        calls.append(after['calls'] - before['calls'])
+        tokens.append((after['prompt_tokens'] - before['prompt_tokens'])
+                      + (after['output_tokens'] - before['output_tokens']))
+
+        session['conversation_history'].append({'role': 'user', 'message': message})
+        session['conversation_history'].append({'role': 'bot', 'message': response['message']})
+        session.update(response.get('session_updates', {}))
+        if session['current_stage'] != 'sales_pitch':
+            # Start the next customer from scratch
+            session = {'conversation_history': [], 'customer_data': {}, 'current_stage': 'sales_pitch'}
+
+    return {
+        'mode': mode,
+        'turns': len(messages),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'calls_per_turn': round(sum(calls) / len(calls), 2),
+        'tokens_per_turn': round(sum(tokens) / len(tokens), 1),
+        'fallbacks': agent.turn_stats['fallback']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limit', type=int, default=20, help='number of sample messages to replay')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    if not os.environ.get('GEMINI_API_KEY'):
+        sys.exit("GEMINI_API_KEY is required: this benchmark calls the real model")
+
+    messages = load_sample_messages()[:args.limit]
+    results = [run_mode(mode, messages) for mode in ('three_call', 'combined')]
+
+    for result in results:
+        print(f"{result['mode']:>10}: p50 {result['p50_ms']:>8} ms, p95 {result['p95_ms']:>8} ms, "
+              f"{result['calls_per_turn']} calls/turn, {result['tokens_per_turn']} tokens/turn, "
+              f"{result['fallbacks']} fallbacks")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-session memory of the dict sessions versus services.session_model.Session.
+
+    python -m benchmarks.bench_session_memory [--sessions 10000] [--turns 12]
+
+Builds the given number of sessions that look like a completed conversation
+(customer data, loan application, decision fields and a history of the given
+number of turns), measured with tracemalloc in both representations.
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from datetime import datetime
+
+from services.session_model import MessageType, Session
+
+AGENTS = ['Master Agent', 'Sales Agent', 'Sales Agent', 'Verification Agent', 'Underwriting Agent',
+          'Sanction Letter Agent']
+
+
+def _customer_data(i):
+    # Parsed from JSON, as the extraction step produces it: fresh key strings per session
+    return json.loads(json.dumps({
+        'name': f'Customer {i}', 'phone': str(9000000000 + i), 'email': f'customer{i}@email.com',
+        'city': 'Mumbai', 'monthly_income': 65000, 'loan_amount': 300000, 'loan_purpose': 'wedding'
+    }))
+
+
+def _messages(i, turns):
+    return [(f'user message {i}-{turn} asking about rates', f'bot reply {i}-{turn} with details',
+             AGENTS[turn % len(AGENTS)]) for turn in range(turns)]
+
+
+def build_dict_session(i, turns):
+    session = {
+        'session_id': f'session-{i}',
+        'conversation_history': [],
+        'customer_data': _customer_data(i),
+        'loan_application': {'requested_amount': 300000, 'pre_approved_limit': 400000, 'credit_score': 760},
+        'current_stage': 'completed',
+        'verification_status': 'verified',
+        'approval_status': 'approved',
+        'approval_type': 'instant'
+    }
+    for user_message, bot_message, agent in _messages(i, turns):
+        session['conversation_history'].append({'type': 'user', 'message': user_message,
+                                                'timestamp': datetime.now().isoformat()})
+        session['conversation_history'].append({'type': 'bot', 'message': bot_message, 'agent': agent,
+                                                'timestamp': datetime.now().isoformat()})
+    return session
+
+
+def build_slotted_session(i, turns):
+    session = Session(session_id=f'session-{i}')
+    session.update({
+        'customer_data': _customer_data(i),
+        'loan_application': {'requested_amount': 300000, 'pre_approved_limit': 400000, 'credit_score': 760},
+        'current_stage': 'completed',
+        'verification_status': 'verified',
+        'approval_status': 'approved',
+        'approval_type': 'instant'
+    })
+    for user_message, bot_message, agent in _messages(i, turns):
+        session.conversation_history.add(MessageType.USER, user_message)
+        session.conversation_history.add(MessageType.BOT, bot_message, agent)
+    return session
+
+
+def measure(build, sessions, turns):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = [build(i, turns) for i in range(sessions)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return (after - before) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--turns', type=int, default=12)
+    args = parser.parse_args()
+
+    dict_bytes = measure(build_dict_session, args.sessions, args.turns)
+    slotted_bytes = measure(build_slotted_session, args.sessions, args.turns)
+    print(f"dict sessions:    {dict_bytes:10.0f} bytes/session")
+    print(f"slotted sessions: {slotted_bytes:10.0f} bytes/session ({slotted_bytes / dict_bytes:.0%} of dict)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import math
+import os
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'data')
+
+
+def load_sample_messages(path=None):
+    """User messages from sample_conversations.txt, in order"""
+    path = path or os.path.join(REPO_ROOT, 'sample_conversations.txt')
+    messages = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('User:'):
+                messages.append(line[len('User:'):].strip())
+    return messages
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(func, *args, **kwargs):
+    """Call func and return (result, elapsed seconds)"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
@@ -0,0 +1,152 @@
+"""
+Evaluate the local intent classifier against LLM labels.
+
+    python -m benchmarks.eval_intent [--refresh] [--threshold 0.7]
+
+LLM labels are fetched once through gemini_client.analyze_conversation_intent
+and cached in benchmarks/data/intent_llm_labels.json; --refresh re-labels.
+"""
+import argparse
+import json
+import os
+from collections import Counter
+
+from benchmarks.common import DATA_DIR, load_sample_messages, percentile, timed
+from services.intent_classifier import IntentClassifier
+
+LABELS_PATH = os.path.join(DATA_DIR, 'intent_llm_labels.json')
+
+# Extra messages covering every label, including typos and mixed intents
+EXTRA_MESSAGES = [
+    "Hello there",
+    "Good morning!",
+    "What is the interest rate on personal loans?",
+    "Do I need any collateral for this?",
+    "How long does approval take?",
+    "Am I eligible for a pre-approved offer?",
+    "Whats the intrest rate",
+    "My name is Priya Sharma",
+    "You can reach me at 9876543211",
+    "priya.sharma@email.com is my email",
+    "I live in Pune and earn 75000 a month",
+    "I want to borrow 5 lakhs for my wedding",
+    "Need ₹3,00,000 for medical expenses",
+    "Can I take it for 48 months?",
+    "Yes please verify my details",
+    "Okay, proceed",
+    "I have uploaded my salary slip",
+    "Where do I attach the payslip?",
+    "That rate seems too high",
+    "I'm not sure, let me think about it",
+    "Are there any hidden charges?",
+    "Another bank is offering me a cheaper loan",
+    "Thanks a lot, bye!",
+    "That's all for now, thank you",
+]
+
+
+def label_with_llm(messages):
+    """Label messages with the LLM, recording per-call latency"""
+    from gemini_client import analyze_conversation_intent
+
+    labels = {}
+    for message in messages:
+        response, elapsed = timed(analyze_conversation_intent, [], message)
+        try:
+            intent = json.loads(response).get('intent')
+        except (TypeError, ValueError):
+            intent = None
+        labels[message] = {'intent': intent, 'latency_s': elapsed}
+        print(f"  {intent or 'ERROR':>16}  {elapsed * 1000:7.0f} ms  {message}")
+    return labels
+
+
+def load_labels(messages, refresh=False):
+    """Load cached LLM labels, fetching any that are missing"""
+    labels = {}
+    if os.path.exists(LABELS_PATH) and not refresh:
+        with open(LABELS_PATH, encoding='utf-8') as f:
+            labels = json.load(f)
+
+    missing = [message for message in messages if message not in labels]
+    if missing:
+        print(f"Labelling {len(missing)} messages with the LLM...")
+        labels.update(label_with_llm(missing))
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(LABELS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(labels, f, indent=2, ensure_ascii=False)
+
+    return labels
+
+
+def evaluate(messages, labels, threshold, repeats=200):
+    """Score the local classifier and the local+LLM fallback policy"""
+    classifier = IntentClassifier(threshold=threshold)
+    local_latencies = []
+    correct = 0
+    escalated = 0
+    escalated_wrong = 0
+    confusion = Counter()
+
+    labelled = [message for message in messages if labels.get(message, {}).get('intent')]
+    for message in labelled:
+        expected = labels[message]['intent']
+        result, _ = timed(classifier.classify, message)
+
+        _, elapsed = timed(lambda: [classifier.classify(message) for _ in range(repeats)])
+        local_latencies.append(elapsed / repeats)
+
+        if result['confidence'] < threshold:
+            # The fallback policy would ask the LLM, whose label is the reference
+            escalated += 1
+            if result['intent'] != expected:
+                escalated_wrong += 1
+        if result['intent'] == expected:
+            correct += 1
+        else:
+            confusion[(expected, result['intent'])] += 1
+
+    total = len(labelled) or 1
+    llm_latencies = [labels[message]['latency_s'] for message in labelled]
+    return {
+        'messages': len(labelled),
+        'local_accuracy': correct / total,
+        'fallback_accuracy': (correct + escalated_wrong) / total,
+        'escalation_rate': escalated / total,
+        'local_p50_ms': percentile(local_latencies, 50) * 1000,
+        'local_p95_ms': percentile(local_latencies, 95) * 1000,
+        'llm_p50_ms': percentile(llm_latencies, 50) * 1000,
+        'llm_p95_ms': percentile(llm_latencies, 95) * 1000,
+        'confusion': {f"{expected} -> {predicted}": count for (expected, predicted), count in confusion.most_common()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--refresh', action='store_true', help='re-label every message with the LLM')
+    parser.add_argument('--threshold', type=float, default=0.7, help='confidence below which the LLM is used')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    messages = list(dict.fromkeys(load_sample_messages() + EXTRA_MESSAGES))
+    labels = load_labels(messages, refresh=args.refresh)
+    report = evaluate(messages, labels, args.threshold)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\nMessages evaluated:       {report['messages']}")
+    print(f"Local accuracy:           {report['local_accuracy']:.1%}")
+    print(f"Local + LLM fallback:     {report['fallback_accuracy']:.1%} "
+          f"(escalation rate {report['escalation_rate']:.1%} at threshold {args.threshold})")
+    print(f"Local latency p50 / p95:  {report['local_p50_ms']:.3f} / {report['local_p95_ms']:.3f} ms")
+    print(f"LLM latency p50 / p95:    {report['llm_p50_ms']:.0f} / {report['llm_p95_ms']:.0f} ms")
+    if report['confusion']:
+        print("\nMisclassified (LLM label -> local label):")
+        for pair, count in report['confusion'].items():
+            print(f"  {pair}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Score candidate models for each LLM task on labelled prompts.
+
+    GEMINI_API_KEY=... python -m benchmarks.eval_models [--tasks intent,extraction] [--provider gemini]
+
+Cases in benchmarks/data/model_eval_cases.json come from the sample
+conversations plus extra intent/extraction examples. Each candidate runs the
+agents' real prompts with the task pinned to it through the same
+{PROVIDER}_MODEL_{TASK} override the app reads, and is scored on:
+
+    intent       label is one of the accepted intents
+    extraction   cleaned fields equal the expected fields exactly
+    sales_reply  a usable reply (non-empty, not an error message)
+    sales_turn   schema-valid, right intent and right fields
+
+The report lists accuracy, p95 latency and cost per 1000 calls, and suggests
+the cheapest model within --tolerance of the best accuracy. The verification
+task has no LLM call in VerificationAgent yet, so it is not scored.
+"""
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.common import DATA_DIR, percentile, timed
+from services.model_policy import CANDIDATE_MODELS, call_cost, model_for
+
+CASES_PATH = os.path.join(DATA_DIR, 'model_eval_cases.json')
+SCORED_TASKS = ['intent', 'extraction', 'sales_reply', 'sales_turn']
+ERROR_MARKERS = ("technical difficulties", "Error getting AI response", "having trouble generating")
+
+
+def _same_fields(actual, expected):
+    def normalize(value):
+        return str(value).strip().lower()
+    return ({key: normalize(value) for key, value in actual.items()}
+            == {key: normalize(value) for key, value in expected.items()})
+
+
+def _run_case(task, case, client, agent):
+    """Run one case; returns True when the answer is correct"""
+    message = case['message']
+    if task == 'intent':
+        try:
+            return json.loads(client.analyze_conversation_intent([], message)).get('intent') in case['intents']
+        except (TypeError, ValueError):
+            return False
+    if task == 'extraction':
+        return _same_fields(agent._extract_information(message, {}), case['extracted'])
+    if task == 'sales_reply':
+        reply = agent._generate_reply(message, {}, {'intent': case['intents'][0]})
+        return bool(reply and reply.strip()) and not any(marker in reply for marker in ERROR_MARKERS)
+    if task == 'sales_turn':
+        session = {'customer_data': {}, 'conversation_history': []}
+        turn = agent._combined_turn(message, session, {'intent': 'inquiry'})
+        return bool(turn) and turn['intent'] in case['intents'] and _same_fields(
+            agent._clean_extracted(turn['extracted_info']), case['extracted'])
+    raise ValueError(f"Unknown task: {task}")
+
+
+def score_model(provider, task, model, cases):
+    import agents.sales_agent as sales_agent_module
+    from agents.sales_agent import SalesAgent
+    client = __import__(f"{provider}_client")
+
+    # Pin the task to this model the same way an operator would
+    env_key = f"{provider.upper()}_MODEL_{task.upper()}"
+    previous = os.environ.get(env_key)
+    os.environ[env_key] = model
+    # SalesAgent calls the Gemini client; point it at the provider under test
+    original_client_call = sales_agent_module.get_agent_response
+    sales_agent_module.get_agent_response = client.get_agent_response
+    agent = SalesAgent(turn_mode='separate')
+
+    latencies = []
+    correct = 0
+    usage_before = dict(client.usage_by_model.get(model, {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0}))
+    try:
+        for case in cases:
+            ok, elapsed = timed(_run_case, task, case, client, agent)
+            latencies.append(elapsed)
+            correct += bool(ok)
+    finally:
+        sales_agent_module.get_agent_response = original_client_call
+        if previous is None:
+            os.environ.pop(env_key, None)
+        else:
+            os.environ[env_key] = previous
+
+    usage_after = client.usage_by_model.get(model, usage_before)
+    calls = usage_after['calls'] - usage_before['calls']
+    cost = call_cost(model, usage_after['prompt_tokens'] - usage_before['prompt_tokens'],
+                     usage_after['output_tokens'] - usage_before['output_tokens'])
+    return {
+        'task': task,
+        'model': model,
+        'accuracy': round(correct / len(cases), 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'cost_per_1k_calls_usd': round(cost / calls * 1000, 4) if cost is not None and calls else None
+    }
+
+
+def suggest(results, tolerance):
+    """Cheapest model whose accuracy is within tolerance of the task's best"""
+    best_accuracy = max(result['accuracy'] for result in results)
+    eligible = [result for result in results if result['accuracy'] >= best_accuracy - tolerance]
+    return min(eligible, key=lambda result: (result['cost_per_1k_calls_usd'] or float('inf'), result['p95_ms']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--provider', default='gemini', choices=sorted(CANDIDATE_MODELS))
+    parser.add_argument('--tasks', default=','.join(SCORED_TASKS))
+    parser.add_argument('--models', help='comma-separated candidates (default: CANDIDATE_MODELS for the provider)')
+    parser.add_argument('--tolerance', type=float, default=0.02, help='accuracy a cheaper model may give up')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    key_name = 'GEMINI_API_KEY' if args.provider == 'gemini' else 'OPENAI_API_KEY'
+    if not os.environ.get(key_name):
+        sys.exit(f"{key_name} is required: this benchmark calls the real models")
+
+    with open(CASES_PATH, encoding='utf-8') as f:
+        cases = json.load(f)
+    models = args.models.split(',') if args.models else CANDIDATE_MODELS[args.provider]
+
+    all_results = []
+    for task in args.tasks.split(','):
+        print(f"\n{task} (current: {model_for(args.provider, task)})")
+        task_results = []
+        for model in models:
+            result = score_model(args.provider, task, model, cases)
+            task_results.append(result)
+            cost = result['cost_per_1k_calls_usd']
+            print(f"  {model:>24}: accuracy {result['accuracy']:.3f}, p50 {result['p50_ms']:>8} ms, "
+                  f"p95 {result['p95_ms']:>8} ms, ${cost if cost is not None else '?'} per 1k calls")
+        choice = suggest(task_results, args.tolerance)
+        print(f"  suggested: {args.provider.upper()}_MODEL_{task.upper()}={choice['model']}")
+        all_results.extend(task_results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(all_results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
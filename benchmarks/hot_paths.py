@@ -0,0 +1,308 @@
+"""
+Microbenchmarks for the decision hot paths, with JSON baselines.
+
+    python -m benchmarks.hot_paths run [--only crm] [--output results.json]
+    python -m benchmarks.hot_paths run --save            # overwrite the stored baseline
+    python -m benchmarks.hot_paths compare [--threshold 0.25]
+
+compare runs the suite (or reads --current) and exits with status 1 when
+any path's median time per call is slower than the baseline by more than the
+threshold. External latency is stubbed out: the bureau round trip is set to
+zero and the LLM returns a canned extraction, so the numbers measure our
+own code.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.common import REPO_ROOT, percentile
+
+# openai_client builds its client at import time; no call is ever made
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'baselines', 'hot_paths.json')
+CRM_TABLE_SIZES = [12, 1000, 100000]
+
+# name -> setup function returning (callable to time, cleanup or None)
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def stub_llm(module, response):
+    """Replace a module's get_agent_response with a canned answer; returns the undo function"""
+    original = module.get_agent_response
+    module.get_agent_response = lambda *args, **kwargs: response
+
+    def restore():
+        module.get_agent_response = original
+    return restore
+
+
+def _no_sleep_bureau():
+    from mock_apis.credit_bureau_api import CreditBureauApi
+    bureau = CreditBureauApi()
+    bureau.ROUND_TRIP_SECONDS = 0
+    return bureau
+
+
+@benchmark('underwriting.calculate_emi')
+def setup_calculate_emi():
+    from agents.underwriting_agent import UnderwritingAgent
+    agent = UnderwritingAgent(_no_sleep_bureau(), None)
+    return (lambda: agent._calculate_emi(500000, 0.12, 36)), None
+
+
+@benchmark('loan_math.quote_grid')
+def setup_quote_grid():
+    from services.loan_math import quote_json
+    amounts = tuple(range(50000, 4000001, 50000))
+    tenures = tuple(range(12, 73, 12))
+    # Uncached: the LRU would otherwise answer every call after the first
+    return (lambda: quote_json.__wrapped__(amounts, tenures, 11.5, 500000, 60, 80000)), None
+
+
+@benchmark('underwriting.process_application')
+def setup_process_application():
+    from agents.underwriting_agent import UnderwritingAgent
+    from mock_apis.offer_mart_api import OfferMartApi
+    agent = UnderwritingAgent(_no_sleep_bureau(), OfferMartApi())
+    customer_data = {'phone': '9876543210', 'monthly_income': 85000, 'loan_amount': 400000}
+
+    def run():
+        return agent.process_application({'customer_data': dict(customer_data)})
+    return run, None
+
+
+@benchmark('credit_bureau.snapshot_score')
+def setup_snapshot_score():
+    from services.bureau_snapshot import build_snapshot
+    directory = tempfile.mkdtemp(prefix='bench_bureau_')
+    source = os.path.join(directory, 'bureau.csv')
+    rng = random.Random(49)
+    phones = [str(phone) for phone in rng.sample(range(6000000000, 10000000000), 100000)]
+    with open(source, 'w') as bulk_file:
+        bulk_file.write('phone,credit_score\n')
+        bulk_file.writelines(f'{phone},{rng.randint(300, 900)}\n' for phone in phones)
+    build_snapshot(source, os.path.join(directory, 'bureau.bin'))
+    bureau = _no_sleep_bureau()
+    bureau.snapshot_path = os.path.join(directory, 'bureau.bin')
+    bureau._check_snapshot()
+    return (lambda: bureau.get_credit_score(rng.choice(phones))), lambda: shutil.rmtree(directory, ignore_errors=True)
+
+
+@benchmark('offer_mart.get_offer.known_customer')
+def setup_offer_known():
+    from mock_apis.offer_mart_api import OfferMartApi
+    api = OfferMartApi()
+    customer = {'phone': '9876543212', 'monthly_income': 120000}
+    return (lambda: api.get_offer(customer)), None
+
+
+@benchmark('offer_mart.get_offer.new_customer')
+def setup_offer_new():
+    from mock_apis.offer_mart_api import OfferMartApi
+    api = OfferMartApi()
+    customer = {'phone': '9000000001', 'monthly_income': '65000'}
+    return (lambda: api.get_offer(customer)), None
+
+
+def _crm_with_rows(size):
+    """A temporary CRM database with the seed customers plus synthetic ones up to size rows"""
+    from mock_apis.crm_api import CRMApi
+    directory = tempfile.mkdtemp(prefix='bench_crm_')
+    crm = CRMApi(db_path=os.path.join(directory, 'customers.db'))
+    crm.initialize_database()
+
+    conn = sqlite3.connect(crm.db_path)
+    existing = conn.execute('SELECT COUNT(*) FROM customers').fetchone()[0]
+    rows = [(f'Customer {i}', str(7000000000 + i), f'customer{i}@email.com', 'Mumbai', 30, '[]', 750,
+             300000, 'salaried', 'Acme', 60000, '2025-01-01T00:00:00')
+            for i in range(max(0, size - existing))]
+    conn.executemany('''
+        INSERT INTO customers (name, phone, email, city, age, current_loans, credit_score,
+            pre_approved_limit, employment_type, company_name, monthly_income, created_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    phones = [row[0] for row in conn.execute('SELECT phone FROM customers')]
+    conn.close()
+    return crm, phones, lambda: shutil.rmtree(directory, ignore_errors=True)
+
+
+def _register_crm_benchmarks():
+    for size in CRM_TABLE_SIZES:
+        def setup(size=size):
+            crm, phones, cleanup = _crm_with_rows(size)
+            rng = random.Random(size)
+            return (lambda: crm.verify_customer({'phone': rng.choice(phones)})), cleanup
+        BENCHMARKS[f'crm.verify_customer.rows_{size}'] = setup
+
+
+_register_crm_benchmarks()
+
+
+@benchmark('sales.extract_information')
+def setup_extract_information():
+    import agents.sales_agent as sales_agent_module
+    agent = sales_agent_module.SalesAgent(turn_mode='separate')
+    canned = json.dumps({'name': 'Aman Nayak', 'phone': '83207 23850', 'city': 'bhubneshwar',
+                         'monthly_income': '45000', 'loan_amount': 200000, 'loan_purpose': 'home renovation'})
+    restore = stub_llm(sales_agent_module, canned)
+    run = lambda: agent._extract_information("I'm Aman from Bhubaneswar, need 2 lakhs for home renovation", {})
+    return run, restore
+
+
+@benchmark('sanction_letter.create_pdf')
+def setup_create_pdf():
+    from agents.sanction_letter_agent import SanctionLetterAgent
+    directory = tempfile.mkdtemp(prefix='bench_pdf_')
+    agent = SanctionLetterAgent()
+    customer_data = {'name': 'Aman Nayak', 'phone': '8320723850', 'email': 'aman.nayak@email.com',
+                     'city': 'Bhubaneswar', 'monthly_income': 45000, 'loan_amount': 200000,
+                     'loan_purpose': 'home_improvement'}
+    loan_application = {'requested_amount': 200000, 'pre_approved_limit': 300000, 'credit_score': 760}
+    emi_details = {'monthly_emi': 6643, 'tenure_months': 36}
+    path = os.path.join(directory, 'letter.pdf')
+    run = lambda: agent._create_sanction_letter_pdf(path, customer_data, loan_application, emi_details)
+    return run, lambda: shutil.rmtree(directory, ignore_errors=True)
+
+
+def measure(func, min_time=0.2, rounds=7):
+    """
+    Time func in rounds of a calibrated number of calls.
+    Returns per-call seconds for every round.
+    """
+    func()  # warm up caches, imports and lazy connections
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / rounds or iterations >= 1_000_000:
+            break
+        iterations *= 2
+
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        per_call.append((time.perf_counter() - started) / iterations)
+    return per_call, iterations
+
+
+def run_suite(only=None, min_time=0.2, rounds=7):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if only and not any(part in name for part in only):
+            continue
+        func, cleanup = setup()
+        try:
+            per_call, iterations = measure(func, min_time, rounds)
+        finally:
+            if cleanup:
+                cleanup()
+        median = percentile(per_call, 50)
+        results[name] = {
+            'median_us': round(median * 1e6, 3),
+            'p95_us': round(percentile(per_call, 95) * 1e6, 3),
+            'ops_per_sec': round(1 / median, 1) if median else None,
+            'iterations': iterations,
+            'rounds': rounds
+        }
+        print(f"{name:<42} {results[name]['median_us']:>12.2f} us/call  "
+              f"(p95 {results[name]['p95_us']:.2f}, {iterations} x {rounds})")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print a comparison table; returns the names of paths that regressed beyond threshold"""
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base:
+            print(f"{name:<42} {result['median_us']:>12.2f} us/call  (new)")
+            continue
+        change = result['median_us'] / base['median_us'] - 1 if base['median_us'] else 0.0
+        status = 'REGRESSED' if change > threshold else ('improved' if change < -threshold else 'ok')
+        if status == 'REGRESSED':
+            regressions.append(name)
+        print(f"{name:<42} {base['median_us']:>12.2f} -> {result['median_us']:>12.2f} us/call  "
+              f"{change:+7.1%}  {status}")
+    return regressions
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run the suite')
+    run_parser.add_argument('--save', action='store_true', help=f'store as the baseline ({BASELINE_PATH})')
+    compare_parser = subparsers.add_parser('compare', help='run the suite and compare with the baseline')
+    compare_parser.add_argument('--current', help='compare this results file instead of running the suite')
+    compare_parser.add_argument('--threshold', type=float, default=0.25,
+                                help='allowed slowdown as a fraction of the baseline (default 0.25)')
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--only', help='comma-separated substrings of benchmark names')
+        sub.add_argument('--baseline', default=BASELINE_PATH)
+        sub.add_argument('--output', help='write results as JSON to this file')
+        sub.add_argument('--min-time', type=float, default=0.2, help='seconds spent timing each path')
+        sub.add_argument('--rounds', type=int, default=7)
+    args = parser.parse_args()
+    only = args.only.split(',') if args.only else None
+
+    if args.command == 'compare' and args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(only, args.min_time, args.rounds)
+
+    if args.output:
+        _write_json(args.output, current)
+    if args.command == 'run':
+        if args.save:
+            _write_json(args.baseline, current)
+            print(f"Baseline written to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print()
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} path(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == '__main__':
+    main()
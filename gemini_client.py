@@ -1,7 +1,11 @@
 import json
 import os
+import threading
 import time
 
+from services.admission import ServerBusyError, llm_limiter
+from services.model_policy import model_for
+
 # Correct import for Google Generative AI
 try:
     import google.generativeai as genai
@@ -13,13 +17,35 @@ except ImportError:
 # This API key is from Gemini Developer API Key, not vertex AI API Key
 if GOOGLE_AI_AVAILABLE:
     genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-    # Initialize models
-    gemini_flash = genai.GenerativeModel('gemini-2.5-flash')
-    gemini_pro = genai.GenerativeModel('gemini-2.5-pro')
 
-def get_agent_response(system_prompt, user_message, context=None, response_format="text"):
+# Model clients by name, created on first use
+_models = {}
+
+def _get_model(name):
+    if name not in _models:
+        _models[name] = genai.GenerativeModel(name)
+    return _models[name]
+
+# Running totals of model calls and tokens, overall and per model, for benchmarks and /metrics
+token_usage = {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0}
+usage_by_model = {}
+_token_usage_lock = threading.Lock()
+
+def _record_usage(model_name, response):
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = (getattr(usage, 'prompt_token_count', 0) or 0) if usage else 0
+    output_tokens = (getattr(usage, 'candidates_token_count', 0) or 0) if usage else 0
+    with _token_usage_lock:
+        model_usage = usage_by_model.setdefault(model_name, {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0})
+        for totals in (token_usage, model_usage):
+            totals['calls'] += 1
+            totals['prompt_tokens'] += prompt_tokens
+            totals['output_tokens'] += output_tokens
+
+def get_agent_response(system_prompt, user_message, context=None, response_format="text", task=None, model=None):
     """
-    Get response from Gemini for agent interactions
+    Get response from Gemini for agent interactions.
+    The model comes from the task's policy (services.model_policy) unless given explicitly.
     """
     # If Google AI is not available, fallback to a mock response
     if not GOOGLE_AI_AVAILABLE:
@@ -31,21 +57,29 @@ def get_agent_response(system_prompt, user_message, context=None, response_forma
         full_prompt += f"Context: {context}\n\n"
     full_prompt += f"User: {user_message}\n\nAssistant:"
     
+    model_name = model or model_for('gemini', task, response_format)
+    gemini_model = _get_model(model_name)
+    
     # Retry logic for API calls
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            if response_format == "json":
-                response = gemini_pro.generate_content(
-                    full_prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        response_mime_type="application/json"
+            # Bounded concurrency per provider; sheds load with ServerBusyError
+            with llm_limiter('gemini').slot():
+                if response_format == "json":
+                    response = gemini_model.generate_content(
+                        full_prompt,
+                        generation_config=genai.types.GenerationConfig(
+                            response_mime_type="application/json"
+                        )
                     )
-                )
-            else:
-                response = gemini_flash.generate_content(full_prompt)
+                else:
+                    response = gemini_model.generate_content(full_prompt)
+            _record_usage(model_name, response)
             
             return response.text or "I apologize, but I'm having trouble generating a response right now."
+        except ServerBusyError:
+            raise
         except Exception as e:
             if attempt < max_retries - 1:  # Don't sleep on the last attempt
                 time.sleep(2 ** attempt)  # Exponential backoff
@@ -53,7 +87,7 @@ def get_agent_response(system_prompt, user_message, context=None, response_forma
             else:
                 return f"I'm experiencing technical difficulties. Please try again. (Error: {str(e)})"
 
-def analyze_conversation_intent(conversation_history, current_message):
+def analyze_conversation_intent(conversation_history, current_message, model=None):
     """
     Analyze user intent and conversation stage using Gemini
     """
@@ -72,8 +106,11 @@ def analyze_conversation_intent(conversation_history, current_message):
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = get_agent_response(system_prompt, current_message, context, "json")
+            response = get_agent_response(system_prompt, current_message, context, "json", task='intent', model=model)
             return response
+        except ServerBusyError:
+            # Don't retry into an overloaded provider
+            return None
         except Exception as e:
             if attempt < max_retries - 1:
                 time.sleep(2 ** attempt)
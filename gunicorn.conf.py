@@ -0,0 +1,60 @@
+"""
+Production server settings.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Each worker is a single gevent process that holds many Socket.IO connections
+cooperatively. With more than one worker, set SOCKETIO_MESSAGE_QUEUE so emits
+reach clients on any worker (redis://..., or local://127.0.0.1:6380 to use the
+bundled stand-in broker, which is started automatically). Sessions are then
+shared through SESSION_DB_PATH (default sessions.db), so all workers must run
+on one host; spreading them over hosts needs sticky routing by session token.
+"""
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 2000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+
+# Workers must pick the same async mode as the worker class
+os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'gevent' if worker_class == 'gevent' else 'threading')
+
+# A reconnect can land on any worker, so sessions are shared through SQLite
+if workers > 1:
+    os.environ.setdefault('SESSION_DB_PATH', 'sessions.db')
+
+_broker_process = None
+
+
+def on_starting(server):
+    global _broker_process
+    message_queue = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+
+    if workers > 1 and not message_queue:
+        server.log.warning("WEB_CONCURRENCY > 1 without SOCKETIO_MESSAGE_QUEUE: "
+                           "emits will only reach clients on the same worker")
+
+    if message_queue.startswith('local://') and os.environ.get('LOCAL_BROKER_AUTOSTART', '1') == '1':
+        from services.local_broker import _parse_url
+        host, port = _parse_url(message_queue)
+        _broker_process = subprocess.Popen([
+            sys.executable, '-m', 'services.local_broker', '--host', host, '--port', str(port)
+        ])
+
+
+def post_worker_init(worker):
+    # Directories, database and background jobs, once per worker
+    from app import bootstrap
+    bootstrap()
+
+
+def on_exit(server):
+    if _broker_process is not None:
+        _broker_process.terminate()
@@ -1,12 +1,23 @@
+import os
 import random
 import time
+from datetime import date
+
+from services.bureau_snapshot import BureauSnapshot, SnapshotError, epoch_days, report_from_record
 
 class CreditBureauApi:
     """
     Mock Credit Bureau API for fetching credit scores
     """
     
-    def __init__(self):
+    # Simulated latency of one bureau call, single or batch
+    ROUND_TRIP_SECONDS = 0.5
+    # Largest batch the bureau accepts in one call
+    MAX_BATCH_SIZE = 500
+    # How often to check whether the snapshot file was replaced
+    SNAPSHOT_RECHECK_SECONDS = 60
+    
+    def __init__(self, snapshot_path=None, snapshot_max_age_days=None):
         # Predefined credit scores for demo customers
         self.credit_scores = {
             '9876543210': 785,  # Rajesh Kumar
@@ -22,15 +33,137 @@ class CreditBureauApi:
             '9876543220': 750,  # Manoj Yadav
             '9876543221': 730,  # Ritu Bansal
         }
+        
+        # Offline monthly snapshot (services.bureau_snapshot); rows older than
+        # snapshot_max_age_days, and phones it lacks, go to the live bureau
+        self.snapshot_path = snapshot_path or os.environ.get('BUREAU_SNAPSHOT_PATH', 'bureau_snapshot.bin')
+        # 0 is a valid age (only rows updated today count as fresh), so only None means unset
+        self.snapshot_max_age_days = (int(os.environ.get('BUREAU_SNAPSHOT_MAX_AGE_DAYS', 35))
+                                      if snapshot_max_age_days is None else snapshot_max_age_days)
+        self.snapshot = None
+        self.snapshot_stats = {'hits': 0, 'misses': 0, 'stale': 0}
+        self._fresh_since = 0
+        self._snapshot_checked_at = None
+        self._check_snapshot()
     
     def get_credit_score(self, phone):
         """
         Fetch credit score from bureau (simulated)
         Returns score out of 900 as specified in requirements
         """
+        record = self._snapshot_record(phone)
+        if record is not None:
+            return record[1]
+        
         # Simulate API delay
-        time.sleep(0.5)
+        time.sleep(self.ROUND_TRIP_SECONDS)
+        
+        return self._score_for(phone)
+    
+    def get_credit_report(self, phone):
+        """
+        Get detailed credit report (simplified for demo)
+        """
+        record = self._snapshot_record(phone)
+        if record is not None:
+            return report_from_record(record)
         
+        time.sleep(self.ROUND_TRIP_SECONDS)
+        return self._report_for(self._score_for(phone))
+    
+    def get_credit_scores(self, phones, batch_size=None):
+        """
+        Fetch credit scores for many phones, paying one round trip per batch.
+        Returns {'results': {phone: score}, 'errors': {phone: reason}}
+        """
+        return self._pull_with_snapshot(phones, batch_size, lambda record: record[1], self._score_for)
+    
+    def get_credit_reports(self, phones, batch_size=None):
+        """
+        Fetch detailed credit reports for many phones, paying one round trip per batch.
+        Returns {'results': {phone: report}, 'errors': {phone: reason}}
+        """
+        return self._pull_with_snapshot(phones, batch_size, report_from_record,
+                                        lambda phone: self._report_for(self._score_for(phone)))
+    
+    def snapshot_metrics(self):
+        lookups = sum(self.snapshot_stats.values())
+        return dict(self.snapshot_stats,
+                    loaded=self.snapshot is not None,
+                    records=self.snapshot.count if self.snapshot else 0,
+                    as_of=self.snapshot.as_of.isoformat() if self.snapshot else None,
+                    hit_rate=round(self.snapshot_stats['hits'] / lookups, 3) if lookups else 0.0)
+    
+    def _check_snapshot(self):
+        """(Re)open the snapshot when the file appears or is replaced, and move the freshness cutoff"""
+        self._snapshot_checked_at = time.monotonic()
+        self._fresh_since = epoch_days(date.today()) - self.snapshot_max_age_days
+        try:
+            inode = os.stat(self.snapshot_path).st_ino
+        except OSError:
+            return
+        if self.snapshot is not None and self.snapshot.inode == inode:
+            return
+        try:
+            # The old mapping is left to the garbage collector; a lookup may still be using it
+            self.snapshot = BureauSnapshot(self.snapshot_path)
+        except (OSError, SnapshotError) as e:
+            print(f"Bureau snapshot not loaded: {e}")
+    
+    def _snapshot_record(self, phone):
+        """Fresh snapshot record for phone, or None when the live bureau must be called"""
+        if time.monotonic() - self._snapshot_checked_at > self.SNAPSHOT_RECHECK_SECONDS:
+            self._check_snapshot()
+        if self.snapshot is None:
+            return None
+        record = self.snapshot.lookup(phone)
+        if record is None:
+            self.snapshot_stats['misses'] += 1
+            return None
+        if record[-1] < self._fresh_since:
+            self.snapshot_stats['stale'] += 1
+            return None
+        self.snapshot_stats['hits'] += 1
+        return record
+    
+    def _pull_with_snapshot(self, phones, batch_size, from_record, pull):
+        """Serve what the snapshot has; only the rest costs bureau round trips"""
+        results = {}
+        misses = []
+        for phone in dict.fromkeys(phones):
+            record = self._snapshot_record(phone)
+            if record is not None:
+                results[phone] = from_record(record)
+            else:
+                misses.append(phone)
+        
+        pulled = self._pull_batches(misses, batch_size, pull) if misses else {'results': {}, 'errors': {}}
+        pulled['results'].update(results)
+        return pulled
+    
+    def _pull_batches(self, phones, batch_size, pull):
+        """Split phones into batches of at most MAX_BATCH_SIZE; a bad phone fails alone, not its batch"""
+        batch_size = min(batch_size or self.MAX_BATCH_SIZE, self.MAX_BATCH_SIZE)
+        unique_phones = list(dict.fromkeys(phones))
+        results = {}
+        errors = {}
+        
+        for start in range(0, len(unique_phones), batch_size):
+            # Simulate one API round trip for the whole batch
+            time.sleep(self.ROUND_TRIP_SECONDS)
+            
+            for phone in unique_phones[start:start + batch_size]:
+                if not isinstance(phone, str) or not phone.isdigit() or len(phone) != 10:
+                    errors[phone] = 'invalid_phone'
+                    continue
+                try:
+                    results[phone] = pull(phone)
+                except Exception as e:
+                    errors[phone] = str(e)
+        
+        return {'results': results, 'errors': errors}
+    
+    def _score_for(self, phone):
         if phone in self.credit_scores:
             return self.credit_scores[phone]
         else:
@@ -53,12 +186,7 @@ class CreditBureauApi:
             
             return random.randint(750, 800)  # Default to good score
     
-    def get_credit_report(self, phone):
-        """
-        Get detailed credit report (simplified for demo)
-        """
-        credit_score = self.get_credit_score(phone)
-        
+    def _report_for(self, credit_score):
         # Generate mock credit report data
         report = {
             'credit_score': credit_score,
@@ -1,7 +1,37 @@
 import sqlite3
 import json
 import os
+import re
 from datetime import datetime
+from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+CUSTOMER_COLUMNS = ['id', 'name', 'phone', 'email', 'city', 'age', 'current_loans',
+                    'credit_score', 'pre_approved_limit', 'employment_type',
+                    'company_name', 'monthly_income', 'created_date']
+
+# Columns indexed for search; both FTS tables mirror customers through triggers
+SEARCH_COLUMNS = ('name', 'email', 'city', 'company_name')
+SEARCH_INDEXES = {
+    # Word index with 2- and 3-character prefix indexes for search-as-you-type
+    'customers_fts': "tokenize = 'unicode61', prefix = '2 3'",
+    # Trigram index for typo-tolerant matching
+    'customers_trigram': "tokenize = 'trigram'"
+}
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SCORE = 0.75
+
+
+def _similarity(a, b):
+    """0..1 edit-distance similarity of two strings"""
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.ratio(a, b) / 100
+    return SequenceMatcher(None, a, b).ratio()
 
 class CRMApi:
     """
@@ -35,6 +65,8 @@ class CRMApi:
             )
         ''')
         
+        self._create_search_indexes(cursor)
+        
         # Insert synthetic customer data (10+ customers as required)
         customers_data = [
             ('Rajesh Kumar', '9876543210', 'rajesh.kumar@email.com', 'Mumbai', 32, 
@@ -127,6 +159,74 @@ class CRMApi:
                 'kyc_status': 'required'
             }
     
+    def search_customers(self, query, page=1, per_page=20, fuzzy=True):
+        """
+        Search customers by name, email, city and company name.
+        Every word of the query must match the start of a word (prefix search).
+        When nothing matches and fuzzy is set, falls back to trigram matching,
+        which tolerates typos. Returns a page of customers with the total count.
+        """
+        page = max(1, int(page))
+        per_page = max(1, min(int(per_page), 100))
+        words = re.findall(r'\w+', query.lower())
+        response = {'query': query, 'page': page, 'per_page': per_page, 'total': 0, 'mode': 'prefix',
+                    'results': []}
+        if not words:
+            return response
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            match = ' '.join(f'"{word}"*' for word in words)
+            response['total'] = cursor.execute(
+                'SELECT COUNT(*) FROM customers_fts WHERE customers_fts MATCH ?', (match,)).fetchone()[0]
+            if response['total']:
+                rows = cursor.execute('''
+                    SELECT c.* FROM customers_fts JOIN customers c ON c.id = customers_fts.rowid
+                    WHERE customers_fts MATCH ? ORDER BY bm25(customers_fts) LIMIT ? OFFSET ?
+                ''', (match, per_page, (page - 1) * per_page)).fetchall()
+                response['results'] = [self._customer_from_row(row) for row in rows]
+            elif fuzzy:
+                response['mode'] = 'fuzzy'
+                matches = self._fuzzy_search(cursor, words)
+                response['total'] = len(matches)
+                response['results'] = [dict(self._customer_from_row(row), match_score=round(score, 3))
+                                       for score, row in matches[(page - 1) * per_page:page * per_page]]
+        except sqlite3.OperationalError:
+            # SQLite without FTS5 (or without the trigram tokenizer): plain substring scan
+            response['mode'] = 'scan'
+            rows = self._scan_search(cursor, words)
+            response['total'] = len(rows)
+            response['results'] = [self._customer_from_row(row)
+                                   for row in rows[(page - 1) * per_page:page * per_page]]
+        finally:
+            conn.close()
+        return response
+    
+    def match_customer(self, customer_data, min_score=0.85):
+        """
+        Find the CRM record of a customer whose phone number may have changed.
+        Only an exact email match with a closely matching name counts; returns the
+        customer (current_loans parsed) or None.
+        """
+        email = (customer_data.get('email') or '').strip().lower()
+        name = (customer_data.get('name') or '').strip().lower()
+        if not email or not name:
+            return None
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            rows = cursor.execute('SELECT * FROM customers WHERE lower(email) = ?', (email,)).fetchall()
+        finally:
+            conn.close()
+        
+        for row in rows:
+            customer = self._customer_from_row(row)
+            if _similarity(name, customer['name'].lower()) >= min_score:
+                return customer
+        return None
+    
     def get_customer_by_phone(self, phone):
         """Get customer details by phone number"""
         conn = sqlite3.connect(self.db_path)
@@ -141,4 +241,94 @@ class CRMApi:
                       'credit_score', 'pre_approved_limit', 'employment_type', 
                       'company_name', 'monthly_income', 'created_date']
             return dict(zip(columns, result))
-        return None
\ No newline at end of file
+        return None
+    
+    def iter_customers(self):
+        """Stream every customer in the CRM, with current_loans parsed"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            for result in cursor.execute('SELECT * FROM customers ORDER BY id'):
+                customer_details = dict(zip(CUSTOMER_COLUMNS, result))
+                customer_details['current_loans'] = json.loads(customer_details['current_loans'])
+                yield customer_details
+        finally:
+            conn.close()
+    
+    def _create_search_indexes(self, cursor):
+        """Create the FTS5 tables and their sync triggers; fill them on first creation"""
+        columns = ', '.join(SEARCH_COLUMNS)
+        new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+        old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+        for table, options in SEARCH_INDEXES.items():
+            exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+            try:
+                cursor.execute(f'''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {table}
+                    USING fts5({columns}, content = 'customers', content_rowid = 'id', {options})
+                ''')
+            except sqlite3.OperationalError as e:
+                # search_customers falls back to a table scan
+                print(f"Customer search index {table} unavailable: {e}")
+                continue
+            
+            # External-content tables are updated by deleting the old row and inserting the new one
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON customers BEGIN
+                    INSERT INTO {table}(rowid, {columns}) VALUES (new.id, {new_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON customers BEGIN
+                    INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_update AFTER UPDATE ON customers BEGIN
+                    INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                    INSERT INTO {table}(rowid, {columns}) VALUES (new.id, {new_values});
+                END
+            ''')
+            if not exists:
+                # Index customers that were in the table before the index existed
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+    
+    def _fuzzy_search(self, cursor, words):
+        """Trigram candidates re-ranked by string similarity; returns [(score, row)] best first"""
+        trigrams = {word[i:i + 3] for word in words for i in range(len(word) - 2)}
+        if not trigrams:
+            return []
+        match = ' OR '.join(f'"{trigram}"' for trigram in sorted(trigrams))
+        rows = cursor.execute('''
+            SELECT c.* FROM customers_trigram JOIN customers c ON c.id = customers_trigram.rowid
+            WHERE customers_trigram MATCH ? ORDER BY bm25(customers_trigram) LIMIT ?
+        ''', (match, FUZZY_CANDIDATES)).fetchall()
+        
+        query = ' '.join(words)
+        scored = []
+        for row in rows:
+            customer = dict(zip(CUSTOMER_COLUMNS, row))
+            fields = [str(customer[column] or '').lower() for column in SEARCH_COLUMNS]
+            # Each query word against its best field, so "rajsh mumbi" matches name and city
+            # A row whose search fields are all empty scores 0 rather than failing the search
+            word_scores = [max((_similarity(word, field_word) for field in fields for field_word in field.split()),
+                               default=0.0)
+                           for word in words]
+            score = max(sum(word_scores) / len(word_scores), max(_similarity(query, field) for field in fields))
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((score, row))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
+    
+    def _scan_search(self, cursor, words):
+        """Substring match of every word on any search column, without an index"""
+        condition = ' OR '.join(f'lower({column}) LIKE ?' for column in SEARCH_COLUMNS)
+        sql = 'SELECT * FROM customers WHERE ' + ' AND '.join(f'({condition})' for _ in words) + ' ORDER BY id'
+        params = [f'%{word}%' for word in words for _ in SEARCH_COLUMNS]
+        return cursor.execute(sql, params).fetchall()
+    
+    def _customer_from_row(self, row):
+        customer = dict(zip(CUSTOMER_COLUMNS, row))
+        customer['current_loans'] = json.loads(customer['current_loans'] or '[]')
+        return customer
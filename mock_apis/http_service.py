@@ -0,0 +1,157 @@
+"""
+Run the mock APIs as standalone local HTTP services, so the app can be
+load-tested against real network I/O (see services.api_client).
+
+    python -m mock_apis.http_service all --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+    python -m mock_apis.http_service crm --port 8101
+
+Every whitelisted method of an API is served as POST /call/<method> with a
+JSON body {"args": [...], "kwargs": {...}} and answered with {"result": ...}.
+Generators (CRMApi.iter_customers) are returned as lists. Latency and faults
+are injected before each call: --error-rate answers 503, and --hang-rate
+stalls for --hang-seconds so client timeouts can be exercised.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import types
+
+from flask import Flask, Response, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from mock_apis.credit_bureau_api import CreditBureauApi
+from mock_apis.crm_api import CRMApi
+from mock_apis.offer_mart_api import OfferMartApi
+
+# name: (factory, methods served, default port)
+SERVICES = {
+    'crm': (CRMApi, ('initialize_database', 'verify_customer', 'match_customer', 'get_customer_by_phone',
+                     'search_customers', 'iter_customers'), 8101),
+    'credit_bureau': (CreditBureauApi, ('get_credit_score', 'get_credit_report', 'get_credit_scores',
+                                        'get_credit_reports', 'snapshot_metrics'), 8102),
+    'offer_mart': (OfferMartApi, ('get_offer', 'get_loan_products'), 8103)
+}
+
+
+class FaultInjector:
+    """Added latency and injected failures, applied before every call"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, hang_rate=0.0, hang_seconds=30, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self._random = random.Random(seed)
+        self.stats = {'calls': 0, 'errors': 0, 'hangs': 0}
+
+    def before_call(self):
+        """Sleep for the configured latency; returns an error response to send instead, or None"""
+        self.stats['calls'] += 1
+        delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+        roll = self._random.random()
+        if roll < self.error_rate:
+            self.stats['errors'] += 1
+            return _json_response({'error': 'injected failure'}, 503)
+        if roll < self.error_rate + self.hang_rate:
+            self.stats['hangs'] += 1
+            time.sleep(self.hang_seconds)
+        return None
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """No per-request access log; at load-test rates it costs more than the calls"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def _json_response(body, status=200):
+    # json.dumps rather than jsonify: bureau error maps may mix key types, which key sorting rejects
+    return Response(json.dumps(body, default=str), status=status, content_type='application/json')
+
+
+def create_service_app(name, api=None, faults=None):
+    """Flask app serving one mock API"""
+    factory, methods, _ = SERVICES[name]
+    api = api or factory()
+    faults = faults or FaultInjector()
+    app = Flask(f'mock_{name}')
+
+    @app.route('/health')
+    def health():
+        return _json_response({'service': name, 'status': 'ok', 'faults': faults.stats})
+
+    @app.route('/call/<method>', methods=['POST'])
+    def call(method):
+        if method not in methods:
+            return _json_response({'error': f"unknown method {method}"}, 404)
+        injected = faults.before_call()
+        if injected is not None:
+            return injected
+        payload = request.get_json(silent=True) or {}
+        try:
+            result = getattr(api, method)(*payload.get('args', []), **payload.get('kwargs', {}))
+            if isinstance(result, types.GeneratorType):
+                result = list(result)
+        except Exception as e:
+            return _json_response({'error': str(e)}, 500)
+        return _json_response({'result': result})
+
+    return app
+
+
+def serve(names, host='127.0.0.1', ports=None, faults=None):
+    """
+    Start the named services on background threads; returns the werkzeug
+    servers (call shutdown() on each to stop them). Port 0 picks a free port.
+    """
+    servers = []
+    for name in names:
+        port = (ports or {}).get(name, SERVICES[name][2])
+        api = SERVICES[name][0]()
+        if hasattr(api, 'initialize_database'):
+            api.initialize_database()
+        app = create_service_app(name, api=api, faults=faults)
+        server = make_server(host, port, app, threaded=True, request_handler=QuietRequestHandler)
+        threading.Thread(target=server.serve_forever, name=f'mock-{name}', daemon=True).start()
+        print(f"Mock {name} API on http://{host}:{server.server_port}")
+        servers.append(server)
+    return servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the mock APIs over HTTP')
+    parser.add_argument('service', choices=['all'] + list(SERVICES))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='port for a single service, or the first of three for all '
+                                                 '(defaults: crm 8101, credit_bureau 8102, offer_mart 8103)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with 503')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='fraction of calls that stall')
+    parser.add_argument('--hang-seconds', type=float, default=30)
+    parser.add_argument('--bureau-round-trip-seconds', type=float,
+                        help=f'simulated bureau processing time (default {CreditBureauApi.ROUND_TRIP_SECONDS})')
+    args = parser.parse_args()
+
+    if args.bureau_round_trip_seconds is not None:
+        CreditBureauApi.ROUND_TRIP_SECONDS = args.bureau_round_trip_seconds
+    names = list(SERVICES) if args.service == 'all' else [args.service]
+    ports = {name: args.port + offset for offset, name in enumerate(names)} if args.port else None
+    faults = FaultInjector(args.latency_ms, args.jitter_ms, args.error_rate, args.hang_rate, args.hang_seconds)
+    servers = serve(names, args.host, ports, faults)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
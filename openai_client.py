@@ -1,16 +1,36 @@
 import json
 import os
+import threading
 import time
 
-# Use GPT-4o for reliable API responses
+from services.admission import ServerBusyError, llm_limiter
+from services.model_policy import model_for
+
 from openai import OpenAI
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-def get_agent_response(system_prompt, user_message, context=None, response_format="text"):
+# Running totals of model calls and tokens, overall and per model, for benchmarks and /metrics
+token_usage = {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0}
+usage_by_model = {}
+_token_usage_lock = threading.Lock()
+
+def _record_usage(model_name, response):
+    usage = getattr(response, 'usage', None)
+    prompt_tokens = (getattr(usage, 'prompt_tokens', 0) or 0) if usage else 0
+    output_tokens = (getattr(usage, 'completion_tokens', 0) or 0) if usage else 0
+    with _token_usage_lock:
+        model_usage = usage_by_model.setdefault(model_name, {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0})
+        for totals in (token_usage, model_usage):
+            totals['calls'] += 1
+            totals['prompt_tokens'] += prompt_tokens
+            totals['output_tokens'] += output_tokens
+
+def get_agent_response(system_prompt, user_message, context=None, response_format="text", task=None, model=None):
     """
-    Get response from OpenAI for agent interactions
+    Get response from OpenAI for agent interactions.
+    The model comes from the task's policy (services.model_policy) unless given explicitly.
     """
     messages = [
         {"role": "system", "content": system_prompt},
@@ -20,23 +40,30 @@ def get_agent_response(system_prompt, user_message, context=None, response_forma
     if context:
         messages.insert(1, {"role": "system", "content": f"Context: {context}"})
     
+    model_name = model or model_for('openai', task, response_format)
+    
     # Retry logic for API calls
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            if response_format == "json":
-                response = openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages,
-                    response_format={"type": "json_object"}
-                )
-            else:
-                response = openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages
-                )
+            # Bounded concurrency per provider; sheds load with ServerBusyError
+            with llm_limiter('openai').slot():
+                if response_format == "json":
+                    response = openai_client.chat.completions.create(
+                        model=model_name,
+                        messages=messages,
+                        response_format={"type": "json_object"}
+                    )
+                else:
+                    response = openai_client.chat.completions.create(
+                        model=model_name,
+                        messages=messages
+                    )
+            _record_usage(model_name, response)
             
             return response.choices[0].message.content
+        except ServerBusyError:
+            raise
         except Exception as e:
             if attempt < max_retries - 1:  # Don't sleep on the last attempt
                 time.sleep(2 ** attempt)  # Exponential backoff
@@ -44,7 +71,7 @@ def get_agent_response(system_prompt, user_message, context=None, response_forma
             else:
                 return f"Error getting AI response: {str(e)}"
 
-def analyze_conversation_intent(conversation_history, current_message):
+def analyze_conversation_intent(conversation_history, current_message, model=None):
     """
     Analyze user intent and conversation stage
     """
@@ -63,8 +90,11 @@ def analyze_conversation_intent(conversation_history, current_message):
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = get_agent_response(system_prompt, current_message, context, "json")
+            response = get_agent_response(system_prompt, current_message, context, "json", task='intent', model=model)
             return response
+        except ServerBusyError:
+            # Don't retry into an overloaded provider
+            return None
         except Exception as e:
             if attempt < max_retries - 1:
                 time.sleep(2 ** attempt)
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ServerBusyError(Exception):
+    """Raised when a request is shed because the system is at capacity"""
+
+
+class ConcurrencyLimiter:
+    """
+    Caps concurrent calls to one LLM provider, with a bounded wait queue.
+
+    Callers beyond max_concurrency wait in line; once max_queue callers are
+    already waiting, or a caller waits longer than queue_timeout, the call
+    is shed with ServerBusyError.
+    """
+
+    def __init__(self, name, max_concurrency=16, max_queue=64, queue_timeout=10.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.admitted = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def slot(self):
+        """Hold one concurrency slot for the duration of the block"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if needed"""
+        # Fast path: a slot is free
+        if self._semaphore.acquire(blocking=False):
+            self._record_admitted(0.0)
+            return
+
+        with self._lock:
+            if self.queue_depth >= self.max_queue:
+                self.shed += 1
+                raise ServerBusyError(f"{self.name} queue is full")
+            self.queue_depth += 1
+
+        started = time.monotonic()
+        acquired = self._semaphore.acquire(timeout=self.queue_timeout)
+        waited = time.monotonic() - started
+
+        with self._lock:
+            self.queue_depth -= 1
+            if not acquired:
+                self.shed += 1
+
+        if not acquired:
+            raise ServerBusyError(f"{self.name} queue wait exceeded {self.queue_timeout}s")
+        self._record_admitted(waited)
+
+    def release(self):
+        """Return a slot taken by acquire()"""
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+    def metrics(self):
+        """Point-in-time queue and wait-time metrics"""
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'queue_depth': self.queue_depth,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'shed': self.shed,
+                'avg_wait_ms': round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 2)
+            }
+
+    def _record_admitted(self, waited):
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+
+class TokenBucketLimiter:
+    """Per-key token bucket, e.g. one bucket per socket"""
+
+    def __init__(self, rate=1.0, burst=5):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def allow(self, key):
+        """Take one token for key. Returns False when the bucket is empty."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                return False
+            self._buckets[key] = (tokens - 1, now)
+            return True
+
+    def forget(self, key):
+        """Drop the bucket for a key, e.g. when its socket disconnects"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'tracked_keys': len(self._buckets),
+                'rejected': self.rejected
+            }
+
+
+_llm_limiters = {}
+_llm_limiters_lock = threading.Lock()
+
+
+def _env_setting(name, provider, default, cast):
+    """Read NAME_PROVIDER, then NAME, then the default"""
+    value = os.environ.get(f"{name}_{provider.upper()}", os.environ.get(name))
+    return cast(value) if value is not None else default
+
+
+def llm_limiter(provider):
+    """Shared concurrency limiter for an LLM provider, configured from the environment"""
+    with _llm_limiters_lock:
+        if provider not in _llm_limiters:
+            _llm_limiters[provider] = ConcurrencyLimiter(
+                provider,
+                max_concurrency=_env_setting('LLM_MAX_CONCURRENCY', provider, 16, int),
+                max_queue=_env_setting('LLM_MAX_QUEUE', provider, 64, int),
+                queue_timeout=_env_setting('LLM_QUEUE_TIMEOUT', provider, 10.0, float)
+            )
+        return _llm_limiters[provider]
+
+
+def llm_metrics():
+    """Metrics for every provider limiter created so far"""
+    with _llm_limiters_lock:
+        limiters = dict(_llm_limiters)
+    return {provider: limiter.metrics() for provider, limiter in limiters.items()}
@@ -0,0 +1,308 @@
+"""
+Similarity cache for recurring sales questions and objections.
+
+Messages are normalized and embedded as hashed word and character-trigram
+vectors (no model download). Random-hyperplane LSH narrows a lookup to a few
+candidates, which are then ranked by exact cosine similarity. A cached answer
+is served when the similarity reaches the threshold and the entry was stored
+under the same context key (intent plus which customer fields are already
+known), so a reply never asks for details the customer has given.
+
+Nothing is cached unless it is checked: store() keeps an answer only when
+the cache's validator accepts it (ProductFactCheck: every rate, amount and
+tenure quoted must fall within the loan products), or when the caller
+passes approved=True for a reviewed FAQ answer.
+
+Configured by ANSWER_CACHE_ENABLED (default 1), ANSWER_CACHE_THRESHOLD
+(default 0.82), ANSWER_CACHE_SIZE (default 500 entries, least recently used
+evicted) and ANSWER_CACHE_TTL_SECONDS (default 86400).
+"""
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+DIMENSIONS = 1024
+HYPERPLANES = 96
+BANDS = 12
+# Fraction of (dimension, hyperplane) pairs with a non-zero sign; sparse projections are cheap
+PROJECTION_DENSITY = 0.25
+
+# Words that carry no meaning for matching questions
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'is', 'are', 'am', 'was', 'be', 'do', 'does', 'did', 'i', 'me', 'my', 'we', 'our',
+    'you', 'your', 'it', 'its', 'of', 'to', 'for', 'on', 'in', 'at', 'and', 'or', 'so', 'can', 'could',
+    'would', 'will', 'please', 'tell', 'know', 'want', 'hi', 'hello', 'hey', 'just', 'about', 'there',
+    'any', 'what', 'whats', 'how', 'this', 'that', 'us', 'with', 'loan', 'need', 'needed', 'take',
+    'get', 'much', 'have', 'has', 'if', 'by', 'from', 'personal', 'which', 'required', 'require'
+})
+
+SYNONYMS = {
+    'roi': 'interest', 'rates': 'rate', 'interests': 'interest', 'apr': 'interest',
+    'collateral': 'security', 'guarantor': 'security', 'secured': 'security', 'mortgage': 'security',
+    'quick': 'fast', 'quickly': 'fast', 'soon': 'fast', 'speed': 'fast', 'long': 'time', 'days': 'time',
+    'disbursal': 'disbursement', 'disbursed': 'disbursement', 'fees': 'fee', 'charges': 'fee',
+    'charge': 'fee', 'documents': 'document', 'docs': 'document', 'paperwork': 'document',
+    'prepay': 'prepayment', 'foreclose': 'prepayment', 'foreclosure': 'prepayment',
+    'emis': 'emi', 'installment': 'emi', 'installments': 'emi', 'tenure': 'term', 'duration': 'term'
+}
+
+_SUFFIXES = ('ing', 'ed', 'al', 's')
+
+# Canned fallbacks the LLM clients return on failure; never worth caching
+FAILURE_MARKERS = ("technical difficulties", "having trouble generating")
+
+# Messages carrying digits or an e-mail address usually contain details to extract
+_PERSONAL_DETAIL = re.compile(r'\d|@')
+
+_PERCENT = re.compile(r'(\d+(?:\.\d+)?)\s*(?:%|percent)')
+_AMOUNT = re.compile(r'(?:₹|\brs\.?|\binr)\s*(\d[\d,]*(?:\.\d+)?)\s*(lakhs?|lacs?|crores?|cr\b|k\b)?'
+                     r'|(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|crores?)')
+_TENURE = re.compile(r'(\d+)\s*(months?|years?|yrs?)\b')
+_MULTIPLIERS = {'lakh': 100000, 'lac': 100000, 'crore': 10000000, 'cr': 10000000, 'k': 1000}
+
+
+def _stem(word):
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_message(text):
+    """Lowercase, drop punctuation and stopwords, map common synonyms, strip plain suffixes"""
+    words = re.findall(r"[a-z]+", text.lower().replace("'", ''))
+    return ' '.join(_stem(SYNONYMS.get(word, word)) for word in words if word not in STOPWORDS)
+
+
+def _bucket(feature):
+    return zlib.crc32(feature.encode('utf-8')) % DIMENSIONS
+
+
+def embed(normalized):
+    """Sparse unit vector {dimension: weight} of hashed words and character trigrams"""
+    vector = {}
+    for word in normalized.split():
+        index = _bucket('w:' + word)
+        vector[index] = vector.get(index, 0.0) + 2.0
+        padded = f' {word} '
+        for i in range(len(padded) - 2):
+            index = _bucket('c:' + padded[i:i + 3])
+            vector[index] = vector.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {index: weight / norm for index, weight in vector.items()} if norm else {}
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+
+class ProductFactCheck:
+    """
+    Accepts an answer only if every interest rate, rupee amount and tenure it
+    quotes lies within the loan products from OfferMartApi.get_loan_products.
+    get_products is called on first use; if it fails, nothing is accepted.
+    """
+
+    def __init__(self, get_products):
+        self.get_products = get_products
+        self._bounds = None
+
+    def __call__(self, answer):
+        bounds = self._load_bounds()
+        if bounds is None:
+            return False
+        text = answer.lower()
+        rates, amounts, tenures, fees = bounds
+        for match in _PERCENT.finditer(text):
+            if not any(low <= float(match.group(1)) <= high for low, high in rates):
+                return False
+        for match in _AMOUNT.finditer(text):
+            number, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+            value = float(number.replace(',', '')) * _MULTIPLIERS.get((unit or '').rstrip('s'), 1)
+            if value not in fees and not any(low <= value <= high for low, high in amounts):
+                return False
+        for match in _TENURE.finditer(text):
+            months = int(match.group(1)) * (1 if match.group(2).startswith('month') else 12)
+            if not any(low <= months <= high for low, high in tenures):
+                return False
+        return True
+
+    def _load_bounds(self):
+        if self._bounds is None:
+            try:
+                products = self.get_products().values()
+            except Exception as e:
+                print(f"Answer cache cannot load loan products: {e}")
+                return None
+            self._bounds = (
+                [(p['interest_rate_range']['min'], p['interest_rate_range']['max']) for p in products],
+                [(p['amount_range']['min'], p['amount_range']['max']) for p in products],
+                [(p['tenure_range']['min'], p['tenure_range']['max']) for p in products],
+                {p['processing_fee'] for p in products if 'processing_fee' in p}
+            )
+        return self._bounds
+
+
+class _Entry:
+    __slots__ = ('key', 'vector', 'answer', 'context', 'buckets', 'created', 'hits')
+
+    def __init__(self, key, vector, answer, context, buckets):
+        self.key = key
+        self.vector = vector
+        self.answer = answer
+        self.context = context
+        self.buckets = buckets
+        self.created = time.time()
+        self.hits = 0
+
+
+class AnswerCache:
+    """LSH-indexed, LRU-bounded cache of approved replies keyed by message similarity"""
+
+    def __init__(self, enabled=None, threshold=None, max_entries=None, ttl_seconds=None, seed=7, validator=None):
+        # validator(answer) -> bool decides which generated answers may be stored
+        self.validator = validator
+        if enabled is None:
+            enabled = os.environ.get('ANSWER_CACHE_ENABLED', '1') == '1'
+        self.enabled = enabled
+        self.threshold = threshold or float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.82))
+        self.max_entries = max_entries or int(os.environ.get('ANSWER_CACHE_SIZE', 500))
+        self.ttl_seconds = ttl_seconds or float(os.environ.get('ANSWER_CACHE_TTL_SECONDS', 86400))
+        rng = random.Random(seed)
+        # Sparse random hyperplanes, stored per dimension as (planes with +1, planes with -1)
+        self._projection = []
+        for _ in range(DIMENSIONS):
+            positive, negative = [], []
+            for plane in range(HYPERPLANES):
+                if rng.random() < PROJECTION_DENSITY:
+                    (positive if rng.random() < 0.5 else negative).append(plane)
+            self._projection.append((positive, negative))
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'stored': 0, 'rejected': 0, 'unverified': 0,
+                      'evicted': 0, 'expired': 0}
+
+    def lookup(self, message, context):
+        """Cached answer for a similar message asked in the same context, or None"""
+        if not self.enabled:
+            return None
+        normalized = normalize_message(message)
+        with self._lock:
+            self.stats['lookups'] += 1
+            if not normalized or _PERSONAL_DETAIL.search(message):
+                self.stats['misses'] += 1
+                return None
+            entry = self._entries.get((normalized, context))
+            if entry is None:
+                entry = self._nearest(embed(normalized), context)
+            if entry is not None and time.time() - entry.created > self.ttl_seconds:
+                self._remove(entry)
+                self.stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(entry.key)
+            entry.hits += 1
+            self.stats['hits'] += 1
+            return entry.answer
+
+    def store(self, message, context, answer, personal_values=(), approved=False):
+        """
+        Remember an answer that the validator accepts, or one the caller marks
+        approved (a reviewed FAQ answer). Failure fallbacks, answers to messages
+        that carried personal details, and answers that mention any of
+        personal_values are never cached.
+        """
+        if not self.enabled or not answer:
+            return False
+        if not approved and (self.validator is None or not self.validator(answer)):
+            with self._lock:
+                self.stats['unverified'] += 1
+            return False
+        normalized = normalize_message(message)
+        lowered = answer.lower()
+        if (not normalized or _PERSONAL_DETAIL.search(message)
+                or any(marker in lowered for marker in FAILURE_MARKERS)
+                or any(str(value).lower() in lowered for value in personal_values if value)):
+            with self._lock:
+                self.stats['rejected'] += 1
+            return False
+
+        vector = embed(normalized)
+        key = (normalized, context)
+        with self._lock:
+            if key in self._entries:
+                self._remove(self._entries[key])
+            entry = _Entry(key, vector, answer, context, self._band_keys(vector, context))
+            self._entries[key] = entry
+            for bucket in entry.buckets:
+                self._buckets.setdefault(bucket, set()).add(key)
+            self.stats['stored'] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries.values())))
+                self.stats['evicted'] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.stats['lookups']
+            top = sorted(self._entries.values(), key=lambda entry: entry.hits, reverse=True)[:10]
+            return dict(self.stats,
+                        enabled=self.enabled,
+                        entries=len(self._entries),
+                        hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                        top=[{'message': entry.key[0], 'hits': entry.hits} for entry in top])
+
+    def _signature(self, vector):
+        sums = [0.0] * HYPERPLANES
+        for index, weight in vector.items():
+            positive, negative = self._projection[index]
+            for plane in positive:
+                sums[plane] += weight
+            for plane in negative:
+                sums[plane] -= weight
+        bits = 0
+        for total in sums:
+            bits = (bits << 1) | (total >= 0)
+        return bits
+
+    def _band_keys(self, vector, context):
+        signature = self._signature(vector)
+        width = HYPERPLANES // BANDS
+        mask = (1 << width) - 1
+        return tuple((context, band, (signature >> (band * width)) & mask) for band in range(BANDS))
+
+    def _nearest(self, vector, context):
+        candidates = set()
+        for bucket in self._band_keys(vector, context):
+            candidates.update(self._buckets.get(bucket, ()))
+        best, best_score = None, self.threshold
+        for key in candidates:
+            entry = self._entries[key]
+            score = cosine(vector, entry.vector)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _remove(self, entry):
+        self._entries.pop(entry.key, None)
+        for bucket in entry.buckets:
+            keys = self._buckets.get(bucket)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._buckets[bucket]
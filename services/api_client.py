@@ -0,0 +1,197 @@
+"""
+Back-end API access that can switch between in-process mocks and the HTTP
+services in mock_apis.http_service.
+
+MOCK_API_MODE=inprocess (default) uses the mock classes directly.
+MOCK_API_MODE=http sends every call through one shared ApiClient to
+CRM_API_URL, CREDIT_BUREAU_API_URL and OFFER_MART_API_URL (defaults
+http://127.0.0.1:8101, :8102 and :8103). ApiClient runs an httpx.AsyncClient
+on its own event loop thread, so all callers share one keep-alive
+connection pool. Blocking callers wait on the result, and fan-outs
+(prefetch, pre-underwriting refresh) issue their requests concurrently
+without a thread per call.
+
+Tuned by API_TIMEOUT_SECONDS (default 5), API_CONNECT_TIMEOUT_SECONDS
+(default 1), API_MAX_CONNECTIONS (default 100, per client), API_RETRIES
+(default 2, for connection errors and 502/503/504) and API_RETRY_BACKOFF_SECONDS
+(default 0.05, doubled per attempt).
+"""
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+
+SERVICE_URLS = {
+    'crm': ('CRM_API_URL', 'http://127.0.0.1:8101'),
+    'credit_bureau': ('CREDIT_BUREAU_API_URL', 'http://127.0.0.1:8102'),
+    'offer_mart': ('OFFER_MART_API_URL', 'http://127.0.0.1:8103')
+}
+RETRY_STATUSES = (502, 503, 504)
+
+
+class ServiceError(RuntimeError):
+    """A back-end call failed after retries"""
+
+
+class ApiClient:
+    """Pooled HTTP client shared by every remote API, usable from any thread"""
+
+    def __init__(self, timeout=None, connect_timeout=None, max_connections=None, retries=None, backoff=None,
+                 keepalive=True):
+        self.timeout = timeout or float(os.environ.get('API_TIMEOUT_SECONDS', 5))
+        self.connect_timeout = connect_timeout or float(os.environ.get('API_CONNECT_TIMEOUT_SECONDS', 1))
+        self.max_connections = max_connections or int(os.environ.get('API_MAX_CONNECTIONS', 100))
+        self.retries = int(os.environ.get('API_RETRIES', 2)) if retries is None else retries
+        self.backoff = backoff or float(os.environ.get('API_RETRY_BACKOFF_SECONDS', 0.05))
+        self.keepalive = keepalive
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name='api-client', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'failed': 0, 'retries': 0, 'total_ms': 0.0}
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        # Created on the loop it serves
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections if self.keepalive else 0)
+        )
+        self._ready.set()
+        self._loop.run_forever()
+
+    def submit(self, url, args=(), kwargs=None):
+        """Start a call; returns a concurrent.futures.Future (cancelling it aborts the request)"""
+        return asyncio.run_coroutine_threadsafe(self._call(url, list(args), kwargs or {}), self._loop)
+
+    def call(self, url, args=(), kwargs=None):
+        return self.submit(url, args, kwargs).result()
+
+    def gather(self, calls):
+        """
+        Run (url, args, kwargs) calls concurrently; returns their results in
+        order, with a ServiceError in place of each call that failed.
+        """
+        async def run_all():
+            return await asyncio.gather(*(self._call(url, list(args), kwargs or {}) for url, args, kwargs in calls),
+                                        return_exceptions=True)
+        return asyncio.run_coroutine_threadsafe(run_all(), self._loop).result()
+
+    def metrics(self):
+        with self._stats_lock:
+            requests = self.stats['requests']
+            return dict(self.stats,
+                        total_ms=round(self.stats['total_ms'], 1),
+                        mean_ms=round(self.stats['total_ms'] / requests, 2) if requests else 0.0,
+                        max_connections=self.max_connections)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _call(self, url, args, kwargs):
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    with self._stats_lock:
+                        self.stats['retries'] += 1
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+                try:
+                    response = await self._client.post(url, json={'args': args, 'kwargs': kwargs})
+                except httpx.TimeoutException as e:
+                    # A slow back end may still be working on it; retrying would pile on
+                    raise ServiceError(f"{url} timed out") from e
+                except httpx.TransportError as e:
+                    error = ServiceError(f"{url} unreachable: {e}")
+                    continue
+                if response.status_code in RETRY_STATUSES:
+                    error = ServiceError(f"{url} answered {response.status_code}")
+                    continue
+                body = response.json()
+                if response.status_code != 200:
+                    raise ServiceError(f"{url} failed: {body.get('error', response.status_code)}")
+                return body['result']
+            raise error
+        except Exception:
+            with self._stats_lock:
+                self.stats['failed'] += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.stats['requests'] += 1
+                self.stats['total_ms'] += (time.perf_counter() - started) * 1000
+
+
+class RemoteApi:
+    """Stand-in for a mock API class whose methods are served by mock_apis.http_service"""
+
+    def __init__(self, client, base_url, methods):
+        self.client = client
+        self.base_url = base_url.rstrip('/')
+        self.methods = frozenset(methods)
+
+    def __getattr__(self, name):
+        if name not in self.methods:
+            raise AttributeError(name)
+
+        def remote_method(*args, **kwargs):
+            return self.client.call(self._url(name), args, kwargs)
+        remote_method.__name__ = name
+        return remote_method
+
+    def submit(self, name, *args, **kwargs):
+        """Start a call without waiting; returns a Future"""
+        return self.client.submit(self._url(name), args, kwargs)
+
+    def _url(self, name):
+        return f'{self.base_url}/call/{name}'
+
+
+def submit_call(api, executor, name, *args):
+    """Future for api.name(*args): on the shared client for remote APIs, on executor otherwise"""
+    if isinstance(api, RemoteApi):
+        return api.submit(name, *args)
+    return executor.submit(getattr(api, name), *args)
+
+
+def call_many(api, name, arg_tuples):
+    """
+    api.name(*args) for each args; concurrent for remote APIs, sequential
+    in-process. Returns results in order, with the exception in place of a failed call.
+    """
+    if isinstance(api, RemoteApi):
+        return api.client.gather([(api._url(name), args, None) for args in arg_tuples])
+    results = []
+    for args in arg_tuples:
+        try:
+            results.append(getattr(api, name)(*args))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def create_backend_apis(mode=None):
+    """
+    (crm_api, credit_bureau_api, offer_mart_api, api_client) for MOCK_API_MODE;
+    api_client is None in-process.
+    """
+    mode = mode or os.environ.get('MOCK_API_MODE', 'inprocess')
+    if mode == 'inprocess':
+        from mock_apis.credit_bureau_api import CreditBureauApi
+        from mock_apis.crm_api import CRMApi
+        from mock_apis.offer_mart_api import OfferMartApi
+        return CRMApi(), CreditBureauApi(), OfferMartApi(), None
+    if mode != 'http':
+        raise ValueError(f"MOCK_API_MODE must be 'inprocess' or 'http', not {mode!r}")
+
+    from mock_apis.http_service import SERVICES
+    client = ApiClient()
+    apis = [RemoteApi(client, os.environ.get(env_name, default_url), SERVICES[name][1])
+            for name, (env_name, default_url) in SERVICE_URLS.items()]
+    return apis[0], apis[1], apis[2], client
@@ -0,0 +1,233 @@
+"""
+Static asset pipeline for the chat frontend.
+
+    python -m services.assets fetch-vendor
+    python -m services.assets build --require-vendor
+
+build copies every file under static/ (css, js, vendor) to static/dist with a
+content hash in its name, writes gzip and brotli variants next to it and
+records logical name -> hashed name in static/dist/manifest.json. Templates
+reference assets through asset_url(), and /assets/<file> serves them with a
+year-long immutable Cache-Control, an ETag and the best encoding the client
+accepts. Deploys run fetch-vendor and then build --require-vendor, which
+fails if a pinned vendor file is missing instead of shipping a page that
+silently loads it from the CDN.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import urllib.request
+
+from flask import Response, abort, request, url_for
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+SOURCE_DIRS = ['css', 'js', 'vendor']
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.html'}
+MIME_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.svg': 'image/svg+xml',
+    '.json': 'application/json',
+    '.html': 'text/html; charset=utf-8'
+}
+# Third-party files pinned to a version, fetched into static/vendor
+VENDOR_FILES = {
+    'socket.io.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.1/socket.io.min.js'
+}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _write_atomic(path, data):
+    # Several workers may build at once; each writes identical bytes
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _compressed_variants(data):
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if BROTLI_AVAILABLE:
+        variants['br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+def _negotiate(accept_encoding, available):
+    """Pick br over gzip when both the client and the build have it"""
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    for encoding in ('br', 'gzip'):
+        if encoding in accepted and encoding in available:
+            return encoding
+    return None
+
+
+class AssetPipeline:
+    """Builds hashed, precompressed assets and serves them from memory"""
+
+    def __init__(self, static_dir='static', output_subdir='dist'):
+        self.static_dir = static_dir
+        self.output_dir = os.path.join(static_dir, output_subdir)
+        self.manifest_path = os.path.join(self.output_dir, 'manifest.json')
+        self.manifest = {}
+        # hashed name -> {'etag', 'mimetype', 'identity', 'gzip', 'br'}
+        self._files = {}
+        self._pages = {}
+
+    def build(self):
+        """Hash, compress and write every source asset, then reload. Returns the manifest."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = {}
+
+        for subdir in SOURCE_DIRS:
+            source_root = os.path.join(self.static_dir, subdir)
+            if not os.path.isdir(source_root):
+                continue
+            for dirpath, _, filenames in os.walk(source_root):
+                for filename in sorted(filenames):
+                    if filename.startswith('.'):
+                        continue
+                    source_path = os.path.join(dirpath, filename)
+                    logical_name = os.path.relpath(source_path, self.static_dir).replace(os.sep, '/')
+                    with open(source_path, 'rb') as f:
+                        data = f.read()
+
+                    digest = hashlib.sha256(data).hexdigest()[:12]
+                    stem, ext = os.path.splitext(logical_name.replace('/', '.'))
+                    if stem.endswith('.min'):
+                        stem, ext = stem[:-4], '.min' + ext
+                    hashed_name = f"{stem}.{digest}{ext}"
+
+                    _write_atomic(os.path.join(self.output_dir, hashed_name), data)
+                    if os.path.splitext(filename)[1] in COMPRESSIBLE_EXTENSIONS:
+                        for encoding, compressed in _compressed_variants(data).items():
+                            suffix = '.gz' if encoding == 'gzip' else '.br'
+                            _write_atomic(os.path.join(self.output_dir, hashed_name + suffix), compressed)
+                    manifest[logical_name] = hashed_name
+
+        _write_atomic(self.manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+        self.load()
+        return manifest
+
+    def load(self):
+        """Read the manifest and every built file into memory"""
+        self.manifest = {}
+        self._files = {}
+        self._pages = {}
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            self.manifest = json.load(f)
+
+        for hashed_name in self.manifest.values():
+            base_path = os.path.join(self.output_dir, hashed_name)
+            with open(base_path, 'rb') as f:
+                data = f.read()
+            entry = {
+                'etag': hashlib.sha256(data).hexdigest()[:12],
+                'mimetype': MIME_TYPES.get(os.path.splitext(hashed_name)[1], 'application/octet-stream'),
+                'identity': data
+            }
+            for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+                if os.path.exists(base_path + suffix):
+                    with open(base_path + suffix, 'rb') as f:
+                        entry[encoding] = f.read()
+            self._files[hashed_name] = entry
+
+    def asset_url(self, logical_name, fallback=None):
+        """URL for a source asset: hashed when built, else the plain static file or fallback"""
+        hashed_name = self.manifest.get(logical_name)
+        if hashed_name:
+            return url_for('serve_asset', filename=hashed_name)
+        if fallback and not os.path.exists(os.path.join(self.static_dir, logical_name)):
+            return fallback
+        return url_for('static', filename=logical_name)
+
+    def response(self, filename):
+        entry = self._files.get(filename)
+        if entry is None:
+            abort(404)
+        return self._respond(entry, IMMUTABLE_CACHE_CONTROL)
+
+    def page_response(self, key, render):
+        """
+        Serve an HTML page rendered once and kept compressed in memory.
+        Pages revalidate on every load (no-cache), but an unchanged page is a 304.
+        """
+        entry = self._pages.get(key)
+        if entry is None:
+            data = render().encode('utf-8')
+            entry = {'etag': hashlib.sha256(data).hexdigest()[:16], 'mimetype': MIME_TYPES['.html'],
+                     'identity': data}
+            entry.update(_compressed_variants(data))
+            self._pages[key] = entry
+        return self._respond(entry, 'no-cache')
+
+    def _respond(self, entry, cache_control):
+        etag = f'"{entry["etag"]}"'
+        headers = {'ETag': etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers=headers)
+
+        encoding = _negotiate(request.headers.get('Accept-Encoding', ''), entry)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(entry[encoding or 'identity'], content_type=entry['mimetype'], headers=headers)
+
+    def init_app(self, app):
+        """Register asset_url for templates and the /assets route"""
+        app.jinja_env.globals['asset_url'] = self.asset_url
+        app.add_url_rule('/assets/<path:filename>', 'serve_asset', self.response)
+
+
+def fetch_vendor_files(static_dir='static'):
+    vendor_dir = os.path.join(static_dir, 'vendor')
+    os.makedirs(vendor_dir, exist_ok=True)
+    for filename, url in VENDOR_FILES.items():
+        with urllib.request.urlopen(url, timeout=30) as response:
+            _write_atomic(os.path.join(vendor_dir, filename), response.read())
+        print(f"Fetched {url} -> {vendor_dir}/{filename}")
+
+
+def missing_vendor_files(static_dir='static'):
+    """Pinned vendor files not present (or empty) under static/vendor"""
+    vendor_dir = os.path.join(static_dir, 'vendor')
+    return [filename for filename in VENDOR_FILES
+            if not os.path.isfile(os.path.join(vendor_dir, filename))
+            or not os.path.getsize(os.path.join(vendor_dir, filename))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or vendor static assets')
+    parser.add_argument('command', choices=['build', 'fetch-vendor'])
+    parser.add_argument('--static-dir', default='static')
+    parser.add_argument('--require-vendor', action='store_true',
+                        help='fail the build if a pinned vendor file has not been fetched')
+    args = parser.parse_args()
+
+    if args.command == 'fetch-vendor':
+        fetch_vendor_files(args.static_dir)
+        return
+
+    missing = missing_vendor_files(args.static_dir)
+    if args.require_vendor and missing:
+        parser.exit(1, f"Missing vendor files in {args.static_dir}/vendor: {', '.join(missing)} "
+                       f"(run python -m services.assets fetch-vendor)\n")
+
+    pipeline = AssetPipeline(args.static_dir)
+    manifest = pipeline.build()
+    for logical_name, hashed_name in sorted(manifest.items()):
+        entry = pipeline._files[hashed_name]
+        sizes = ', '.join(f"{encoding} {len(entry[encoding])}" for encoding in ('identity', 'gzip', 'br')
+                          if encoding in entry)
+        print(f"{logical_name} -> {hashed_name} ({sizes} bytes)")
+
+
+if __name__ == '__main__':
+    main()
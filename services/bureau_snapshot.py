@@ -0,0 +1,247 @@
+"""
+Offline credit bureau snapshot: a sorted fixed-width binary file served through mmap.
+
+Bureaus ship monthly bulk files (CSV or JSONL with phone, credit_score and
+optionally credit_utilization, payment_history, credit_accounts,
+credit_age_months, recent_inquiries and last_updated). `build_snapshot`
+packs them into one file:
+
+    header (64 bytes) | prefix directory (uint32 per phone prefix) | records sorted by phone
+
+Each record is a 10-byte phone followed by the score and report fields
+(RECORD, 22 bytes). The directory holds, for every phone prefix of
+prefix_digits digits, the index of the first record with that prefix, with
+about one record per prefix. A lookup reads the prefix's range from the
+directory and finds the phone among those few records, all straight from
+the mapping. Nothing is loaded into the process, so resident memory stays
+near zero and every worker maps the same page-cache pages.
+
+    python -m services.bureau_snapshot build bureau_2025_09.csv --output bureau_snapshot.bin
+    python -m services.bureau_snapshot lookup 9876543210
+"""
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import date, datetime
+
+MAGIC = b'CBSNAP01'
+VERSION = 1
+# magic, version, record size, record count, as-of date (days since epoch), directory prefix digits
+HEADER = struct.Struct('<8sHHQIH')
+HEADER_SIZE = 64
+# phone, score, utilization %, payment history code, accounts, inquiries, credit age (months), updated (epoch days)
+RECORD = struct.Struct('<10sHBBBBHI')
+PHONE_WIDTH = 10
+MAX_PREFIX_DIGITS = 7
+
+PAYMENT_HISTORY = ('Good', 'Fair', 'Poor')
+# Stored when the bulk file has no value for a field
+MISSING_BYTE = 0xFF
+MISSING_SHORT = 0xFFFF
+
+DEFAULT_PATH = 'bureau_snapshot.bin'
+BUREAU_NAME = 'TransUnion CIBIL'
+
+
+class SnapshotError(ValueError):
+    """Raised for a bulk file or snapshot that cannot be read"""
+
+
+def epoch_days(value):
+    """Days since 1970-01-01 for a date or a 'YYYY-MM-DD' string"""
+    if isinstance(value, date):
+        return value.toordinal() - date(1970, 1, 1).toordinal()
+    return epoch_days(datetime.strptime(str(value)[:10], '%Y-%m-%d').date())
+
+
+def from_epoch_days(days):
+    return date.fromordinal(date(1970, 1, 1).toordinal() + days)
+
+
+def _small_int(row, field, missing):
+    value = row.get(field)
+    if value in (None, ''):
+        return missing
+    return max(0, min(int(float(value)), missing - 1))
+
+
+def _pack(row, default_days):
+    phone = str(row.get('phone', '')).strip()
+    if len(phone) != PHONE_WIDTH or not phone.isascii() or not phone.isdigit():
+        raise SnapshotError(f"invalid phone {phone!r}")
+    history = row.get('payment_history')
+    history_code = PAYMENT_HISTORY.index(history) if history in PAYMENT_HISTORY else MISSING_BYTE
+    updated = row.get('last_updated')
+    return RECORD.pack(
+        phone.encode('ascii'),
+        int(float(row['credit_score'])),
+        _small_int(row, 'credit_utilization', MISSING_BYTE),
+        history_code,
+        _small_int(row, 'credit_accounts', MISSING_BYTE),
+        _small_int(row, 'recent_inquiries', MISSING_BYTE),
+        _small_int(row, 'credit_age_months', MISSING_SHORT),
+        epoch_days(updated) if updated else default_days
+    )
+
+
+def _read_rows(source_path):
+    with open(source_path, newline='', encoding='utf-8') as source:
+        if source_path.endswith(('.jsonl', '.ndjson')):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(source)
+
+
+def build_snapshot(source_path, output_path=DEFAULT_PATH, as_of=None):
+    """
+    Convert a bulk file into a snapshot; returns (records written, rows skipped).
+    The latest row for a phone wins. The file is replaced atomically, so
+    running readers keep their old mapping until they reopen.
+    """
+    as_of_days = epoch_days(as_of or date.today())
+    records = {}
+    skipped = 0
+    for row in _read_rows(source_path):
+        try:
+            record = _pack(row, as_of_days)
+        except (SnapshotError, KeyError, ValueError, struct.error) as e:
+            skipped += 1
+            print(f"Skipping bureau row {row.get('phone')!r}: {e}")
+            continue
+        records[record[:PHONE_WIDTH]] = record
+
+    keys = sorted(records)
+    # Roughly one record per prefix keeps each search to a few bytes
+    prefix_digits = max(1, min(MAX_PREFIX_DIGITS, len(str(len(keys))) - 1))
+    directory = array('I', bytes(4 * (10 ** prefix_digits + 1)))
+    for key in keys:
+        directory[int(key[:prefix_digits]) + 1] += 1
+    for prefix in range(1, len(directory)):
+        directory[prefix] += directory[prefix - 1]
+    if sys.byteorder != 'little':
+        directory.byteswap()
+
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'wb') as output:
+        output.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(keys), as_of_days, prefix_digits)
+                     .ljust(HEADER_SIZE, b'\0'))
+        output.write(directory.tobytes())
+        for key in keys:
+            output.write(records[key])
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temp_path, output_path)
+    return len(keys), skipped
+
+
+class BureauSnapshot:
+    """Read-only view of a snapshot file; lookups never copy the file into memory"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, 'rb') as snapshot_file:
+            self.inode = os.fstat(snapshot_file.fileno()).st_ino
+            self._mm = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER_SIZE:
+            raise SnapshotError(f"{path} is not a bureau snapshot")
+        magic, version, record_size, self.count, as_of_days, self.prefix_digits = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise SnapshotError(f"{path} is not a version {VERSION} bureau snapshot")
+        self.as_of = from_epoch_days(as_of_days)
+        directory_size = 10 ** self.prefix_digits + 1
+        self._records_offset = HEADER_SIZE + 4 * directory_size
+        if len(self._mm) < self._records_offset + self.count * RECORD.size:
+            raise SnapshotError(f"{path} is truncated")
+        directory = memoryview(self._mm)[HEADER_SIZE:self._records_offset]
+        if sys.byteorder == 'little':
+            self._directory = directory.cast('I')
+        else:
+            # The directory is little-endian on disk; a big-endian host reads a private copy
+            self._directory = list(struct.unpack(f'<{directory_size}I', directory))
+            directory.release()
+        self._views = (directory,)
+
+    def lookup(self, phone):
+        """Unpacked record tuple for phone, or None"""
+        if not isinstance(phone, str) or len(phone) != PHONE_WIDTH or not phone.isascii() or not phone.isdigit():
+            return None
+        prefix = int(phone[:self.prefix_digits])
+        first, last = self._directory[prefix], self._directory[prefix + 1]
+        if first == last:
+            return None
+        start = self._records_offset + first * RECORD.size
+        end = self._records_offset + last * RECORD.size
+        key = phone.encode('ascii')
+        position = self._mm.find(key, start, end)
+        # Only a match on a record boundary is a phone; anything else is field bytes
+        while position != -1 and (position - start) % RECORD.size:
+            position = self._mm.find(key, position + 1, end)
+        if position == -1:
+            return None
+        return RECORD.unpack_from(self._mm, position)
+
+    def report(self, phone):
+        """Credit report for phone in CreditBureauApi's format, or None"""
+        record = self.lookup(phone)
+        return report_from_record(record) if record else None
+
+    def close(self):
+        if isinstance(self._directory, memoryview):
+            self._directory.release()
+        for view in self._views:
+            view.release()
+        self._mm.close()
+
+
+def report_from_record(record):
+    """Credit report dict for a record tuple from BureauSnapshot.lookup"""
+    _, score, utilization, history_code, accounts, inquiries, age_months, updated_days = record
+    return {
+        'credit_score': score,
+        'score_range': '300-900',
+        'last_updated': from_epoch_days(updated_days).isoformat(),
+        'credit_utilization': None if utilization == MISSING_BYTE else utilization,
+        'payment_history': (PAYMENT_HISTORY[history_code] if history_code != MISSING_BYTE
+                            else 'Good' if score > 720 else 'Fair'),
+        'credit_accounts': None if accounts == MISSING_BYTE else accounts,
+        'credit_age_months': None if age_months == MISSING_SHORT else age_months,
+        'recent_inquiries': None if inquiries == MISSING_BYTE else inquiries,
+        'bureau_name': BUREAU_NAME
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query an offline credit bureau snapshot')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='convert a bureau bulk file (CSV or JSONL)')
+    build.add_argument('source')
+    build.add_argument('--output', default=DEFAULT_PATH)
+    build.add_argument('--as-of', help='snapshot date (YYYY-MM-DD) for rows without last_updated; default today')
+    lookup = subcommands.add_parser('lookup', help='print the report for a phone')
+    lookup.add_argument('phone')
+    lookup.add_argument('--snapshot', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        written, skipped = build_snapshot(args.source, args.output, args.as_of)
+        print(f"Wrote {written} records to {args.output} ({skipped} rows skipped)")
+        return
+
+    snapshot = BureauSnapshot(args.snapshot)
+    report = snapshot.report(args.phone)
+    if report is None:
+        print(f"{args.phone} is not in the snapshot")
+    else:
+        print(json.dumps(dict(report, snapshot_as_of=snapshot.as_of.isoformat()), indent=2))
+    snapshot.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+"""
+Pre-approved outreach campaigns: a personalized pitch for every eligible CRM customer.
+
+Customers are streamed from the CRM (credit score >= 700 and a non-zero
+pre-approved limit from the Offer Mart) and pitches are written from the
+sales prompt in chunks:
+
+- batch: OpenAI Batch API, up to BATCH_MAX_REQUESTS requests per batch
+  (half the price of live calls, results within the 24h window)
+- async: live calls with at most --concurrency in flight (Gemini or OpenAI)
+- offline: a templated pitch with an EMI example, no model call
+
+Each chunk is appended to the output JSONL and fsynced before the next one
+starts. In batch mode every chunk is submitted as soon as it is built, and
+all batches are then polled together, so the whole campaign shares one 24h
+window. Each submitted batch is recorded in <output>.state.json with the
+customers it covers. It stays there until its results are written, and a
+rerun first adopts every recorded batch rather than submitting those
+customers again. A rerun skips customers already in the file, so an
+interrupted campaign resumes where it stopped. Generations that failed are
+not written and are retried by the next run.
+
+    python -m services.campaign run --output campaigns/outreach.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+from services.loan_math import calculate_emi
+from services.model_policy import model_for
+
+ELIGIBLE_MIN_CREDIT_SCORE = 700
+CHUNK_SIZE = 1000
+BATCH_MAX_REQUESTS = 50000
+BATCH_POLL_SECONDS = 60
+MAX_RETRIES = 3
+BATCH_DONE_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def eligible_customers(crm_api, offer_mart_api, min_credit_score=ELIGIBLE_MIN_CREDIT_SCORE):
+    """Yield (customer, offer) for every CRM customer who can be pitched a pre-approved loan"""
+    for customer in crm_api.iter_customers():
+        if (customer.get('credit_score') or 0) < min_credit_score:
+            continue
+        offer = offer_mart_api.get_offer({'phone': customer['phone'],
+                                          'monthly_income': customer.get('monthly_income') or 0})
+        if offer.get('pre_approved_limit', 0) > 0:
+            yield customer, offer
+
+
+def completed_ids(output_path):
+    """
+    Customer ids already written to output_path. A line cut short by an
+    interrupted write is truncated away so appending can continue cleanly.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r+b') as output:
+        good_bytes = 0
+        for line in output:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(line)['customer_id'])
+            except (ValueError, KeyError):
+                break
+            good_bytes += len(line)
+        output.truncate(good_bytes)
+    return done
+
+
+def template_pitch(customer, offer):
+    """Stand-in pitch used offline, from the customer's name and offer terms"""
+    first_name = (customer.get('name') or 'there').split()[0]
+    limit = int(offer['pre_approved_limit'])
+    tenure = min(36, int(offer['tenure_max']))
+    emi = calculate_emi(limit, offer['interest_rate'] / 100, tenure)
+    return (f"Hi {first_name}, good news! You are pre-approved for a Tata Capital personal loan of up to "
+            f"₹{limit:,} at {offer['interest_rate']}% p.a. The full amount over {tenure} months is about "
+            f"₹{emi:,.0f} a month, with no collateral, quick approval and tenures up to {offer['tenure_max']} "
+            f"months. Reply YES to get started.")
+
+
+class TemplateGenerator:
+    source = 'template'
+    model = None
+
+    async def generate(self, jobs):
+        return {job['customer_id']: template_pitch(job['customer'], job['offer']) for job in jobs}
+
+
+class AsyncLLMGenerator:
+    """Live model calls with at most concurrency requests in flight"""
+
+    source = 'llm'
+
+    def __init__(self, provider, model=None, concurrency=32):
+        self.provider = provider
+        self.model = model or model_for(provider, 'campaign')
+        self.concurrency = concurrency
+        self.failed = 0
+        self._client = None
+
+    async def generate(self, jobs):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(job):
+            async with semaphore:
+                return job['customer_id'], await self._complete_with_retries(job)
+
+        results = await asyncio.gather(*(one(job) for job in jobs))
+        return {customer_id: message for customer_id, message in results if message}
+
+    async def _complete_with_retries(self, job):
+        for attempt in range(MAX_RETRIES):
+            try:
+                message = await self._complete(job['system_prompt'], job['user_message'])
+                if message:
+                    return message.strip()
+            except Exception as e:
+                print(f"Campaign generation for customer {job['customer_id']} failed "
+                      f"(attempt {attempt + 1}): {e}")
+            if attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+        self.failed += 1
+        return None
+
+    async def _complete(self, system_prompt, user_message):
+        if self.provider == 'openai':
+            import openai_client
+            if self._client is None:
+                from openai import AsyncOpenAI
+                self._client = AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+            response = await self._client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "system", "content": system_prompt},
+                          {"role": "user", "content": user_message}]
+            )
+            openai_client._record_usage(self.model, response)
+            return response.choices[0].message.content
+
+        import gemini_client
+        model = gemini_client.genai.GenerativeModel(self.model, system_instruction=system_prompt)
+        response = await model.generate_content_async(user_message)
+        gemini_client._record_usage(self.model, response)
+        return response.text
+
+
+class OpenAIBatchGenerator:
+    """
+    OpenAI batches, submitted one per chunk and polled together. Every
+    submitted batch is recorded in state_path with the customers it covers
+    until its results are written, so a rerun collects it instead of paying
+    for the same requests twice.
+    """
+
+    source = 'batch'
+
+    def __init__(self, state_path, model=None, poll_seconds=BATCH_POLL_SECONDS):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        self.state_path = state_path
+        self.model = model or model_for('openai', 'campaign')
+        self.poll_seconds = poll_seconds
+        self.failed = 0
+        self.batches = (self._load_state() or {}).get('batches', [])
+
+    def pending_ids(self):
+        """Customer ids covered by recorded batches, whether from this run or an earlier one"""
+        return {int(customer_id) for entry in self.batches for customer_id in entry['customers']}
+
+    async def submit(self, jobs):
+        """Submit one batch and record it before returning"""
+        batch_id = await self._submit(jobs)
+        self.batches.append({
+            'batch_id': batch_id,
+            'customers': {str(job['customer_id']): {'name': job['customer']['name'],
+                                                    'phone': job['customer']['phone'],
+                                                    'offer': job['offer']} for job in jobs}
+        })
+        self._save_state()
+
+    async def collect(self, write):
+        """
+        Poll every recorded batch until all have finished. write(jobs, results)
+        is called for each finished batch, which is then dropped from the state.
+        """
+        while self.batches:
+            batches = await asyncio.gather(*(self.client.batches.retrieve(entry['batch_id'])
+                                             for entry in self.batches))
+            running = []
+            for entry, batch in zip(list(self.batches), batches):
+                if batch.status not in BATCH_DONE_STATUSES:
+                    counts = batch.request_counts
+                    progress = f" ({counts.completed}/{counts.total})" if counts else ''
+                    running.append(f"{batch.id} {batch.status}{progress}")
+                    continue
+                jobs = [{'customer_id': int(customer_id), 'customer': record, 'offer': record['offer']}
+                        for customer_id, record in entry['customers'].items()]
+                results = await self._results(batch)
+                self.failed += len(jobs) - len(results)
+                if batch.status != 'completed':
+                    print(f"Batch {batch.id} ended {batch.status}; "
+                          f"{len(jobs) - len(results)} customers left for the next run")
+                write(jobs, results)
+                self.batches.remove(entry)
+                self._save_state()
+            if running:
+                print(f"Batches still running: {', '.join(running)}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _results(self, batch):
+        results = {}
+        if batch.output_file_id:
+            content = await self.client.files.content(batch.output_file_id)
+            for line in content.text.splitlines():
+                result = json.loads(line)
+                response = result.get('response') or {}
+                if response.get('status_code') != 200:
+                    continue
+                body = response['body']
+                results[int(result['custom_id'])] = body['choices'][0]['message']['content'].strip()
+                usage = body.get('usage') or {}
+                self._record_usage(usage)
+        return results
+
+    async def _submit(self, jobs):
+        lines = [json.dumps({
+            'custom_id': str(job['customer_id']),
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': {
+                'model': self.model,
+                'messages': [{"role": "system", "content": job['system_prompt']},
+                             {"role": "user", "content": job['user_message']}]
+            }
+        }) for job in jobs]
+        batch_file = await self.client.files.create(
+            file=('campaign.jsonl', ('\n'.join(lines) + '\n').encode('utf-8')), purpose='batch')
+        batch = await self.client.batches.create(input_file_id=batch_file.id, endpoint='/v1/chat/completions',
+                                                 completion_window='24h')
+        print(f"Submitted batch {batch.id} with {len(jobs)} requests")
+        return batch.id
+
+    def _record_usage(self, usage):
+        import openai_client
+        with openai_client._token_usage_lock:
+            model_usage = openai_client.usage_by_model.setdefault(
+                self.model, {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0})
+            for totals in (openai_client.token_usage, model_usage):
+                totals['calls'] += 1
+                totals['prompt_tokens'] += usage.get('prompt_tokens', 0)
+                totals['output_tokens'] += usage.get('completion_tokens', 0)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self):
+        if not self.batches:
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            return
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w') as state_file:
+            json.dump({'batches': self.batches}, state_file)
+        os.replace(temp_path, self.state_path)
+
+
+def choose_generator(mode, provider, output_path, concurrency=32, model=None):
+    """
+    auto picks the batch API for OpenAI, live async calls for Gemini, and the
+    offline template when the provider has no API key configured.
+    """
+    if mode == 'auto':
+        if provider == 'openai':
+            mode = 'batch' if os.environ.get('OPENAI_API_KEY') else 'offline'
+        else:
+            from gemini_client import GOOGLE_AI_AVAILABLE
+            mode = 'async' if GOOGLE_AI_AVAILABLE and os.environ.get('GEMINI_API_KEY') else 'offline'
+
+    if mode == 'offline':
+        return TemplateGenerator()
+    if mode == 'batch':
+        if provider != 'openai':
+            raise ValueError("batch mode needs --provider openai")
+        return OpenAIBatchGenerator(output_path + '.state.json', model=model)
+    return AsyncLLMGenerator(provider, model=model, concurrency=concurrency)
+
+
+async def run_campaign(output_path, generator, crm_api, offer_mart_api, sales_agent, chunk_size=CHUNK_SIZE,
+                       limit=None):
+    """Generate pitches for every eligible customer not yet in output_path; returns run stats"""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    done = completed_ids(output_path)
+    stats = {'eligible': 0, 'skipped': len(done), 'written': 0, 'failed': 0}
+    started = time.time()
+
+    batched = generator.source == 'batch'
+    # Customers in batches recorded by an earlier run are collected, not resubmitted
+    pending = generator.pending_ids() if batched else set()
+
+    with open(output_path, 'a', encoding='utf-8') as output:
+        def write(chunk, results):
+            generated_at = datetime.now().isoformat()
+            for job in chunk:
+                if job['customer_id'] in done:
+                    # Written before a crash that kept its batch in the state file
+                    continue
+                message = results.get(job['customer_id'])
+                if message is None:
+                    stats['failed'] += 1
+                    continue
+                done.add(job['customer_id'])
+                customer = job['customer']
+                output.write(json.dumps({
+                    'customer_id': job['customer_id'],
+                    'name': customer['name'],
+                    'phone': customer['phone'],
+                    'offer': job['offer'],
+                    'message': message,
+                    'source': generator.source,
+                    'model': generator.model,
+                    'generated_at': generated_at
+                }, ensure_ascii=False) + '\n')
+                stats['written'] += 1
+            # Durable before the next chunk starts, or before its batch leaves the state file
+            output.flush()
+            os.fsync(output.fileno())
+            elapsed = max(time.time() - started, 1e-6)
+            print(f"{stats['written']} written, {stats['failed']} failed ({stats['written'] / elapsed:.1f}/s)")
+
+        async def flush(chunk):
+            if batched:
+                await generator.submit(chunk)
+            else:
+                write(chunk, await generator.generate(chunk))
+
+        if pending:
+            print(f"Collecting {len(generator.batches)} batches from an earlier run ({len(pending)} customers)")
+        chunk = []
+        queued = 0
+        for customer, offer in eligible_customers(crm_api, offer_mart_api):
+            stats['eligible'] += 1
+            if customer['id'] in done or customer['id'] in pending:
+                continue
+            if limit is not None and queued >= limit:
+                break
+            system_prompt, user_message = sales_agent.outreach_prompt(customer, offer)
+            chunk.append({'customer_id': customer['id'], 'customer': customer, 'offer': offer,
+                          'system_prompt': system_prompt, 'user_message': user_message})
+            queued += 1
+            if len(chunk) >= chunk_size:
+                await flush(chunk)
+                chunk = []
+        if chunk:
+            await flush(chunk)
+        if batched:
+            await generator.collect(write)
+
+    stats['seconds'] = round(time.time() - started, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate pre-approved outreach pitches for eligible CRM customers')
+    parser.add_argument('command', choices=['run'])
+    parser.add_argument('--output', default='campaigns/outreach.jsonl')
+    parser.add_argument('--mode', choices=['auto', 'batch', 'async', 'offline'], default='auto')
+    parser.add_argument('--provider', choices=['gemini', 'openai'], default='gemini')
+    parser.add_argument('--model', help='defaults to the campaign model in services.model_policy')
+    parser.add_argument('--concurrency', type=int, default=32, help='live calls in flight (async mode)')
+    parser.add_argument('--chunk-size', type=int, help=f'customers per write (default {CHUNK_SIZE}, '
+                                                       f'{BATCH_MAX_REQUESTS} per batch in batch mode)')
+    parser.add_argument('--limit', type=int, help='stop after this many new customers')
+    args = parser.parse_args()
+
+    from agents.sales_agent import SalesAgent
+    from mock_apis.crm_api import CRMApi
+    from mock_apis.offer_mart_api import OfferMartApi
+
+    crm_api = CRMApi()
+    crm_api.initialize_database()
+    generator = choose_generator(args.mode, args.provider, args.output, args.concurrency, args.model)
+    chunk_size = args.chunk_size or (BATCH_MAX_REQUESTS if generator.source == 'batch' else CHUNK_SIZE)
+    print(f"Campaign -> {args.output} ({generator.source}, {generator.model or 'no model'})")
+
+    stats = asyncio.run(run_campaign(args.output, generator, crm_api, OfferMartApi(), SalesAgent(),
+                                     chunk_size=min(chunk_size, BATCH_MAX_REQUESTS), limit=args.limit))
+    print(f"Done: {stats['written']} written, {stats['failed']} failed, {stats['skipped']} already done, "
+          f"{stats['eligible']} eligible in {stats['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Job:
+    __slots__ = ('handler', 'payload', 'kind', 'merge', 'on_error')
+
+    def __init__(self, handler, payload, kind, merge, on_error):
+        self.handler = handler
+        self.payload = payload
+        self.kind = kind
+        self.merge = merge
+        self.on_error = on_error
+
+
+class SessionDispatcher:
+    """
+    Runs turns on a worker pool: strictly in order within a session, in parallel across sessions.
+
+    Each session has its own FIFO of pending jobs, and at most one of its jobs
+    runs at a time, so agents never see two turns of one session interleave.
+    A worker runs one job and then puts the session back at the end of the
+    pool's queue, so a chatty session cannot starve the others. Pending jobs
+    of the same kind can be coalesced into one: several quick messages become
+    a single turn.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or int(os.environ.get('DISPATCHER_WORKERS', 32))
+        # Jobs a session may have waiting; beyond this new work is shed
+        self.max_pending = max_pending or int(os.environ.get('DISPATCHER_MAX_PENDING', 5))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='dispatch')
+        self._queues = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'coalesced': 0, 'cancelled': 0, 'shed': 0}
+
+    def submit(self, key, handler, payload, kind=None, merge=None, on_error=None):
+        """
+        Queue handler(payload) behind the session's earlier jobs.
+        With merge, a pending job of the same kind absorbs this one as
+        merge(pending_payload, payload) instead of a new job being queued.
+        If the handler raises, on_error(exception) is called so the caller can
+        still answer the turn.
+        Returns False when the session already has max_pending jobs waiting.
+        """
+        with self._lock:
+            queue = self._queues.setdefault(key, deque())
+            tail = queue[-1] if queue else None
+            if merge and tail is not None and tail.kind == kind:
+                tail.payload = merge(tail.payload, payload)
+                self.stats['coalesced'] += 1
+                return True
+            if len(queue) >= self.max_pending:
+                self.stats['shed'] += 1
+                return False
+            queue.append(_Job(handler, payload, kind, merge, on_error))
+            self.stats['submitted'] += 1
+            start = key not in self._running
+            if start:
+                self._running.add(key)
+        if start:
+            self.executor.submit(self._run_next, key)
+        return True
+
+    def cancel(self, key):
+        """Drop the session's pending jobs (a job already running finishes); returns how many"""
+        with self._lock:
+            queue = self._queues.get(key)
+            dropped = len(queue) if queue else 0
+            if queue:
+                queue.clear()
+            self.stats['cancelled'] += dropped
+        return dropped
+
+    def pending(self, key):
+        with self._lock:
+            queue = self._queues.get(key)
+            return len(queue) if queue else 0
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats,
+                        workers=self.max_workers,
+                        active_sessions=len(self._running),
+                        pending=sum(len(queue) for queue in self._queues.values()))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def _run_next(self, key):
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                # Nothing left (or cancelled): the session is idle again
+                self._running.discard(key)
+                self._queues.pop(key, None)
+                return
+            job = queue.popleft()
+
+        try:
+            job.handler(job.payload)
+            outcome = 'completed'
+        except Exception as e:
+            print(f"Dispatched {job.kind or 'job'} failed: {e}")
+            outcome = 'failed'
+            if job.on_error:
+                try:
+                    job.on_error(e)
+                except Exception as error_handler_error:
+                    print(f"Error handler for {job.kind or 'job'} failed: {error_handler_error}")
+
+        with self._lock:
+            self.stats[outcome] += 1
+        # Back of the line, behind other sessions' work
+        self.executor.submit(self._run_next, key)
@@ -0,0 +1,219 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Session fields that describe an underwriting decision
+DECISION_FIELDS = ['approval_status', 'approval_type', 'rejection_reason', 'loan_application',
+                   'emi_details', 'verification_status', 'credit_score']
+
+FSYNC_POLICIES = ('always', 'batch', 'interval', 'never')
+
+
+class SQLiteEventBackend:
+    """Batch-inserts events into an SQLite table"""
+
+    def __init__(self, db_path='events.db', fsync='batch'):
+        self.db_path = db_path
+        self.fsync = fsync
+        self._conn = None
+
+    def _connect(self):
+        # Created lazily so the connection belongs to the writer thread
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        synchronous = {'always': 'FULL', 'batch': 'NORMAL', 'interval': 'NORMAL', 'never': 'OFF'}[self.fsync]
+        conn.execute(f'PRAGMA synchronous={synchronous}')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                session_id TEXT,
+                type TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_events_session ON events (session_id, ts)')
+        conn.commit()
+        return conn
+
+    def write_batch(self, events):
+        if self._conn is None:
+            self._conn = self._connect()
+        self._conn.executemany(
+            'INSERT INTO events (ts, session_id, type, payload) VALUES (?, ?, ?, ?)',
+            [(event['ts'], event.get('session_id'), event['type'], json.dumps(event, default=str))
+             for event in events]
+        )
+        self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class JsonlEventBackend:
+    """Appends events to size-rotated JSONL files with a configurable fsync policy"""
+
+    def __init__(self, directory='event_logs', filename='events.jsonl', max_bytes=50 * 1024 * 1024,
+                 backup_count=10, fsync='batch', fsync_interval=1.0):
+        self.directory = directory
+        self.path = os.path.join(directory, filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._last_fsync = 0.0
+
+    def write_batch(self, events):
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+        for event in events:
+            self._file.write(json.dumps(event, default=str, ensure_ascii=False) + '\n')
+            if self.fsync == 'always':
+                self._sync()
+        if self.fsync == 'batch':
+            self._sync()
+        elif self.fsync == 'interval' and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sync()
+        else:
+            self._file.flush()
+
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self):
+        """events.jsonl -> events.jsonl.1 -> ... -> events.jsonl.<backup_count>"""
+        self.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class EventLog:
+    """
+    Append-only log of conversation turns, stage transitions and decisions.
+
+    record_* calls only enqueue; a background writer thread drains the queue
+    and hands batches to the backend, so the request path never touches disk.
+    """
+
+    def __init__(self, backend, batch_size=500, flush_interval=0.5, max_queue=100000):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+        self._writer = threading.Thread(target=self._run, name='event-log-writer', daemon=True)
+        self._writer.start()
+
+    def record(self, event_type, session_id=None, **fields):
+        """Enqueue an event without blocking"""
+        if self._closed:
+            return
+        event = {'ts': time.time(), 'type': event_type, 'session_id': session_id}
+        event.update(fields)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def record_turn(self, session_data, role, message, agent=None):
+        self.record('turn', session_data.get('session_id'), role=role, message=message, agent=agent,
+                    stage=session_data.get('current_stage'))
+
+    def record_stage_transition(self, session_data, from_stage, to_stage):
+        """Stage listener: logs the transition with any decision fields set on the session"""
+        # Shallow copies, since the writer serializes after the session moves on
+        decision = {field: dict(value) if isinstance(value, dict) else value
+                    for field, value in session_data.items() if field in DECISION_FIELDS}
+        self.record('stage_transition', session_data.get('session_id'), from_stage=from_stage,
+                    to_stage=to_stage, decision=decision)
+
+    def close(self, timeout=5.0):
+        """Flush everything queued so far and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    def metrics(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'write_errors': self.write_errors
+        }
+
+    def _run(self):
+        running = True
+        while running:
+            batch = []
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+                if event is None:
+                    running = False
+                else:
+                    batch.append(event)
+                    # Drain whatever else is already waiting, up to one batch
+                    while len(batch) < self.batch_size:
+                        event = self._queue.get_nowait()
+                        if event is None:
+                            running = False
+                            break
+                        batch.append(event)
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self.backend.write_batch(batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.write_errors += 1
+                    print(f"Event log write failed: {e}")
+
+        self.backend.close()
+
+
+def create_event_log(backend=None, path=None, fsync=None):
+    """
+    Build an EventLog from arguments or EVENT_LOG_BACKEND / EVENT_LOG_PATH / EVENT_LOG_FSYNC.
+    Returns None when the backend is 'off'.
+    """
+    backend = backend or os.environ.get('EVENT_LOG_BACKEND', 'sqlite')
+    fsync = fsync or os.environ.get('EVENT_LOG_FSYNC', 'batch')
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"EVENT_LOG_FSYNC must be one of {FSYNC_POLICIES}")
+
+    if backend == 'off':
+        return None
+    if backend == 'sqlite':
+        return EventLog(SQLiteEventBackend(path or os.environ.get('EVENT_LOG_PATH', 'events.db'), fsync=fsync))
+    if backend == 'jsonl':
+        return EventLog(JsonlEventBackend(path or os.environ.get('EVENT_LOG_PATH', 'event_logs'), fsync=fsync))
+    raise ValueError(f"Unknown EVENT_LOG_BACKEND: {backend}")
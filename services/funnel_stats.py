@@ -0,0 +1,116 @@
+import threading
+import time
+
+# Stages in funnel order; 'completed' and 'rejected' are terminal
+FUNNEL_STAGES = ['initial', 'greeting_and_interest', 'sales_pitch', 'collect_personal_info', 'verification',
+                 'reverification', 'underwriting', 'document_upload', 'counter_offer', 'sanction_letter', 'completed', 'rejected']
+
+REJECTION_REASONS = ['credit_score', 'amount_too_high', 'high_emi_ratio']
+
+# Stages every session passes through in order; reaching one implies reaching those before it
+MAIN_PATH = ['initial', 'greeting_and_interest', 'sales_pitch', 'collect_personal_info', 'verification',
+             'underwriting', 'sanction_letter']
+# Side stages and the main-path stage they branch off. 'completed' implies nothing,
+# since it follows both sanction_letter and rejected
+BRANCHES = {'reverification': 'verification', 'document_upload': 'underwriting', 'counter_offer': 'underwriting',
+            'rejected': 'underwriting', 'completed': None}
+
+
+class FunnelStats:
+    """
+    Funnel and decision counters maintained incrementally from stage transitions.
+
+    Every update touches a fixed number of counters, and snapshot() only reads
+    them, so /stats costs the same no matter how many sessions or events exist.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.total_sessions = 0
+        self.active_by_stage = {stage: 0 for stage in FUNNEL_STAGES}
+        # Number of sessions that ever reached each stage
+        self.reached = {stage: 0 for stage in FUNNEL_STAGES}
+        self.rejections = {reason: 0 for reason in REJECTION_REASONS}
+        self.approvals = {'instant': 0, 'document_verified': 0}
+        self.approved_count = 0
+        self.approved_amount_total = 0
+        # session_id -> stages already counted in self.reached, dropped when the session ends
+        self._seen = {}
+
+    def session_started(self, session_data):
+        stage = session_data.get('current_stage', 'initial')
+        with self._lock:
+            self.total_sessions += 1
+            self._seen[session_data.get('session_id')] = set()
+            self._enter(session_data.get('session_id'), stage)
+
+    def session_ended(self, session_data):
+        stage = session_data.get('current_stage', 'initial')
+        with self._lock:
+            self._adjust_active(stage, -1)
+            self._seen.pop(session_data.get('session_id'), None)
+
+    def record_stage_transition(self, session_data, from_stage, to_stage):
+        """Stage listener: moves the session between stage counters and counts decisions"""
+        with self._lock:
+            self._adjust_active(from_stage, -1)
+            self._enter(session_data.get('session_id'), to_stage)
+
+            if to_stage == 'rejected':
+                reason = session_data.get('rejection_reason', 'unknown')
+                self.rejections[reason] = self.rejections.get(reason, 0) + 1
+            elif to_stage == 'sanction_letter' and session_data.get('approval_status') == 'approved':
+                approval_type = session_data.get('approval_type', 'unknown')
+                self.approvals[approval_type] = self.approvals.get(approval_type, 0) + 1
+                self.approved_count += 1
+                self.approved_amount_total += self._approved_amount(session_data)
+
+    def snapshot(self):
+        with self._lock:
+            sales_pitch = self.reached['sales_pitch']
+            sanctioned = self.reached['sanction_letter']
+            return {
+                'since': self.started_at,
+                'total_sessions': self.total_sessions,
+                'active_sessions': sum(self.active_by_stage.values()),
+                'sessions_by_stage': dict(self.active_by_stage),
+                'reached_by_stage': dict(self.reached),
+                'conversion': {
+                    'sales_pitch': sales_pitch,
+                    'sanction_letter': sanctioned,
+                    'rate': round(sanctioned / sales_pitch, 4) if sales_pitch else None
+                },
+                'rejections': dict(self.rejections),
+                'approvals': dict(self.approvals),
+                'average_approved_amount': (round(self.approved_amount_total / self.approved_count, 2)
+                                            if self.approved_count else None)
+            }
+
+    def _enter(self, session_id, stage):
+        self._adjust_active(stage, 1)
+        seen = self._seen.setdefault(session_id, set())
+        # One turn can jump several stages (initial straight to underwriting), and
+        # listeners only see the jump, so every stage it passed counts as reached
+        for reached in [stage] + self._stages_before(stage):
+            if reached not in seen:
+                seen.add(reached)
+                self.reached[reached] = self.reached.get(reached, 0) + 1
+
+    def _stages_before(self, stage):
+        anchor = BRANCHES.get(stage, stage)
+        if anchor not in MAIN_PATH:
+            return []
+        return MAIN_PATH[:MAIN_PATH.index(anchor) + (stage != anchor)]
+
+    def _adjust_active(self, stage, delta):
+        self.active_by_stage[stage] = max(0, self.active_by_stage.get(stage, 0) + delta)
+
+    def _approved_amount(self, session_data):
+        amount = session_data.get('loan_application', {}).get('requested_amount')
+        if amount is None:
+            amount = session_data.get('customer_data', {}).get('loan_amount', 0)
+        try:
+            return int(amount)
+        except (ValueError, TypeError):
+            return 0
@@ -0,0 +1,143 @@
+import json
+import re
+
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Same label set and next actions as the analyze_conversation_intent prompt
+INTENT_NEXT_ACTIONS = {
+    'greeting': 'sales_pitch',
+    'inquiry': 'sales_pitch',
+    'personal_info': 'collect_info',
+    'loan_details': 'collect_info',
+    'verification': 'verify_kyc',
+    'document_upload': 'request_documents',
+    'objection': 'handle_objection',
+    'closing': 'close_deal'
+}
+
+INTENT_KEYWORDS = {
+    'greeting': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'namaste'],
+    'inquiry': ['interest rate', 'how much', 'what is', 'what are', 'tell me', 'eligibility', 'eligible',
+                'processing fee', 'how long', 'collateral', 'interested', 'options', 'know more',
+                'can i get', 'do you offer', 'approval time'],
+    'personal_info': ['my name', 'i live', 'phone number', 'mobile', 'email', 'my city', 'monthly income',
+                      'salary is', 'i earn', 'i work', 'residing'],
+    'loan_details': ['borrow', 'loan amount', 'lakh', 'lakhs', 'need a loan', 'looking for', 'renovation',
+                     'wedding', 'medical', 'education', 'travel', 'business', 'debt', 'consolidate',
+                     'tenure', 'months', 'years'],
+    'verification': ['verify', 'go ahead', 'kyc', 'check my details', 'proceed', 'sure', 'okay', 'ok'],
+    'document_upload': ['upload', 'salary slip', 'payslip', 'document', 'attach', 'pdf', 'bank statement'],
+    'objection': ['too high', 'expensive', 'not sure', 'think about it', 'later', 'not interested', 'costly',
+                  'hidden charges', 'worried', 'cheaper', 'other bank', "don't want", 'no thanks'],
+    'closing': ['thank you', 'thanks', 'bye', 'great to hear', "that's all", 'goodbye', 'have a nice day']
+}
+
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+\.[\w.]+')
+PHONE_PATTERN = re.compile(r'(?<!\d)(?:\+?91[\s-]?)?\d{5}[\s-]?\d{5}(?!\d)')
+AMOUNT_PATTERN = re.compile(r'(₹|rs\.?|inr)\s*[\d,]+|[\d,.]+\s*(lakh|lakhs|lac|k\b|crore)', re.IGNORECASE)
+
+# Stages whose handlers read intent_data; other stages skip classification entirely
+INTENT_STAGES = {'initial', 'greeting_and_interest', 'sales_pitch'}
+
+
+class IntentClassifier:
+    """
+    Local keyword and fuzzy intent classifier with an LLM fallback.
+
+    Messages are scored against the fixed intent labels locally. The LLM is
+    only consulted when local confidence is low and the stage uses intent.
+    """
+
+    def __init__(self, llm_classifier=None, threshold=0.7, fuzzy_cutoff=85):
+        self.llm_classifier = llm_classifier
+        self.threshold = threshold
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.stats = {'local': 0, 'llm': 0, 'llm_failed': 0}
+
+        # Short keywords match on word boundaries only; longer ones also match fuzzily
+        self._exact_patterns = {}
+        self._fuzzy_keywords = {}
+        for intent, keywords in INTENT_KEYWORDS.items():
+            self._exact_patterns[intent] = re.compile(
+                r'\b(' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b'
+            )
+            self._fuzzy_keywords[intent] = [keyword for keyword in keywords if len(keyword) >= 5]
+
+    def classify(self, message):
+        """Classify a message locally. Returns the same shape as the LLM JSON response."""
+        text = message.lower()
+        scores = {intent: self._score_intent(intent, text) for intent in INTENT_KEYWORDS}
+
+        # Structured details are strong signals on their own
+        if EMAIL_PATTERN.search(text) or PHONE_PATTERN.search(text):
+            scores['personal_info'] = max(scores['personal_info'], 1.0)
+        if AMOUNT_PATTERN.search(text):
+            scores['loan_details'] = max(scores['loan_details'], 0.8)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        intent, top_score = ranked[0]
+        second_score = ranked[1][1]
+
+        if top_score == 0:
+            intent = 'inquiry'
+            confidence = 0.0
+        else:
+            # Penalize messages that match several intents equally well
+            confidence = top_score * min(1.0, 0.6 + (top_score - second_score))
+
+        return {
+            'intent': intent,
+            'confidence': round(confidence, 2),
+            'next_action': INTENT_NEXT_ACTIONS[intent],
+            'extracted_info': {},
+            'source': 'local'
+        }
+
+    def analyze(self, conversation_history, message, stage=None, escalate=True):
+        """
+        Classify a message, escalating to the LLM when local confidence is low
+        and the stage makes use of the intent. escalate=False keeps it local.
+        """
+        result = self.classify(message)
+
+        needs_llm = (escalate and result['confidence'] < self.threshold
+                     and (stage is None or stage in INTENT_STAGES))
+        if not needs_llm or not self.llm_classifier:
+            self.stats['local'] += 1
+            return result
+
+        try:
+            llm_result = json.loads(self.llm_classifier(conversation_history, message))
+            if llm_result.get('intent') in INTENT_NEXT_ACTIONS:
+                llm_result['source'] = 'llm'
+                self.stats['llm'] += 1
+                return llm_result
+        except Exception:
+            pass
+
+        self.stats['llm_failed'] += 1
+        return result
+
+    def _score_intent(self, intent, text):
+        """
+        Best keyword match for an intent: 1.0 for an exact phrase, 0.9 for an
+        exact single word, a scaled fuzzy ratio otherwise
+        """
+        matches = self._exact_patterns[intent].findall(text)
+        if matches:
+            return 1.0 if any(' ' in match for match in matches) else 0.9
+
+        if not RAPIDFUZZ_AVAILABLE:
+            return 0.0
+
+        best = 0.0
+        for keyword in self._fuzzy_keywords[intent]:
+            score = fuzz.partial_ratio(keyword, text, score_cutoff=self.fuzzy_cutoff)
+            if score:
+                # Typos count for less than exact hits
+                best = max(best, 0.85 * score / 100)
+        return best
@@ -0,0 +1,228 @@
+"""
+LLM-free loan quotes: EMI, total interest and eligibility over a grid of
+amounts x tenures.
+
+The grid is computed in one pass. (1 + r)^n is evaluated once per tenure,
+which gives a per-rupee EMI factor for that tenure, and every cell is then a
+single multiplication. The grid depends only on the offer terms and the
+normalized parameters, so identical grids are served from an LRU of encoded
+JSON bodies. The Offer Mart lookup that supplies the terms is not cached and
+runs on every request.
+
+Quotes are indicative: the rate and limits come from OfferMartApi and the
+affordability rule from UnderwritingAgent, but no bureau pull is made.
+Anonymous quotes use only the request's income or rate. A customer's own
+offer is used only for a verified chat session, never for a phone number
+given in the query.
+"""
+import json
+import math
+from functools import lru_cache
+
+PRODUCT_MIN_AMOUNT = 50000
+PRODUCT_MAX_AMOUNT = 4000000
+PRODUCT_MIN_TENURE = 12
+PRODUCT_MAX_TENURE = 72
+# Same ceiling UnderwritingAgent applies to salary-slip applications
+MAX_EMI_TO_INCOME = 0.5
+MAX_GRID_CELLS = 2000
+# Bounds for a rate given directly in an anonymous quote, in percent
+MIN_QUOTE_RATE = 1.0
+MAX_QUOTE_RATE = 36.0
+# Upper bound for monthly_income, in rupees
+MAX_QUOTE_MONTHLY_INCOME = 10000000
+QUOTE_CACHE_SIZE = 4096
+
+
+class QuoteError(ValueError):
+    """Raised for quote parameters outside what the endpoint accepts"""
+
+
+def calculate_emi(principal, annual_rate, months):
+    """Monthly instalment for annual_rate as a fraction (0.12 for 12%)"""
+    return principal * emi_factor(annual_rate, months)
+
+
+def emi_factor(annual_rate, months):
+    """EMI per rupee of principal"""
+    monthly_rate = annual_rate / 12
+    if monthly_rate == 0:
+        return 1 / months
+    growth = (1 + monthly_rate) ** months
+    return monthly_rate * growth / (growth - 1)
+
+
+def max_principal(max_emi, annual_rate, months):
+    """Largest principal whose EMI over months is at most max_emi"""
+    return max_emi / emi_factor(annual_rate, months)
+
+
+def min_tenure(principal, max_emi, annual_rate):
+    """
+    Shortest whole number of months whose EMI is at most max_emi, from
+    n = -ln(1 - r * P / E) / ln(1 + r). None when the interest alone is
+    more than max_emi.
+    """
+    monthly_rate = annual_rate / 12
+    if monthly_rate == 0:
+        return math.ceil(principal / max_emi)
+    if principal * monthly_rate >= max_emi:
+        return None
+    months = -math.log(1 - principal * monthly_rate / max_emi) / math.log(1 + monthly_rate)
+    # Guard against float noise turning an exact fit into one month more
+    return math.ceil(months - 1e-9)
+
+
+def counter_offer(max_amount, annual_rate, max_tenure, max_emi=None, min_tenure_months=PRODUCT_MIN_TENURE,
+                  default_tenure=36, step=1000):
+    """
+    Best approvable terms under an amount ceiling and an optional EMI ceiling.
+    The amount is the largest multiple of step that fits both at max_tenure; the
+    tenure is the shortest that keeps the EMI within max_emi (least total
+    interest), or default_tenure when there is no EMI ceiling. None when the
+    best amount is below the product minimum.
+    """
+    amount = max_amount
+    if max_emi:
+        amount = min(amount, max_principal(max_emi, annual_rate, max_tenure))
+    amount = int(amount // step * step)
+    if amount < PRODUCT_MIN_AMOUNT:
+        return None
+
+    if max_emi:
+        tenure = max(min_tenure_months, min_tenure(amount, max_emi, annual_rate))
+    else:
+        tenure = min(default_tenure, max_tenure)
+    emi = calculate_emi(amount, annual_rate, tenure)
+    return {
+        'amount': amount,
+        'tenure_months': tenure,
+        'monthly_emi': round(emi, 2),
+        'total_interest': round(emi * tenure - amount, 2),
+        'interest_rate': round(annual_rate * 100, 2)
+    }
+
+
+def emi_grid(amounts, tenures, annual_rate):
+    """EMI for every (amount, tenure) pair: rows follow amounts, columns follow tenures"""
+    factors = [emi_factor(annual_rate, months) for months in tenures]
+    return [[amount * factor for factor in factors] for amount in amounts]
+
+
+def eligibility(amount, pre_approved_limit):
+    """Which underwriting path an amount takes, mirroring UnderwritingAgent.process_application"""
+    if amount <= pre_approved_limit:
+        return 'instant'
+    if amount <= 2 * pre_approved_limit:
+        return 'salary_slip'
+    return 'over_limit'
+
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def quote_json(amounts, tenures, interest_rate, pre_approved_limit, tenure_max, monthly_income):
+    """
+    Encoded quote for normalized inputs (sorted tuples, rate in percent).
+    Cached: slider traffic repeats the same handful of grids.
+    """
+    emis = emi_grid(amounts, tenures, interest_rate / 100)
+    rows = []
+    for amount, row in zip(amounts, emis):
+        status = eligibility(amount, pre_approved_limit)
+        cells = []
+        for months, emi in zip(tenures, row):
+            cells.append({
+                'tenure_months': months,
+                'monthly_emi': round(emi, 2),
+                'total_interest': round(emi * months - amount, 2),
+                'tenure_allowed': months <= tenure_max,
+                'affordable': emi <= MAX_EMI_TO_INCOME * monthly_income if monthly_income else None
+            })
+        rows.append({'amount': amount, 'eligibility': status, 'quotes': cells})
+    return json.dumps({
+        'interest_rate': interest_rate,
+        'pre_approved_limit': pre_approved_limit,
+        'tenure_max': tenure_max,
+        'monthly_income': monthly_income,
+        'grid': rows
+    }, separators=(',', ':'))
+
+
+def _int_list(value, name):
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise QuoteError(f"{name} must be comma-separated integers")
+
+
+def _int_param(args, name, default=None):
+    value = args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(float(value))
+    except (ValueError, OverflowError):
+        raise QuoteError(f"{name} must be a number")
+
+
+def _range_param(args, name, low, high, default_step):
+    """Values from a comma list (name + 's') or from name_min / name_max / name_step"""
+    listed = args.get(name + 's')
+    if listed:
+        values = _int_list(listed, name + 's')
+    else:
+        start = _int_param(args, name + '_min', low)
+        stop = _int_param(args, name + '_max', high)
+        step = _int_param(args, name + '_step', default_step)
+        if step <= 0:
+            raise QuoteError(f"{name}_step must be positive")
+        values = range(start, stop + 1, step)
+        if len(values) > MAX_GRID_CELLS:
+            raise QuoteError(f"too many {name}s; grid is limited to {MAX_GRID_CELLS} cells")
+    values = sorted(set(values))
+    if not values:
+        raise QuoteError(f"no {name}s given")
+    if values[0] < low or values[-1] > high:
+        raise QuoteError(f"{name}s must be between {low} and {high}")
+    return tuple(values)
+
+
+class LoanQuoter:
+    """Builds quotes from request arguments using the customer's offer terms"""
+
+    def __init__(self, offer_mart_api):
+        self.offer_mart_api = offer_mart_api
+
+    def quote(self, args, phone=None):
+        """
+        args: mapping of query parameters. Grid: amounts=100000,200000 or
+        amount_min/amount_max/amount_step; tenures=12,24 or tenure_min/tenure_max/tenure_step.
+        Terms: interest_rate (percent) and/or monthly_income for an anonymous quote.
+        phone: a verified customer's phone, whose own offer is then used (callers
+        must never take it from the request). A phone in args is ignored.
+        Returns the encoded JSON body; raises QuoteError for bad parameters.
+        """
+        amounts = _range_param(args, 'amount', PRODUCT_MIN_AMOUNT, PRODUCT_MAX_AMOUNT, 50000)
+        tenures = _range_param(args, 'tenure', PRODUCT_MIN_TENURE, PRODUCT_MAX_TENURE, 12)
+        if len(amounts) * len(tenures) > MAX_GRID_CELLS:
+            raise QuoteError(f"grid is limited to {MAX_GRID_CELLS} cells")
+
+        monthly_income = _int_param(args, 'monthly_income', 0)
+        if not 0 <= monthly_income <= MAX_QUOTE_MONTHLY_INCOME:
+            raise QuoteError(f"monthly_income must be between 0 and {MAX_QUOTE_MONTHLY_INCOME}")
+        offer = self.offer_mart_api.get_offer({'phone': phone or '', 'monthly_income': monthly_income})
+        interest_rate = float(offer['interest_rate'])
+        if not phone and args.get('interest_rate') not in (None, ''):
+            try:
+                interest_rate = float(args['interest_rate'])
+            except ValueError:
+                raise QuoteError("interest_rate must be a number")
+            if not MIN_QUOTE_RATE <= interest_rate <= MAX_QUOTE_RATE:
+                raise QuoteError(f"interest_rate must be between {MIN_QUOTE_RATE} and {MAX_QUOTE_RATE}")
+        return quote_json(amounts, tenures, interest_rate, int(offer['pre_approved_limit']),
+                          int(offer['tenure_max']), monthly_income)
+
+    def metrics(self):
+        info = quote_json.cache_info()
+        lookups = info.hits + info.misses
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize,
+                'hit_rate': round(info.hits / lookups, 3) if lookups else 0.0}
@@ -0,0 +1,255 @@
+"""
+Local stand-in for a Socket.IO message queue.
+
+Run the broker with:
+
+    python -m services.local_broker --host 127.0.0.1 --port 6380
+
+and point workers at it with SOCKETIO_MESSAGE_QUEUE=local://127.0.0.1:6380.
+Each worker opens a publish connection and a subscribe connection. Every
+frame a worker publishes is fanned out to all subscribers, so an emit from
+one worker reaches clients connected to any other.
+
+Frames are length-prefixed UTF-8 JSON, never pickle, so a peer can at worst
+inject events, not run code. The broker has no authentication and only
+binds to loopback addresses; workers on other hosts need a real queue
+(SOCKETIO_MESSAGE_QUEUE=redis://...). Emitted payloads must be JSON
+serializable, which rules out binary attachments.
+"""
+import argparse
+import ipaddress
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+_HEADER = struct.Struct('!I')
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+# First byte a client sends: it only publishes, or only subscribes
+ROLE_PUBLISH = b'P'
+ROLE_SUBSCRIBE = b'S'
+# Frames a subscriber may fall behind before the broker disconnects it
+SUBSCRIBER_QUEUE_FRAMES = 10000
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError('broker connection closed')
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ConnectionError(f'broker frame of {size} bytes exceeds {MAX_FRAME_BYTES}')
+    return _recv_exact(sock, size)
+
+
+def _parse_url(url):
+    parsed = urlparse(url)
+    return parsed.hostname or '127.0.0.1', parsed.port or 6380
+
+
+def _is_loopback(host):
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(address.split('%')[0]).is_loopback
+                                   for address in addresses)
+
+
+class LocalBroker:
+    """
+    Fan-out broker: relays every published frame to every subscriber.
+
+    Each connection sends one role byte first: ROLE_PUBLISH connections only
+    send frames, ROLE_SUBSCRIBE connections only receive them. Each
+    subscriber has its own bounded outbound queue and writer thread. A
+    subscriber that falls SUBSCRIBER_QUEUE_FRAMES behind is disconnected (it
+    reconnects) rather than stalling every publisher.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6380):
+        if not _is_loopback(host):
+            raise ValueError(f"local broker has no authentication and only binds to loopback, not {host!r}")
+        self.host = host
+        self.port = port
+        # subscriber connection -> its outbound frame queue
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def bind(self):
+        """Open the listening socket; port 0 picks a free port, stored in self.port"""
+        self._server = socket.create_server((self.host, self.port), reuse_port=False)
+        self.port = self._server.getsockname()[1]
+        return self.port
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        print(f"Local Socket.IO broker listening on {self.host}:{self.port}")
+        while True:
+            conn, _ = self._server.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        try:
+            role = _recv_exact(conn, 1)
+        except (ConnectionError, OSError):
+            conn.close()
+            return
+        if role == ROLE_SUBSCRIBE:
+            self._serve_subscriber(conn)
+        elif role == ROLE_PUBLISH:
+            self._relay(conn)
+        else:
+            conn.close()
+
+    def _serve_subscriber(self, conn):
+        outbound = queue.Queue(maxsize=SUBSCRIBER_QUEUE_FRAMES)
+        with self._lock:
+            self._subscribers[conn] = outbound
+        threading.Thread(target=self._write_subscriber, args=(conn, outbound), daemon=True).start()
+        try:
+            # Subscribers send nothing; this returns when the connection closes
+            while conn.recv(1024):
+                pass
+        except OSError:
+            pass
+        self._drop(conn)
+
+    def _write_subscriber(self, conn, outbound):
+        try:
+            while True:
+                payload = outbound.get()
+                if payload is None:
+                    return
+                _send_frame(conn, payload)
+        except OSError:
+            self._drop(conn)
+
+    def _relay(self, conn):
+        try:
+            while True:
+                payload = _recv_frame(conn)
+                with self._lock:
+                    subscribers = list(self._subscribers.items())
+                for subscriber, outbound in subscribers:
+                    try:
+                        outbound.put_nowait(payload)
+                    except queue.Full:
+                        print("Local broker subscriber fell too far behind; disconnecting it")
+                        self._drop(subscriber)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _drop(self, conn):
+        with self._lock:
+            outbound = self._subscribers.pop(conn, None)
+        if outbound is not None:
+            # Wake the writer so it exits; the queue may be full
+            try:
+                outbound.put_nowait(None)
+            except queue.Full:
+                pass
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+class LocalBrokerManager(socketio.PubSubManager):
+    """Socket.IO client manager that uses LocalBroker as its message queue"""
+
+    name = 'local'
+
+    def __init__(self, url='local://127.0.0.1:6380', channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.address = _parse_url(url)
+        self._publish_sock = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self, role):
+        sock = socket.create_connection(self.address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(role)
+        return sock
+
+    def _publish(self, data):
+        payload = json.dumps({'channel': self.channel, 'data': data}, separators=(',', ':')).encode('utf-8')
+        with self._publish_lock:
+            # One reconnect attempt if the broker restarted
+            for attempt in range(2):
+                try:
+                    if self._publish_sock is None:
+                        self._publish_sock = self._connect(ROLE_PUBLISH)
+                    _send_frame(self._publish_sock, payload)
+                    return
+                except OSError:
+                    self._publish_sock = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        retry_sleep = 1
+        while True:
+            try:
+                sock = self._connect(ROLE_SUBSCRIBE)
+            except OSError:
+                self._get_logger().error('Cannot connect to local broker; retrying in %s secs', retry_sleep)
+                time.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, 60)
+                continue
+
+            retry_sleep = 1
+            try:
+                while True:
+                    try:
+                        message = json.loads(_recv_frame(sock))
+                    except ValueError:
+                        self._get_logger().error('Dropping malformed frame from local broker')
+                        continue
+                    if isinstance(message, dict) and message.get('channel') == self.channel:
+                        yield message['data']
+            except OSError:
+                self._get_logger().error('Lost connection to local broker; reconnecting')
+            finally:
+                sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Socket.IO message queue stand-in')
+    parser.add_argument('--host', default='127.0.0.1', help='loopback address to bind')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+    try:
+        broker = LocalBroker(args.host, args.port)
+    except ValueError as e:
+        parser.error(str(e))
+    broker.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
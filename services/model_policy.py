@@ -0,0 +1,77 @@
+"""
+Which model each task runs on.
+
+Every LLM call names its task; the client asks model_for(provider, task) for
+the model. Defaults keep the previous behaviour (JSON calls on the large
+Gemini model, text on the fast one, gpt-4o for OpenAI). Override per task
+with {PROVIDER}_MODEL_{TASK}, e.g. GEMINI_MODEL_EXTRACTION=gemini-2.5-flash.
+benchmarks.eval_models scores candidates for each task.
+"""
+import os
+
+TASKS = ('intent', 'extraction', 'sales_reply', 'sales_turn', 'verification', 'campaign')
+
+DEFAULT_MODELS = {
+    'gemini': {
+        'intent': 'gemini-2.5-pro',
+        'extraction': 'gemini-2.5-pro',
+        'sales_reply': 'gemini-2.5-flash',
+        'sales_turn': 'gemini-2.5-pro',
+        'verification': 'gemini-2.5-flash',
+        # Outreach pitches are short and generated in bulk
+        'campaign': 'gemini-2.5-flash-lite'
+    },
+    'openai': {
+        'intent': 'gpt-4o',
+        'extraction': 'gpt-4o',
+        'sales_reply': 'gpt-4o',
+        'sales_turn': 'gpt-4o',
+        'verification': 'gpt-4o',
+        'campaign': 'gpt-4o-mini'
+    }
+}
+
+# Models used for calls that name no task, by response format
+FORMAT_DEFAULTS = {
+    'gemini': {'json': 'gemini-2.5-pro', 'text': 'gemini-2.5-flash'},
+    'openai': {'json': 'gpt-4o', 'text': 'gpt-4o'}
+}
+
+# Candidates the benchmark compares for each provider
+CANDIDATE_MODELS = {
+    'gemini': ['gemini-2.5-pro', 'gemini-2.5-flash', 'gemini-2.5-flash-lite'],
+    'openai': ['gpt-4o', 'gpt-4o-mini']
+}
+
+# USD per million (input, output) tokens, list prices
+MODEL_PRICING = {
+    'gemini-2.5-pro': (1.25, 10.00),
+    'gemini-2.5-flash': (0.30, 2.50),
+    'gemini-2.5-flash-lite': (0.10, 0.40),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60)
+}
+
+
+def model_for(provider, task=None, response_format='text'):
+    """Model for a task: environment override, then the policy default, then the format default"""
+    if task:
+        override = os.environ.get(f"{provider.upper()}_MODEL_{task.upper()}")
+        if override:
+            return override
+        if task in DEFAULT_MODELS[provider]:
+            return DEFAULT_MODELS[provider][task]
+    return FORMAT_DEFAULTS[provider]['json' if response_format == 'json' else 'text']
+
+
+def call_cost(model, prompt_tokens, output_tokens):
+    """Cost of one call in USD, or None for a model without a price"""
+    if model not in MODEL_PRICING:
+        return None
+    input_price, output_price = MODEL_PRICING[model]
+    return (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def policy():
+    """The effective model for every task and provider, for /metrics and the benchmark"""
+    return {provider: {task: model_for(provider, task) for task in TASKS} for provider in DEFAULT_MODELS}
@@ -0,0 +1,180 @@
+import re
+from functools import lru_cache
+
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+CANONICAL_CITIES = [
+    'Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Ahmedabad', 'Chennai', 'Kolkata', 'Pune', 'Jaipur',
+    'Surat', 'Lucknow', 'Kanpur', 'Nagpur', 'Indore', 'Thane', 'Bhopal', 'Visakhapatnam', 'Patna',
+    'Vadodara', 'Ghaziabad', 'Ludhiana', 'Agra', 'Nashik', 'Faridabad', 'Meerut', 'Rajkot', 'Varanasi',
+    'Srinagar', 'Aurangabad', 'Dhanbad', 'Amritsar', 'Navi Mumbai', 'Prayagraj', 'Ranchi', 'Howrah',
+    'Coimbatore', 'Jabalpur', 'Gwalior', 'Vijayawada', 'Jodhpur', 'Madurai', 'Raipur', 'Kota',
+    'Guwahati', 'Chandigarh', 'Solapur', 'Hubli', 'Mysore', 'Tiruchirappalli', 'Bareilly', 'Aligarh',
+    'Tiruppur', 'Gurugram', 'Moradabad', 'Jalandhar', 'Bhubaneswar', 'Salem', 'Warangal', 'Noida',
+    'Thiruvananthapuram', 'Bhiwandi', 'Saharanpur', 'Gorakhpur', 'Guntur', 'Bikaner', 'Amravati',
+    'Jamshedpur', 'Bhilai', 'Cuttack', 'Firozabad', 'Kochi', 'Nellore', 'Bhavnagar', 'Dehradun',
+    'Durgapur', 'Asansol', 'Nanded', 'Kolhapur', 'Ajmer', 'Gulbarga', 'Jamnagar', 'Ujjain', 'Siliguri',
+    'Jhansi', 'Jammu', 'Mangalore', 'Erode', 'Belgaum', 'Tirunelveli', 'Gaya', 'Udaipur', 'Kozhikode',
+    'Akola', 'Kurnool', 'Bokaro', 'Bellary', 'Patiala', 'Agartala', 'Bhagalpur', 'Latur', 'Dhule',
+    'Korba', 'Bhilwara', 'Brahmapur', 'Muzaffarpur', 'Ahmednagar', 'Mathura', 'Kollam', 'Bilaspur',
+    'Shimla', 'Thrissur', 'Gandhinagar', 'Anand', 'Panaji', 'Puducherry', 'Shillong', 'Imphal',
+    'Aizawl', 'Gangtok', 'Itanagar', 'Kohima', 'Port Blair', 'Haridwar', 'Rishikesh', 'Vellore'
+]
+
+CITY_ALIASES = {
+    'bengaluru': 'Bangalore',
+    'bombay': 'Mumbai',
+    'calcutta': 'Kolkata',
+    'madras': 'Chennai',
+    'new delhi': 'Delhi',
+    'ncr': 'Delhi',
+    'gurgaon': 'Gurugram',
+    'cochin': 'Kochi',
+    'ernakulam': 'Kochi',
+    'poona': 'Pune',
+    'trivandrum': 'Thiruvananthapuram',
+    'baroda': 'Vadodara',
+    'vizag': 'Visakhapatnam',
+    'allahabad': 'Prayagraj',
+    'mysuru': 'Mysore',
+    'mangaluru': 'Mangalore',
+    'belagavi': 'Belgaum',
+    'kalaburagi': 'Gulbarga',
+    'trichy': 'Tiruchirappalli',
+    'calicut': 'Kozhikode',
+    'pondicherry': 'Puducherry',
+    'goa': 'Panaji',
+    'banaras': 'Varanasi',
+    'benares': 'Varanasi',
+    'hubballi': 'Hubli'
+}
+
+# Same categories the extraction prompt asks the LLM for
+LOAN_PURPOSES = ['home_improvement', 'debt_consolidation', 'medical', 'education', 'business',
+                 'personal', 'wedding', 'travel']
+
+LOAN_PURPOSE_ALIASES = {
+    'home improvement': 'home_improvement',
+    'home renovation': 'home_improvement',
+    'house renovation': 'home_improvement',
+    'renovation': 'home_improvement',
+    'home repair': 'home_improvement',
+    'home repairs': 'home_improvement',
+    'interior': 'home_improvement',
+    'debt consolidation': 'debt_consolidation',
+    'credit card debt': 'debt_consolidation',
+    'credit card bill': 'debt_consolidation',
+    'pay off debt': 'debt_consolidation',
+    'loan repayment': 'debt_consolidation',
+    'hospital': 'medical',
+    'surgery': 'medical',
+    'treatment': 'medical',
+    'medical emergency': 'medical',
+    'healthcare': 'medical',
+    'college': 'education',
+    'tuition': 'education',
+    'higher studies': 'education',
+    'study abroad': 'education',
+    'course fees': 'education',
+    'startup': 'business',
+    'shop': 'business',
+    'business expansion': 'business',
+    'working capital': 'business',
+    'marriage': 'wedding',
+    'shaadi': 'wedding',
+    'vacation': 'travel',
+    'holiday': 'travel',
+    'trip': 'travel',
+    'tour': 'travel',
+    'car': 'personal',
+    'bike': 'personal',
+    'vehicle': 'personal',
+    'gadget': 'personal',
+    'personal use': 'personal',
+    'personal expenses': 'personal',
+    'other': 'personal'
+}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def _process(value):
+    """Lowercase and collapse punctuation and underscores to single spaces"""
+    return _NON_ALNUM.sub(' ', str(value).lower()).strip()
+
+
+class FuzzyNormalizer:
+    """
+    Map free-text values onto a canonical list with a prebuilt RapidFuzz index.
+
+    Exact and alias matches are a dict lookup; everything else is fuzzy
+    matched against the preprocessed choices. Results are memoized.
+
+    scorer is a rapidfuzz.fuzz scorer name. The default WRatio also scores
+    substrings, which suits phrases such as loan purposes. Whole-value
+    lists like cities use token_sort_ratio with min_length_ratio, so a
+    longer name ("Greater Noida") is never snapped onto a shorter one inside it.
+    """
+
+    def __init__(self, canonical_values, aliases=None, score_cutoff=85, cache_size=4096, scorer='WRatio',
+                 min_length_ratio=0.0):
+        self.score_cutoff = score_cutoff
+        self.scorer = getattr(fuzz, scorer) if RAPIDFUZZ_AVAILABLE else None
+        self.min_length_ratio = min_length_ratio
+
+        # Index: preprocessed spelling -> canonical value
+        self.index = {}
+        for value in canonical_values:
+            self.index[_process(value)] = value
+        for alias, value in (aliases or {}).items():
+            self.index[_process(alias)] = value
+        self.choices = list(self.index)
+
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def normalize_many(self, values):
+        """Normalize a batch of values, matching each distinct value once"""
+        matches = {value: self.normalize(value) for value in set(values)}
+        return [matches[value] for value in values]
+
+    def _normalize(self, value):
+        """Canonical value for a single input, or None when nothing is close enough"""
+        if value is None:
+            return None
+        query = _process(value)
+        if not query:
+            return None
+
+        if query in self.index:
+            return self.index[query]
+
+        # Very short strings fuzzy match almost anything
+        if not RAPIDFUZZ_AVAILABLE or len(query) < 4:
+            return None
+
+        matches = process.extract(query, self.choices, scorer=self.scorer, processor=None,
+                                  score_cutoff=self.score_cutoff, limit=3)
+        for choice, _, _ in matches:
+            if min(len(query), len(choice)) / max(len(query), len(choice)) >= self.min_length_ratio:
+                return self.index[choice]
+        return None
+
+
+# Whole-name similarity: "Mumbay" -> Mumbai, but "South Delhi" and "Anandpur" stay unmatched
+city_normalizer = FuzzyNormalizer(CANONICAL_CITIES, CITY_ALIASES, score_cutoff=80, scorer='token_sort_ratio',
+                                  min_length_ratio=0.75)
+loan_purpose_normalizer = FuzzyNormalizer(LOAN_PURPOSES, LOAN_PURPOSE_ALIASES)
+
+
+def normalize_city(value):
+    """Canonical city name, or None if the value is not a known Indian city"""
+    return city_normalizer.normalize(value)
+
+
+def normalize_loan_purpose(value):
+    """Canonical loan purpose category, or None if nothing matches"""
+    return loan_purpose_normalizer.normalize(value)
@@ -0,0 +1,218 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.api_client import call_many
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# How often a worker that is not running the refresh checks whether the one that was has gone
+LEADER_RETRY_SECONDS = 60
+
+
+class PreUnderwritingTable:
+    """
+    Materialized pre-underwriting results for known CRM customers.
+
+    A batch job precomputes the bureau score, offer and approval limits for
+    every CRM customer so the live path needs a single keyed read.
+    """
+
+    def __init__(self, crm_api, credit_bureau_api, offer_mart_api, db_path=None, max_age_seconds=86400):
+        self.crm_api = crm_api
+        self.credit_bureau_api = credit_bureau_api
+        self.offer_mart_api = offer_mart_api
+        # A CRM served over HTTP has no local database; the table then lives in the default file
+        self.db_path = db_path or getattr(crm_api, 'db_path', 'customer_data.db')
+        self.max_age_seconds = max_age_seconds
+        self._stop_event = threading.Event()
+        self._scheduler_thread = None
+        self._lock_file = None
+
+    def initialize_table(self):
+        """Create the pre-underwriting table if it does not exist"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        # phone is the primary key, so lookups are a single index probe
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pre_underwriting (
+                phone TEXT PRIMARY KEY,
+                customer_details TEXT NOT NULL,
+                credit_score INTEGER NOT NULL,
+                offer TEXT NOT NULL,
+                max_instant_amount INTEGER NOT NULL,
+                max_document_amount INTEGER NOT NULL,
+                computed_at REAL NOT NULL
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def refresh(self):
+        """
+        Recompute the table for every customer in the CRM.
+        Returns the number of customers materialized.
+        """
+        self.initialize_table()
+        run_started = time.time()
+        rows = []
+
+        customers = list(self.crm_api.iter_customers())
+        # One bureau round trip per batch; customers whose pull failed are left
+        # out and go through the live underwriting path instead
+        scores = self.credit_bureau_api.get_credit_scores([customer['phone'] for customer in customers])
+        for phone, reason in scores['errors'].items():
+            print(f"Pre-underwriting skipped {phone}: {reason}")
+
+        scored = [customer for customer in customers if scores['results'].get(customer['phone']) is not None]
+        # Concurrent when the Offer Mart is a remote service
+        offers = call_many(self.offer_mart_api, 'get_offer', [(customer,) for customer in scored])
+        for customer, offer in zip(scored, offers):
+            if isinstance(offer, Exception):
+                print(f"Pre-underwriting skipped {customer['phone']}: {offer}")
+                continue
+            rows.append(self._build_row(customer, scores['results'][customer['phone']], offer, run_started))
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO pre_underwriting
+            (phone, customer_details, credit_score, offer, max_instant_amount,
+             max_document_amount, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        # Drop customers that are no longer in the CRM
+        cursor.execute('DELETE FROM pre_underwriting WHERE computed_at < ?', (run_started,))
+        conn.commit()
+        conn.close()
+
+        return len(rows)
+
+    def lookup(self, phone):
+        """
+        Get the materialized row for a phone number.
+        Returns None when the customer is unknown or the row is stale.
+        """
+        if not phone:
+            return None
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT phone, customer_details, credit_score, offer, max_instant_amount,
+                       max_document_amount, computed_at
+                FROM pre_underwriting WHERE phone = ?
+            ''', (phone,))
+            result = cursor.fetchone()
+        except sqlite3.OperationalError:
+            # Table has not been built yet
+            result = None
+        conn.close()
+
+        if not result:
+            return None
+
+        if time.time() - result[6] > self.max_age_seconds:
+            return None
+
+        return {
+            'phone': result[0],
+            'customer_details': json.loads(result[1]),
+            'credit_score': result[2],
+            'offer': json.loads(result[3]),
+            'max_instant_amount': result[4],
+            'max_document_amount': result[5],
+            'computed_at': result[6]
+        }
+
+    def start_scheduler(self, interval_seconds=3600, lock_path=None):
+        """
+        Refresh the table now and then every interval_seconds in a background thread.
+        Every worker may call this: only the one holding an exclusive lock on
+        lock_path (default <db_path>.refresh.lock) refreshes, and another takes
+        over if that worker exits.
+        """
+        if self._scheduler_thread and self._scheduler_thread.is_alive():
+            return self._scheduler_thread
+        lock_path = lock_path or self.db_path + '.refresh.lock'
+
+        def run():
+            while not self._stop_event.is_set():
+                if not self._acquire_refresh_lock(lock_path):
+                    self._stop_event.wait(min(interval_seconds, LEADER_RETRY_SECONDS))
+                    continue
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Pre-underwriting refresh failed: {e}")
+                self._stop_event.wait(interval_seconds)
+
+        self._stop_event.clear()
+        self._scheduler_thread = threading.Thread(target=run, name='pre-underwriting-refresh', daemon=True)
+        self._scheduler_thread.start()
+        return self._scheduler_thread
+
+    def stop_scheduler(self):
+        """Stop the background refresh thread"""
+        self._stop_event.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _acquire_refresh_lock(self, lock_path):
+        """True if this process runs the refresh; the lock is held until the process exits"""
+        if self._lock_file is not None or not FCNTL_AVAILABLE:
+            return True
+        lock_file = open(lock_path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        print(f"Worker {os.getpid()} runs the pre-underwriting refresh")
+        return True
+
+    def _build_row(self, customer, credit_score, offer, computed_at):
+        """Apply the underwriting limits to a customer's score and offer"""
+        pre_approved_limit = offer.get('pre_approved_limit', 0)
+
+        # Mirrors UnderwritingAgent.process_application
+        if credit_score < 700:
+            max_instant_amount = 0
+            max_document_amount = 0
+        else:
+            max_instant_amount = pre_approved_limit
+            max_document_amount = 2 * pre_approved_limit
+
+        return (
+            customer['phone'],
+            json.dumps(customer),
+            credit_score,
+            json.dumps(offer),
+            max_instant_amount,
+            max_document_amount,
+            computed_at
+        )
+
+
+if __name__ == '__main__':
+    # Run one batch refresh, e.g. from cron
+    from mock_apis.crm_api import CRMApi
+    from mock_apis.credit_bureau_api import CreditBureauApi
+    from mock_apis.offer_mart_api import OfferMartApi
+
+    crm_api = CRMApi()
+    crm_api.initialize_database()
+    table = PreUnderwritingTable(crm_api, CreditBureauApi(), OfferMartApi())
+    count = table.refresh()
+    print(f"Materialized pre-underwriting rows for {count} customers")
@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from services.api_client import submit_call
+
+
+class BackendPrefetcher:
+    """
+    Speculatively fetch CRM, bureau and offer data as soon as a phone number is known.
+
+    Futures are stored on the session under 'prefetch' and consumed by the
+    verification and underwriting agents through take_prefetched().
+    """
+
+    def __init__(self, crm_api, credit_bureau_api, offer_mart_api, pre_underwriting=None, max_workers=8):
+        self.crm_api = crm_api
+        self.credit_bureau_api = credit_bureau_api
+        self.offer_mart_api = offer_mart_api
+        self.pre_underwriting = pre_underwriting
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+
+    def maybe_prefetch(self, session_data):
+        """Start background lookups when the session has a new phone number"""
+        customer_data = session_data.get('customer_data', {})
+        phone = customer_data.get('phone')
+        if not phone:
+            return
+
+        prefetch = session_data.get('prefetch')
+        if prefetch and prefetch.get('phone') == phone:
+            return
+
+        # Phone changed, results for the old number are useless
+        self.cancel(session_data)
+
+        # Known customers are already served by the materialized table
+        if self.pre_underwriting and self.pre_underwriting.lookup(phone):
+            session_data['prefetch'] = {'phone': phone}
+            return
+
+        offer_input = dict(customer_data)
+        session_data['prefetch'] = {
+            'phone': phone,
+            'monthly_income': customer_data.get('monthly_income'),
+            'crm': submit_call(self.crm_api, self.executor, 'verify_customer', {'phone': phone}),
+            'credit_score': submit_call(self.credit_bureau_api, self.executor, 'get_credit_score', phone),
+            'offer': submit_call(self.offer_mart_api, self.executor, 'get_offer', offer_input)
+        }
+
+    def cancel(self, session_data):
+        """Cancel outstanding lookups and drop them from the session"""
+        prefetch = session_data.pop('prefetch', None)
+        if not prefetch:
+            return
+
+        for key in ('crm', 'credit_score', 'offer'):
+            future = prefetch.get(key)
+            if future is not None:
+                future.cancel()
+
+
+def take_prefetched(session_data, key, timeout=None):
+    """
+    Get a prefetched result for the session's current phone number.
+    Returns None when nothing usable was prefetched.
+    """
+    prefetch = session_data.get('prefetch')
+    if not prefetch:
+        return None
+
+    customer_data = session_data.get('customer_data', {})
+    if prefetch.get('phone') != customer_data.get('phone'):
+        return None
+
+    # Offers for new customers depend on the income they declared
+    if key == 'offer' and prefetch.get('monthly_income') != customer_data.get('monthly_income'):
+        return None
+
+    future = prefetch.get(key)
+    if future is None or future.cancelled():
+        return None
+
+    try:
+        return future.result(timeout=timeout)
+    except Exception:
+        return None
@@ -0,0 +1,101 @@
+"""
+Opt-in cProfile sampling for Socket.IO handlers.
+
+Set PROFILING_ENABLED=1 to install the hooks. PROFILE_EVERY_N (default 100)
+profiles every Nth call of each hooked handler, and can be changed at
+runtime through the admin endpoint (0 pauses sampling). Each sample is
+written as <time>_<handler>_<stage>.pstats to PROFILE_DIR (default
+'profiles'), keeping the newest PROFILE_MAX_FILES.
+
+Without PROFILING_ENABLED the decorator returns the handler itself, so the
+hooks cost nothing when off.
+"""
+import cProfile
+import functools
+import itertools
+import os
+import re
+import threading
+import time
+
+
+class HandlerProfiler:
+    """Profiles every Nth call of decorated handlers into a rotating pstats directory"""
+
+    def __init__(self, enabled=None, every_n=None, directory=None, max_files=None):
+        if enabled is None:
+            enabled = os.environ.get('PROFILING_ENABLED', '0') == '1'
+        self.enabled = enabled
+        self.every_n = every_n if every_n is not None else int(os.environ.get('PROFILE_EVERY_N', 100))
+        self.directory = directory or os.environ.get('PROFILE_DIR', 'profiles')
+        self.max_files = max_files or int(os.environ.get('PROFILE_MAX_FILES', 200))
+        self._counters = {}
+        # cProfile allows one active profiler per thread; concurrent samples are skipped
+        self._profile_lock = threading.Lock()
+
+    def profiled(self, handler_name, stage_getter=None):
+        """Decorator for a handler; stage_getter(*args, **kwargs) names the conversation stage for the file name"""
+        def decorate(func):
+            if not self.enabled:
+                return func
+            counter = self._counters.setdefault(handler_name, itertools.count(1))
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.every_n or next(counter) % self.every_n:
+                    return func(*args, **kwargs)
+                if not self._profile_lock.acquire(blocking=False):
+                    return func(*args, **kwargs)
+                try:
+                    stage = stage_getter(*args, **kwargs) if stage_getter else None
+                    profile = cProfile.Profile()
+                    profile.enable()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        profile.disable()
+                        self._save(profile, handler_name, stage)
+                finally:
+                    self._profile_lock.release()
+
+            return wrapper
+        return decorate
+
+    def list_profiles(self):
+        """Saved profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pstats'):
+                stat = entry.stat()
+                profiles.append({'name': entry.name, 'size': stat.st_size, 'created': stat.st_mtime})
+        return sorted(profiles, key=lambda profile: profile['created'], reverse=True)
+
+    def profile_path(self, name):
+        """Absolute path of a saved profile, or None for unknown or unsafe names"""
+        if not re.fullmatch(r'[\w.-]+\.pstats', name):
+            return None
+        path = os.path.abspath(os.path.join(self.directory, name))
+        return path if os.path.isfile(path) else None
+
+    def config(self):
+        return {'enabled': self.enabled, 'every_n': self.every_n, 'directory': self.directory,
+                'max_files': self.max_files}
+
+    def _save(self, profile, handler_name, stage):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stage_part = re.sub(r'\W', '_', stage or 'none')
+            filename = f"{time.strftime('%Y%m%dT%H%M%S')}_{int(time.time() * 1000) % 1000:03d}_{handler_name}_{stage_part}.pstats"
+            profile.dump_stats(os.path.join(self.directory, filename))
+            self._rotate()
+        except OSError as e:
+            print(f"Could not save profile: {e}")
+
+    def _rotate(self):
+        for profile in self.list_profiles()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, profile['name']))
+            except OSError:
+                pass
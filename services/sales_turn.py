@@ -0,0 +1,74 @@
+import json
+
+from services.intent_classifier import INTENT_NEXT_ACTIONS
+
+# Customer fields the sales stage collects
+SALES_FIELDS = ['name', 'phone', 'email', 'city', 'monthly_income', 'loan_amount', 'loan_purpose']
+
+# Shape of the combined sales turn the model must return
+SALES_TURN_SCHEMA = {
+    'type': 'object',
+    'required': ['intent', 'extracted_info', 'reply'],
+    'properties': {
+        'intent': {'type': 'string', 'enum': list(INTENT_NEXT_ACTIONS)},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'extracted_info': {
+            'type': 'object',
+            'properties': {field: {'type': ['string', 'number']} for field in SALES_FIELDS}
+        },
+        'reply': {'type': 'string', 'minLength': 1}
+    }
+}
+
+
+class SalesTurnValidationError(ValueError):
+    """The model's combined turn did not match SALES_TURN_SCHEMA"""
+
+
+def parse_sales_turn(raw):
+    """
+    Parse and validate a combined turn response.
+    Returns {'intent', 'confidence', 'next_action', 'extracted_info', 'reply'} or raises SalesTurnValidationError.
+    """
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError as e:
+        raise SalesTurnValidationError(f"not JSON: {e}")
+    if not isinstance(data, dict):
+        raise SalesTurnValidationError("turn must be a JSON object")
+
+    missing = [field for field in SALES_TURN_SCHEMA['required'] if field not in data]
+    if missing:
+        raise SalesTurnValidationError(f"missing fields: {', '.join(missing)}")
+
+    intent = data['intent']
+    if intent not in INTENT_NEXT_ACTIONS:
+        raise SalesTurnValidationError(f"unknown intent: {intent!r}")
+
+    confidence = data.get('confidence', 1.0)
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+        raise SalesTurnValidationError(f"confidence out of range: {confidence!r}")
+
+    reply = data['reply']
+    if not isinstance(reply, str) or not reply.strip():
+        raise SalesTurnValidationError("reply must be a non-empty string")
+
+    extracted_info = data['extracted_info']
+    if not isinstance(extracted_info, dict):
+        raise SalesTurnValidationError("extracted_info must be an object")
+    cleaned_info = {}
+    for field, value in extracted_info.items():
+        # Unknown fields and explicit nulls are ignored rather than failing the turn
+        if field not in SALES_FIELDS or value is None or value == '':
+            continue
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise SalesTurnValidationError(f"extracted_info.{field} must be a string or number")
+        cleaned_info[field] = value
+
+    return {
+        'intent': intent,
+        'confidence': float(confidence),
+        'next_action': INTENT_NEXT_ACTIONS[intent],
+        'extracted_info': cleaned_info,
+        'reply': reply.strip()
+    }
@@ -0,0 +1,251 @@
+"""
+Compact per-connection session state.
+
+Session is a slotted dataclass that still behaves like the dict the agents
+were written against (get, [], update, pop, in, items), so agent code is
+unchanged. Conversation history is stored column-wise: message type and
+agent as one byte each, timestamps as floats, text as a list of str. Wire
+and JSON dicts are built only when something asks for them.
+"""
+import sys
+from array import array
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from enum import IntEnum
+
+
+class MessageType(IntEnum):
+    USER = 0
+    BOT = 1
+
+
+class AgentCode(IntEnum):
+    NONE = 0
+    MASTER = 1
+    SALES = 2
+    VERIFICATION = 3
+    UNDERWRITING = 4
+    SANCTION_LETTER = 5
+    OTHER = 255
+
+
+AGENT_NAMES = {
+    AgentCode.MASTER: 'Master Agent',
+    AgentCode.SALES: 'Sales Agent',
+    AgentCode.VERIFICATION: 'Verification Agent',
+    AgentCode.UNDERWRITING: 'Underwriting Agent',
+    AgentCode.SANCTION_LETTER: 'Sanction Letter Agent'
+}
+AGENT_CODES = {name: code for code, name in AGENT_NAMES.items()}
+MESSAGE_TYPE_NAMES = {MessageType.USER: 'user', MessageType.BOT: 'bot'}
+MESSAGE_TYPE_CODES = {name: code for code, name in MESSAGE_TYPE_NAMES.items()}
+
+# Session keys that hold live objects and never go over the wire
+TRANSIENT_FIELDS = frozenset({'prefetch'})
+
+_UNSET = object()
+
+
+def intern_keys(data):
+    """Share one copy of each field name across sessions (JSON parsing allocates fresh key strings)"""
+    return {sys.intern(key) if isinstance(key, str) else key: value for key, value in data.items()}
+
+
+def _parse_timestamp(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return datetime.now().timestamp()
+
+
+class ConversationHistory:
+    """
+    Append-only message history stored as parallel columns.
+    Indexing and slicing return wire-format dicts, so code that did
+    history[-5:] or json.dumps(history[-5:]) keeps working.
+    """
+
+    __slots__ = ('_types', '_agents', '_timestamps', '_messages', '_other_agents')
+
+    def __init__(self, entries=None):
+        self._types = array('B')
+        self._agents = array('B')
+        self._timestamps = array('d')
+        self._messages = []
+        # index -> agent name, only for agents without an AgentCode
+        self._other_agents = None
+        for entry in entries or ():
+            self.append(entry)
+
+    def add(self, message_type, message, agent=None, timestamp=None):
+        """Append without building a dict"""
+        code = AgentCode.NONE
+        if agent:
+            code = AGENT_CODES.get(agent, AgentCode.OTHER)
+            if code is AgentCode.OTHER:
+                if self._other_agents is None:
+                    self._other_agents = {}
+                self._other_agents[len(self._messages)] = agent
+        self._types.append(message_type)
+        self._agents.append(code)
+        self._timestamps.append(timestamp if timestamp is not None else datetime.now().timestamp())
+        self._messages.append(message)
+
+    def append(self, entry):
+        """Append a wire-format dict: {'type', 'message', 'agent'?, 'timestamp'?}"""
+        self.add(MESSAGE_TYPE_CODES.get(entry.get('type'), MessageType.BOT), entry.get('message', ''),
+                 entry.get('agent'), _parse_timestamp(entry.get('timestamp')))
+
+    def entry(self, index):
+        """One message as a wire-format dict"""
+        entry = {
+            'type': MESSAGE_TYPE_NAMES[MessageType(self._types[index])],
+            'message': self._messages[index],
+            'timestamp': datetime.fromtimestamp(self._timestamps[index]).isoformat()
+        }
+        code = self._agents[index]
+        if code == AgentCode.OTHER:
+            entry['agent'] = self._other_agents[index]
+        elif code != AgentCode.NONE:
+            entry['agent'] = AGENT_NAMES[AgentCode(code)]
+        return entry
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('history index out of range')
+        return self.entry(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.entry(index)
+
+    def to_wire(self):
+        return self[:]
+
+    @classmethod
+    def from_wire(cls, entries):
+        return cls(entries)
+
+
+@dataclass(slots=True, eq=False)
+class Session:
+    """
+    State for one chat connection. Optional fields stay unset (absent from
+    'in', get() and the wire format) until an agent writes them; keys with
+    no field of their own go to extra.
+    """
+    session_id: str
+    current_stage: str = 'initial'
+    customer_data: dict = field(default_factory=dict)
+    loan_application: dict = field(default_factory=dict)
+    conversation_history: ConversationHistory = field(default_factory=ConversationHistory)
+    verification_status: object = _UNSET
+    pre_underwriting: object = _UNSET
+    credit_score: object = _UNSET
+    offer_details: object = _UNSET
+    approval_status: object = _UNSET
+    approval_type: object = _UNSET
+    rejection_reason: object = _UNSET
+    counter_offer: object = _UNSET
+    emi_details: object = _UNSET
+    sanction_letter_generated: object = _UNSET
+    prefetch: object = _UNSET
+    extra: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.current_stage = sys.intern(self.current_stage)
+        self.customer_data = intern_keys(self.customer_data)
+        if not isinstance(self.conversation_history, ConversationHistory):
+            self.conversation_history = ConversationHistory(self.conversation_history)
+
+    # ---- mapping interface used by the agents ----
+
+    def __getitem__(self, key):
+        value = self.get(key, _UNSET)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_NAMES:
+            if key == 'current_stage':
+                value = sys.intern(value)
+            elif key == 'customer_data' and isinstance(value, dict):
+                value = intern_keys(value)
+            elif key == 'conversation_history' and not isinstance(value, ConversationHistory):
+                value = ConversationHistory(value)
+            object.__setattr__(self, key, value)
+        else:
+            self.extra[sys.intern(key)] = value
+
+    def __contains__(self, key):
+        return self.get(key, _UNSET) is not _UNSET
+
+    def get(self, key, default=None):
+        if key in _FIELD_NAMES:
+            value = getattr(self, key)
+            return default if value is _UNSET else value
+        return self.extra.get(key, default)
+
+    def update(self, updates=(), **kwargs):
+        for key, value in dict(updates, **kwargs).items():
+            self[key] = value
+
+    def pop(self, key, *default):
+        value = self.get(key, _UNSET)
+        if value is _UNSET:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        if key in _FIELD_NAMES:
+            object.__setattr__(self, key, _UNSET)
+        else:
+            del self.extra[key]
+        return value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def items(self):
+        pairs = [(name, getattr(self, name)) for name in _FIELD_ORDER]
+        return [(key, value) for key, value in pairs if value is not _UNSET] + list(self.extra.items())
+
+    # ---- wire format ----
+
+    def to_wire(self):
+        """JSON-serializable dict; live objects such as prefetch futures are left out"""
+        wire = {}
+        for key, value in self.items():
+            if key in TRANSIENT_FIELDS:
+                continue
+            wire[key] = value.to_wire() if isinstance(value, ConversationHistory) else value
+        return wire
+
+    @classmethod
+    def from_wire(cls, data):
+        data = dict(data)
+        session = cls(session_id=data.pop('session_id'))
+        for key, value in data.items():
+            if key not in TRANSIENT_FIELDS:
+                session[key] = value
+        return session
+
+
+_FIELD_ORDER = tuple(f.name for f in fields(Session) if f.name != 'extra')
+_FIELD_NAMES = frozenset(_FIELD_ORDER)
@@ -0,0 +1,274 @@
+"""
+Chat sessions keyed by a resumable client token, with idle expiry.
+
+The browser keeps the token from 'session_token' and sends it in the
+Socket.IO auth payload, so a reload or dropped connection resumes the same
+session instead of starting over. Sessions with no activity for
+SESSION_TTL_SECONDS (default 1800) are evicted; the sweeper runs every
+SESSION_SWEEP_SECONDS (default 5).
+
+With more than one worker process, set SESSION_DB_PATH (gunicorn.conf.py
+defaults it to sessions.db when WEB_CONCURRENCY > 1). Every session is then
+also saved to that SQLite file after each turn, and a reconnect that lands on
+another worker loads it from there. Workers must share the file, so they must
+run on one host.
+"""
+import json
+import math
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from services.session_model import Session
+
+
+class SessionStore:
+    """
+    Token -> Session map with socket attachment and a timing-wheel sweeper.
+
+    Marking a session active only records the time. Each sweep tick visits
+    one wheel slot; a session that was active since it was scheduled moves
+    to the slot of its new deadline instead of expiring. Every operation is
+    amortized O(1) regardless of how many sessions are open.
+    """
+
+    def __init__(self, ttl_seconds=None, tick_seconds=None, db_path=None):
+        self.ttl_seconds = ttl_seconds or float(os.environ.get('SESSION_TTL_SECONDS', 1800))
+        self.tick_seconds = tick_seconds or float(os.environ.get('SESSION_SWEEP_SECONDS', 5))
+        # Shared copy for other workers; None keeps sessions in this process only
+        self.db_path = db_path or os.environ.get('SESSION_DB_PATH') or None
+        self._slots = [set() for _ in range(int(math.ceil(self.ttl_seconds / self.tick_seconds)) + 1)]
+        self._sessions = {}
+        # Version of each session last saved or loaded by this process
+        self._versions = {}
+        self._last_seen = {}
+        self._token_by_sid = {}
+        self._sid_by_token = {}
+        self._cursor = int(time.monotonic() // self.tick_seconds)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sweeper_thread = None
+        # Callbacks run as listener(token, session, sid) when a session expires
+        self.expire_listeners = []
+        self.expired = 0
+
+    def create(self, sid, session):
+        """Store a new session attached to sid; returns its token"""
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._sessions[token] = session
+            self._attach(sid, token)
+            self._schedule(token, time.monotonic())
+        self.save(token)
+        return token
+
+    def resume(self, sid, token):
+        """Attach sid to the session for token; returns the session, or None if unknown or expired"""
+        # Another worker may have a newer copy, or the only one
+        stored = self._load(token) if self.db_path else None
+        expired = None
+        with self._lock:
+            if stored and stored[0] > self._versions.get(token, 0):
+                self._versions[token] = stored[0]
+                self._sessions[token] = stored[1]
+                if token not in self._last_seen:
+                    self._schedule(token, time.monotonic())
+            elif self.db_path and stored is None and token in self._sessions:
+                # Expired, or swept by another worker: ends here like a swept session
+                expired = self._evict(token)
+                self._versions.pop(token, None)
+            session = self._sessions.get(token)
+            if session is not None:
+                # A second tab or a reconnect takes the session over from the old socket
+                old_sid = self._sid_by_token.get(token)
+                if old_sid is not None:
+                    self._token_by_sid.pop(old_sid, None)
+                self._attach(sid, token)
+                self._last_seen[token] = time.monotonic()
+        if expired:
+            self._notify_expired([expired])
+        return session
+
+    def get(self, sid):
+        """Session attached to sid, marking it active"""
+        token = self._token_by_sid.get(sid)
+        if token is None:
+            return None
+        self._last_seen[token] = time.monotonic()
+        return self._sessions.get(token)
+
+    def peek(self, sid):
+        """Session attached to sid without marking it active"""
+        token = self._token_by_sid.get(sid)
+        return self._sessions.get(token) if token else None
+
+    def find(self, token):
+        """Session for a resume token without marking it active, or None"""
+        if self.db_path:
+            stored = self._load(token)
+            return stored[1] if stored else None
+        return self._sessions.get(token)
+
+    def save(self, token):
+        """Write the session to the shared database after a turn; no-op without SESSION_DB_PATH"""
+        session = self._sessions.get(token)
+        if not self.db_path or session is None:
+            return
+        data = json.dumps(session.to_wire(), default=str)
+        with self._lock:
+            version = self._versions.get(token, 0) + 1
+            self._versions[token] = version
+        conn = self._connect()
+        try:
+            conn.execute('INSERT OR REPLACE INTO sessions (token, version, last_seen, data) VALUES (?, ?, ?, ?)',
+                         (token, version, time.time(), data))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def token_for(self, sid):
+        return self._token_by_sid.get(sid)
+
+    def sid_for(self, token):
+        """Socket currently attached to the session, or None while it is disconnected"""
+        return self._sid_by_token.get(token)
+
+    def detach(self, sid):
+        """Disconnect: the session stays resumable until it expires"""
+        with self._lock:
+            token = self._token_by_sid.pop(sid, None)
+            if token and self._sid_by_token.get(token) == sid:
+                del self._sid_by_token[token]
+
+    def sweep(self, now=None):
+        """Expire every session whose deadline has passed; returns how many expired"""
+        now = time.monotonic() if now is None else now
+        target = int(now // self.tick_seconds)
+        expired = []
+        with self._lock:
+            # After a stall longer than one revolution, each slot only needs one visit
+            self._cursor = max(self._cursor, target - len(self._slots) + 1)
+            while self._cursor <= target:
+                index = self._cursor % len(self._slots)
+                due, self._slots[index] = self._slots[index], set()
+                for token in due:
+                    last_seen = self._last_seen.get(token)
+                    if last_seen is None:
+                        continue
+                    if last_seen + self.ttl_seconds <= now:
+                        expired.append(self._evict(token))
+                    else:
+                        self._schedule(token, last_seen)
+                self._cursor += 1
+        expired = self._still_active_elsewhere(expired)
+        self._notify_expired(expired)
+        return len(expired)
+
+    def _notify_expired(self, expired):
+        """Count evicted (token, session, sid) entries and run the expire listeners, outside the lock"""
+        with self._lock:
+            self.expired += len(expired)
+        for token, session, sid in expired:
+            for listener in self.expire_listeners:
+                try:
+                    listener(token, session, sid)
+                except Exception as e:
+                    print(f"Session expiry listener failed: {e}")
+
+    def start_sweeper(self):
+        """Sweep once per tick in a background thread"""
+        if self._sweeper_thread and self._sweeper_thread.is_alive():
+            return self._sweeper_thread
+
+        def run():
+            while not self._stop_event.wait(self.tick_seconds):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Session sweep failed: {e}")
+
+        self._stop_event.clear()
+        self._sweeper_thread = threading.Thread(target=run, name='session-sweeper', daemon=True)
+        self._sweeper_thread.start()
+        return self._sweeper_thread
+
+    def stop_sweeper(self):
+        self._stop_event.set()
+
+    def metrics(self):
+        return {
+            'sessions': len(self._sessions),
+            'connected': len(self._token_by_sid),
+            'expired': self.expired,
+            'ttl_seconds': self.ttl_seconds,
+            'shared_db': self.db_path
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                token TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                last_seen REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+        ''')
+        return conn
+
+    def _load(self, token):
+        """(version, Session) from the shared database, or None if absent or idle past the TTL"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT version, data FROM sessions WHERE token = ? AND last_seen > ?',
+                               (token, time.time() - self.ttl_seconds)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return row[0], Session.from_wire(json.loads(row[1]))
+
+    def _still_active_elsewhere(self, expired):
+        """
+        Filters sessions just evicted from memory. Drops the ones another worker
+        saved within the TTL (the customer moved there) and returns the rest.
+        Rows idle past the TTL are deleted from the shared database, including
+        ones left behind by a restarted worker.
+        """
+        if not self.db_path or not expired:
+            return expired
+        with self._lock:
+            for token, _, _ in expired:
+                self._versions.pop(token, None)
+        cutoff = time.time() - self.ttl_seconds
+        conn = self._connect()
+        try:
+            tokens = [token for token, _, _ in expired]
+            placeholders = ','.join('?' * len(tokens))
+            active = {row[0] for row in conn.execute(
+                f'SELECT token FROM sessions WHERE token IN ({placeholders}) AND last_seen > ?', tokens + [cutoff])}
+            conn.execute('DELETE FROM sessions WHERE last_seen <= ?', (cutoff,))
+            conn.commit()
+        finally:
+            conn.close()
+        return [entry for entry in expired if entry[0] not in active]
+
+    def _attach(self, sid, token):
+        self._token_by_sid[sid] = token
+        self._sid_by_token[token] = sid
+
+    def _schedule(self, token, last_seen):
+        self._last_seen[token] = last_seen
+        deadline_tick = int(math.ceil((last_seen + self.ttl_seconds) / self.tick_seconds))
+        self._slots[deadline_tick % len(self._slots)].add(token)
+
+    def _evict(self, token):
+        session = self._sessions.pop(token)
+        del self._last_seen[token]
+        sid = self._sid_by_token.pop(token, None)
+        if sid is not None:
+            self._token_by_sid.pop(sid, None)
+        return token, session, sid
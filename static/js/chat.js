@@ -0,0 +1,277 @@
+// Enhanced theme toggle functionality
+const themeToggle = document.getElementById('theme-toggle');
+const themeText = document.getElementById('theme-text');
+const themeIcon = themeToggle.querySelector('i');
+const body = document.body;
+
+// Check for saved theme preference or respect OS setting
+const savedTheme = localStorage.getItem('theme');
+const prefersDarkScheme = window.matchMedia('(prefers-color-scheme: dark)');
+
+// Apply saved theme or default to light mode
+const applyTheme = (isDark) => {
+    if (isDark) {
+        body.classList.add('dark-mode');
+        themeIcon.classList.remove('fa-moon');
+        themeIcon.classList.add('fa-sun');
+        themeText.textContent = 'Light Mode';
+        localStorage.setItem('theme', 'dark');
+    } else {
+        body.classList.remove('dark-mode');
+        themeIcon.classList.remove('fa-sun');
+        themeIcon.classList.add('fa-moon');
+        themeText.textContent = 'Dark Mode';
+        localStorage.setItem('theme', 'light');
+    }
+};
+
+// Initialize theme based on saved preference or OS setting
+if (savedTheme === 'dark' || (!savedTheme && prefersDarkScheme.matches)) {
+    applyTheme(true);
+}
+
+// Toggle theme function
+themeToggle.addEventListener('click', function () {
+    const isCurrentlyDark = body.classList.contains('dark-mode');
+    applyTheme(!isCurrentlyDark);
+});
+
+// Initialize Socket.IO (websocket only, so any worker can own the connection).
+// The session token is sent on every (re)connect so the server can resume the session.
+const SESSION_TOKEN_KEY = 'sessionToken';
+const socket = io({
+    transports: ['websocket'],
+    auth: (cb) => cb({ token: localStorage.getItem(SESSION_TOKEN_KEY) })
+});
+
+const chatMessages = document.getElementById('chatMessages');
+const messageInput = document.getElementById('messageInput');
+const sendButton = document.getElementById('sendButton');
+const typingIndicator = document.getElementById('typingIndicator');
+const connectionStatus = document.getElementById('connectionStatus');
+const currentPhase = document.getElementById('currentPhase');
+const progressPercent = document.getElementById('progressPercent');
+const progressFill = document.querySelector('.progress-fill');
+
+let isConnected = false;
+let currentAgent = 'master';
+let progress = 17;
+
+// Agent workflow phases
+const agentWorkflow = {
+    master: { phase: 'Initial Greeting', progress: 17 },
+    sales: { phase: 'Loan Consultation', progress: 35 },
+    verification: { phase: 'Document Verification', progress: 55 },
+    underwriting: { phase: 'Credit Assessment', progress: 75 },
+    sanction: { phase: 'Sanction Generation', progress: 95 }
+};
+
+// Agent status management
+function updateAgentStatus(agentId, status) {
+    const agent = document.getElementById(agentId + 'Agent');
+    if (agent) {
+        const statusElement = agent.querySelector('.timeline-status');
+        const dotElement = agent.querySelector('.timeline-dot');
+        const progressFill = agent.querySelector('.timeline-progress-fill');
+
+        // Update status badge
+        statusElement.className = 'timeline-status ' + status;
+
+        // Update timeline dot
+        dotElement.className = 'timeline-dot ' + status;
+
+        switch (status) {
+            case 'active':
+                statusElement.textContent = 'Active';
+                progressFill.style.width = '100%';
+                break;
+            case 'processing':
+                statusElement.textContent = 'Processing';
+                progressFill.style.width = '50%';
+                break;
+            case 'complete':
+                statusElement.textContent = 'Complete';
+                progressFill.style.width = '100%';
+                break;
+            case 'pending':
+                statusElement.textContent = 'Pending';
+                progressFill.style.width = '0%';
+                break;
+        }
+    }
+}
+
+// Update progress bar and phase
+function updateProgress(phase, percent) {
+    currentPhase.textContent = `Current Phase: ${phase}`;
+    progressPercent.textContent = `${percent}%`;
+    progressFill.style.width = `${percent}%`;
+}
+
+// Simulate agent handoff
+function handoffToAgent(agentName) {
+    // Set previous agent to complete
+    if (currentAgent !== 'master') {
+        updateAgentStatus(currentAgent, 'complete');
+    }
+
+    // Set new agent to active
+    currentAgent = agentName;
+    updateAgentStatus(agentName, 'processing');
+
+    // Update progress
+    const workflow = agentWorkflow[agentName];
+    if (workflow) {
+        updateProgress(workflow.phase, workflow.progress);
+        progress = workflow.progress;
+    }
+
+    // Update connection status
+    const agentNames = {
+        master: 'Master Agent',
+        sales: 'Sales Agent',
+        verification: 'Verification Agent',
+        underwriting: 'Underwriting Agent',
+        sanction: 'Sanction Agent'
+    };
+
+    connectionStatus.textContent = `Connected - ${agentNames[agentName]} Active`;
+}
+
+// Simulate workflow progression based on message content
+function processWorkflow(message) {
+    const lowerMessage = message.toLowerCase();
+
+    // Trigger different agents based on conversation content
+    if (lowerMessage.includes('loan amount') || lowerMessage.includes('interest rate')) {
+        setTimeout(() => handoffToAgent('sales'), 1500);
+    }
+    else if (lowerMessage.includes('document') || lowerMessage.includes('kyc') || lowerMessage.includes('verify')) {
+        setTimeout(() => handoffToAgent('verification'), 1500);
+    }
+    else if (lowerMessage.includes('credit') || lowerMessage.includes('income') || lowerMessage.includes('employment')) {
+        setTimeout(() => handoffToAgent('underwriting'), 1500);
+    }
+    else if (lowerMessage.includes('approve') || lowerMessage.includes('sanction') || lowerMessage.includes('final')) {
+        setTimeout(() => handoffToAgent('sanction'), 1500);
+    }
+}
+
+// Connection status handlers
+socket.on('connect', function () {
+    isConnected = true;
+    connectionStatus.textContent = 'Connected - Master Agent Active';
+});
+
+socket.on('disconnect', function () {
+    isConnected = false;
+    connectionStatus.textContent = 'Disconnected';
+});
+
+// Session handlers
+socket.on('session_token', function (data) {
+    localStorage.setItem(SESSION_TOKEN_KEY, data.token);
+});
+
+socket.on('session_restored', function (data) {
+    localStorage.setItem(SESSION_TOKEN_KEY, data.token);
+    hideTyping();
+    chatMessages.querySelectorAll('.message').forEach((node) => node.remove());
+    data.history.forEach((entry) => {
+        addMessage(entry.type, entry.message, entry.agent || 'You', entry.timestamp);
+    });
+});
+
+// Message handlers
+socket.on('bot_message', function (data) {
+    hideTyping();
+    addMessage('bot', data.message, data.agent, data.timestamp);
+
+    // Update agent status based on server response
+    if (data.agent) {
+        const agentMap = {
+            'Master Agent': 'master',
+            'Sales Agent': 'sales',
+            'Verification Agent': 'verification',
+            'Underwriting Agent': 'underwriting',
+            'Sanction Agent': 'sanction'
+        };
+
+        const agentId = agentMap[data.agent];
+        if (agentId && agentId !== currentAgent) {
+            handoffToAgent(agentId);
+        }
+    }
+});
+
+// Send message function
+function sendMessage() {
+    const message = messageInput.value.trim();
+    if (message && isConnected) {
+        addMessage('user', message, 'You', new Date().toISOString());
+        socket.emit('user_message', { message: message });
+        messageInput.value = '';
+        showTyping();
+
+        // Process workflow for demo purposes
+        processWorkflow(message);
+    }
+}
+
+// Event listeners
+sendButton.addEventListener('click', sendMessage);
+messageInput.addEventListener('keypress', function (e) {
+    if (e.key === 'Enter') {
+        sendMessage();
+    }
+});
+
+function addMessage(type, content, agent, timestamp) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${type}`;
+
+    const avatarDiv = document.createElement('div');
+    avatarDiv.className = `message-avatar ${type}-avatar`;
+    avatarDiv.innerHTML = type === 'bot' ? '<i class="fas fa-robot" style="font-size: 18px;"></i>' : '<i class="fas fa-user" style="font-size: 18px;"></i>';
+
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'message-content';
+
+    const messageText = document.createElement('div');
+    messageText.innerHTML = content.replace(/\n/g, '<br>');
+    contentDiv.appendChild(messageText);
+
+    const timeDiv = document.createElement('div');
+    timeDiv.className = 'message-time';
+    const time = new Date().toLocaleTimeString();
+    timeDiv.textContent = time;
+    contentDiv.appendChild(timeDiv);
+
+    if (type === 'bot') {
+        messageDiv.appendChild(avatarDiv);
+        messageDiv.appendChild(contentDiv);
+    } else {
+        messageDiv.appendChild(contentDiv);
+        messageDiv.appendChild(avatarDiv);
+    }
+
+    chatMessages.appendChild(messageDiv);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function showTyping() {
+    typingIndicator.style.display = 'block';
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function hideTyping() {
+    typingIndicator.style.display = 'none';
+}
+
+// Auto-focus on message input
+messageInput.focus();
+
+// Initialize with demo data
+setTimeout(() => {
+    updateAgentStatus('master', 'active');
+}, 1000);
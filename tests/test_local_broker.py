@@ -0,0 +1,66 @@
+import socket
+import threading
+import time
+import unittest
+
+from services.local_broker import ROLE_PUBLISH, LocalBroker, LocalBrokerManager, _send_frame
+
+
+class LocalBrokerTest(unittest.TestCase):
+    FRAMES = 8000
+    FRAME_BYTES = 1024
+
+    def setUp(self):
+        self.broker = LocalBroker('127.0.0.1', 0)
+        port = self.broker.bind()
+        threading.Thread(target=self.broker.serve_forever, daemon=True).start()
+        self.url = f'local://127.0.0.1:{port}'
+
+    def _subscribe(self, received):
+        listener = LocalBrokerManager(self.url)
+
+        def listen():
+            for data in listener._listen():
+                received.append(data)
+
+        threading.Thread(target=listen, daemon=True).start()
+        # The subscriber must be registered before anything is published
+        time.sleep(0.2)
+
+    def test_publisher_that_never_reads_does_not_stall_fan_out(self):
+        received = []
+        self._subscribe(received)
+        publisher = LocalBrokerManager(self.url)
+        body = 'x' * self.FRAME_BYTES
+
+        def publish():
+            for i in range(self.FRAMES):
+                publisher._publish({'method': 'emit', 'seq': i, 'body': body})
+
+        # Several megabytes, well past any socket buffer the publisher would have to drain
+        thread = threading.Thread(target=publish, daemon=True)
+        thread.start()
+        thread.join(timeout=30)
+        self.assertFalse(thread.is_alive(), 'publisher blocked')
+
+        deadline = time.time() + 30
+        while len(received) < self.FRAMES and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual([data['seq'] for data in received], list(range(self.FRAMES)))
+
+    def test_publish_connections_receive_nothing(self):
+        received = []
+        self._subscribe(received)
+        host, port = LocalBrokerManager(self.url).address
+        raw = socket.create_connection((host, port))
+        raw.sendall(ROLE_PUBLISH)
+        _send_frame(raw, b'{"channel": "flask-socketio", "data": {"method": "emit"}}')
+        raw.settimeout(0.5)
+        with self.assertRaises(socket.timeout):
+            raw.recv(1)
+        raw.close()
+        self.assertEqual(received, [{'method': 'emit'}])
+
+
+if __name__ == '__main__':
+    unittest.main()